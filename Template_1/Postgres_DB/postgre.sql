@@ -73,7 +73,7 @@ CREATE TABLE "Provider_Language" (
   "ProviderLanguageID" UUID ,
   "ProviderLanguage" VARCHAR[] ,
   "ProviderLanguageStartDate" DATE ,
-  "ProviderLanguageEndDate" DATE
+  "ProviderLanguageEndDate" DATE
 );
 
 
@@ -88,7 +88,7 @@ CREATE TABLE "Provider_Insurance" (
   "ProviderNetworkType" VARCHAR,
   "ProviderPlanStartDate" DATE,
   "ProviderPlanEndDate" DATE,
-  "ProviderContractStatus" VARCHAR
+  "ProviderContractStatus" VARCHAR
 );
 
 CREATE TABLE "Provider_Affiliation" (
@@ -117,7 +117,7 @@ CREATE TABLE "Provider_VisitMode" (
   "LocationID" UUID REFERENCES "Provider_Location"("ProviderLocationID") ON DELETE CASCADE,
   "Acceptingnewpatients" VARCHAR,
   "VirtualCare" VARCHAR,
-  "VisitMode" VARCHAR
+  "VisitMode" VARCHAR
 );
 
 CREATE TABLE "Provider_Ratings" (
@@ -172,3 +172,17 @@ ALTER TABLE "Provider_Ratings" ADD FOREIGN KEY ("ProviderID") REFERENCES "Provid
 ALTER TABLE "Provider_LeaveSchedule" ADD FOREIGN KEY ("ProviderID") REFERENCES "Provider_Info" ("ProviderID");
 
 ALTER TABLE "Provider_WorkingHours" ADD FOREIGN KEY ("ProviderID") REFERENCES "Provider_Info" ("ProviderID");
+
+-- The provider list loads every child collection by ProviderID
+CREATE INDEX ix_provider_address_provider_id ON "Provider_Address" ("ProviderID");
+CREATE INDEX ix_provider_communication_provider_id ON "Provider_Communication" ("ProviderID");
+CREATE INDEX ix_provider_speciality_provider_id ON "Provider_Speciality" ("ProviderID");
+CREATE INDEX ix_provider_certification_provider_id ON "Provider_Certification" ("ProviderID");
+CREATE INDEX ix_provider_location_provider_id ON "Provider_Location" ("ProviderID");
+CREATE INDEX ix_provider_language_provider_id ON "Provider_Language" ("ProviderID");
+CREATE INDEX ix_provider_insurance_provider_id ON "Provider_Insurance" ("ProviderID");
+CREATE INDEX ix_provider_affiliation_provider_id ON "Provider_Affiliation" ("ProviderID");
+CREATE INDEX ix_provider_license_provider_id ON "Provider_License" ("ProviderID");
+CREATE INDEX ix_provider_visitmode_provider_id ON "Provider_VisitMode" ("ProviderID");
+CREATE INDEX ix_provider_ratings_provider_id ON "Provider_Ratings" ("ProviderID");
+CREATE INDEX ix_provider_leaveschedule_provider_id ON "Provider_LeaveSchedule" ("ProviderID");
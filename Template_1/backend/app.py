@@ -1,7 +1,10 @@
-from flask import Flask, jsonify
+import io
+
+from flask import Flask, jsonify, send_file, url_for
 from flask_cors import CORS
-from models import db, ProviderInfo, ProviderConfig
+from models import db, ProviderInfo, ProviderConfig, provider_card_options
 from flask import request
+from brand import BrandCache
 import config
 
 # Initialize Flask app
@@ -18,6 +21,9 @@ db.init_app(app)
 with app.app_context():
     db.create_all()
 
+# The brand row behind /config and /config/logo
+brand_cache = BrandCache(app.config["BRAND_CACHE_TTL"])
+
 ##########################
 # ✅ Health Check Route
 ##########################
@@ -30,7 +36,7 @@ def home():
 ##########################
 @app.route("/api/providers", methods=["GET"])
 def get_first_10_providers():
-    providers = ProviderInfo.query.limit(100).all()  # LIMIT to 10 records
+    providers = ProviderInfo.query.options(*provider_card_options()).limit(100).all()  # LIMIT to 10 records
     result = []
 
     for p in providers:
@@ -89,15 +95,31 @@ def get_first_10_providers():
 ######################
 @app.route("/config", methods=["GET"])
 def get_brand_logo_config():
-    config = ProviderConfig.query.order_by(ProviderConfig.id.desc()).first()
-    if not config:
-        return jsonify({"brand_name": "", "logo": None})
-    
-    logo_base64 = config.logo.hex() if config.logo else None
-    return jsonify({
-        "brand_name": config.brand_name,
-        "logo": logo_base64
+    brand = brand_cache.get()
+    # The logo is served separately, at a URL that changes with its content
+    response = jsonify({
+        "brand_name": brand.brand_name,
+        "logo_url": url_for("get_brand_logo", v=brand.logo_etag) if brand.logo else None
     })
+    response.set_etag(brand.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config["BRAND_MAX_AGE"]
+    return response.make_conditional(request)
+
+
+@app.route("/config/logo", methods=["GET"])
+def get_brand_logo():
+    brand = brand_cache.get()
+    if not brand.logo:
+        return jsonify({"error": "No logo configured"}), 404
+
+    # The versioned URL from /config never changes content; revalidate others
+    versioned = request.args.get("v") == brand.logo_etag
+    response = send_file(io.BytesIO(brand.logo), mimetype=brand.logo_mimetype, etag=brand.logo_etag,
+                         conditional=True, max_age=31536000 if versioned else None)
+    if versioned:
+        response.cache_control.immutable = True
+    return response
 
 
 @app.route("/config", methods=["POST", "PUT"])
@@ -121,6 +143,7 @@ def update_brand_logo_config():
         db.session.add(config)
 
     db.session.commit()
+    brand_cache.clear()
     return jsonify({"message": "Configuration updated successfully!"})
 ##########################
 # ✅ Run the Server
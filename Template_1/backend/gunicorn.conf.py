@@ -0,0 +1,43 @@
+import multiprocessing
+import os
+
+# Production server: gunicorn -c gunicorn.conf.py
+#
+# The app is imported once in the master and forked into WEB_CONCURRENCY
+# workers, each serving GUNICORN_THREADS requests at a time. Every worker has
+# its own SQLAlchemy pool (DB_POOL_SIZE + DB_MAX_OVERFLOW connections, see
+# config.py), so the database sees up to
+#
+#     WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+#
+# connections from one instance. README.md ("Production serving") has the
+# sizing rules.
+
+wsgi_app = "app:app"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then, staggered so they do not restart together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    # Connections opened while the master imported the app (db.create_all)
+    # must not be shared with the forked workers: drop them from the pool
+    # without closing the master's sockets.
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
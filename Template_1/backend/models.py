@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import selectinload
 from uuid import uuid4
 
 db = SQLAlchemy()
@@ -343,3 +344,24 @@ class ProviderConfig(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     brand_name = db.Column(db.String(255))
     logo = db.Column(db.LargeBinary)
+
+
+###############################
+# Provider_Result_Eager_Loads #
+###############################
+
+# Child collections read by the provider result builder. selectinload fetches
+# each one with a single "ProviderID IN (...)" query per page instead of one
+# lazy load per provider.
+def provider_card_options():
+    return [
+        selectinload(ProviderInfo.addresses),
+        selectinload(ProviderInfo.communications),
+        selectinload(ProviderInfo.specialities),
+        selectinload(ProviderInfo.certifications),
+        selectinload(ProviderInfo.insurances),
+        selectinload(ProviderInfo.affiliations),
+        selectinload(ProviderInfo.visit_modes),
+        selectinload(ProviderInfo.languages),
+        selectinload(ProviderInfo.ratings),
+    ]
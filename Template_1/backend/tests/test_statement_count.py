@@ -0,0 +1,45 @@
+from sqlalchemy import event
+
+from models import db, ProviderAddress, ProviderInfo, ProviderRatings
+
+# The provider list (at most 100 providers) and one batched load per child
+# collection its cards read (nine)
+STATEMENTS = 10
+
+
+def _add_providers(count):
+    for i in range(count):
+        provider = ProviderInfo(ProviderFirstName="First%d" % i, ProviderLastName="Last%d" % i)
+        db.session.add(provider)
+        db.session.flush()
+        db.session.add(ProviderAddress(ProviderID=provider.ProviderID, ProviderCity="Newark"))
+        db.session.add(ProviderRatings(ProviderID=provider.ProviderID, RatingValue=4))
+    db.session.commit()
+
+
+def _statements(app, client):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            response = client.get("/api/providers")
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(statements), len(response.get_json())
+
+
+def test_provider_list_statement_count_does_not_grow_with_providers(app, client):
+    # Child rows are batch-loaded for the whole list, not per provider
+    counts = {}
+    for total in (3, 150):
+        with app.app_context():
+            _add_providers(total - ProviderInfo.query.count())
+        _statements(app, client)  # leaves out first-connection queries
+        statements, providers = _statements(app, client)
+        counts[providers] = statements
+    assert counts == {3: STATEMENTS, 100: STATEMENTS}
@@ -1,42 +1,13 @@
-import React, { useEffect, useState } from 'react';
+import React from 'react';
 import { Heart, Facebook, Twitter, Instagram, Linkedin } from 'lucide-react';
+import { useBrand } from '../../hooks/useBrand';
 
 interface FooterProps {
   fallbackBrand?: string;
 }
 
 const Footer: React.FC<FooterProps> = ({ fallbackBrand = 'OnlyMedChoice' }) => {
-  const [brandName, setBrandName] = useState(fallbackBrand);
-  const [logoUrl, setLogoUrl] = useState<string | null>(null);
-
-  // ✅ Fetch brand name and logo from Flask backend
-  useEffect(() => {
-    const fetchBrandData = async () => {
-      try {
-        const res = await fetch('http://127.0.0.1:5000/config');
-        const data = await res.json();
-
-        if (data.brand_name) setBrandName(data.brand_name);
-        if (data.logo) {
-          if (data.logo.startsWith('data:image')) {
-            // Already base64
-            setLogoUrl(data.logo);
-          } else {
-            // Convert hex to base64 PNG
-            const byteArray = new Uint8Array(
-              data.logo.match(/.{1,2}/g).map((byte: string) => parseInt(byte, 16))
-            );
-            const blob = new Blob([byteArray], { type: 'image/png' });
-            setLogoUrl(URL.createObjectURL(blob));
-          }
-        }
-      } catch (error) {
-        console.error('Error fetching brand info:', error);
-      }
-    };
-
-    fetchBrandData();
-  }, []);
+  const { brandName, logoUrl } = useBrand(fallbackBrand);
 
   return (
     <footer className="bg-teal-900 text-white">
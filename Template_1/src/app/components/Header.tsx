@@ -1,38 +1,8 @@
-import React, { useEffect, useState } from 'react';
+import React from 'react';
+import { useBrand } from '../../hooks/useBrand';
 
 const Header: React.FC = () => {
-  const [brandName, setBrandName] = useState<string>('');
-  const [logoUrl, setLogoUrl] = useState<string>('');
-
-  // ✅ Fetch brand name & logo directly from DB via Flask
-  useEffect(() => {
-    const fetchBrandData = async () => {
-      try {
-        const res = await fetch('http://127.0.0.1:5000/config');
-        const data = await res.json();
-
-        if (data.brand_name) setBrandName(data.brand_name);
-
-        if (data.logo) {
-          // Backend should ideally send Base64
-          if (data.logo.startsWith('data:image')) {
-            setLogoUrl(data.logo);
-          } else {
-            // Convert hex from DB to blob for <img> usage
-            const byteArray = new Uint8Array(
-              data.logo.match(/.{1,2}/g).map((byte: string) => parseInt(byte, 16))
-            );
-            const blob = new Blob([byteArray], { type: 'image/png' });
-            setLogoUrl(URL.createObjectURL(blob));
-          }
-        }
-      } catch (error) {
-        console.error('Error fetching brand info:', error);
-      }
-    };
-
-    fetchBrandData();
-  }, []);
+  const { brandName, logoUrl } = useBrand();
 
   return (
     <header className="bg-white shadow-sm border-b border-gray-200">
@@ -1,6 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { MapPin, Phone, Star, Video, Building, Shield } from 'lucide-react';
 import type { Provider } from '../../types/provider';
+import { useBrand } from '../../hooks/useBrand';
 
 interface ProviderCardProps {
   provider: Provider;
@@ -13,25 +14,7 @@ export const ProviderCard: React.FC<ProviderCardProps> = ({
   onClick,
   fallbackBrand = 'OnlyMedChoice',
 }) => {
-  const [brandName, setBrandName] = useState(fallbackBrand);
-    
-  
-    // ✅ Fetch brand name and logo from Flask backend
-    useEffect(() => {
-      const fetchBrandData = async () => {
-        try {
-          const res = await fetch('http://127.0.0.1:5000/config');
-          const data = await res.json();
-  
-          if (data.brand_name) setBrandName(data.brand_name);
-          
-        } catch (error) {
-          console.error('Error fetching brand info:', error);
-        }
-      };
-  
-      fetchBrandData();
-    }, []);
+  const { brandName } = useBrand(fallbackBrand);
   const [settings, setSettings] = useState({
     rating: true,
     yearsOfExperience: true,
@@ -73,7 +73,7 @@ CREATE TABLE "Provider_Language" (
   "ProviderLanguageID" UUID ,
   "ProviderLanguage" VARCHAR[] ,
   "ProviderLanguageStartDate" DATE ,
-  "ProviderLanguageEndDate" DATE
+  "ProviderLanguageEndDate" DATE
 );
 
 
@@ -88,7 +88,7 @@ CREATE TABLE "Provider_Insurance" (
   "ProviderNetworkType" VARCHAR,
   "ProviderPlanStartDate" DATE,
   "ProviderPlanEndDate" DATE,
-  "ProviderContractStatus" VARCHAR
+  "ProviderContractStatus" VARCHAR
 );
 
 CREATE TABLE "Provider_Affiliation" (
@@ -117,7 +117,7 @@ CREATE TABLE "Provider_VisitMode" (
   "LocationID" UUID REFERENCES "Provider_Location"("ProviderLocationID") ON DELETE CASCADE,
   "Acceptingnewpatients" VARCHAR,
   "VirtualCare" VARCHAR,
-  "VisitMode" VARCHAR
+  "VisitMode" VARCHAR
 );
 
 CREATE TABLE "Provider_Ratings" (
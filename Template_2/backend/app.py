@@ -1,11 +1,27 @@
-from flask import Flask, jsonify, request
+import io
+
+from flask import Flask, jsonify, request, send_file, stream_with_context, url_for
 from flask_cors import CORS
-from sqlalchemy import or_, and_
-from models import (
-    db, ProviderInfo, ProviderAddress,
-    ProviderSpeciality, ProviderCertification, ProviderLanguage,ProviderAffiliation,
-    ProviderVisitMode, ProviderRatings, ProviderConfig
+from models import db, ProviderConfig
+from search_request import SearchRequest, InvalidSearch
+from cards import dumps
+from counting import CountCache, count_providers
+from brand import BrandCache
+from display_config import (
+    DisplayConfigCache, InvalidDisplayConfig, save_display_config, validate_display_config
 )
+from response_cache import make_response_cache, response_key
+from export import EXPORT_FORMATS, export_directory
+from facets import count_facets
+from plans import PLAN_FILTERS, plan_catalogue
+from suggest import InvalidSuggest, SuggestIndex, parse_suggest
+from columnar import ColumnarEngine
+from search import parse_filters, filter_shape
+from geo import InvalidLocation, locate
+from availability import InvalidAvailability, resolve as resolve_availability
+from effective import InvalidEffectiveDate, directory_state, resolve as resolve_as_of
+from commands import register_commands
+from instrumentation import init_app as init_instrumentation, metrics, note_search, phase
 import config
 
 # Initialize Flask app
@@ -22,16 +38,31 @@ db.init_app(app)
 with app.app_context():
     db.create_all()
 
-# -------------------------
-# In-memory admin config
-# -------------------------
-provider_config = {
-    "rating": True,
-    "yearsOfExperience": True,
-    "phoneNumber": True,
-    "acceptingStatus": True,
-    "virtualCareStatus": True
-}
+# CLI: flask --app app migrate
+register_commands(app)
+
+# Server-Timing on every response and Prometheus metrics at /metrics
+init_instrumentation(app)
+
+# Exact search totals, keyed by normalized filter set
+count_cache = CountCache(app.config["COUNT_CACHE_MAX_ENTRIES"], app.config["COUNT_CACHE_TTL"])
+
+# Whole /api/providers responses (None when RESPONSE_CACHE is "off")
+response_cache = make_response_cache(app.config)
+
+# The brand row behind /config and /config/logo
+brand_cache = BrandCache(app.config["BRAND_CACHE_TTL"])
+
+# The admin display toggles behind /api/config
+display_config_cache = DisplayConfigCache(app.config["DISPLAY_CONFIG_CACHE_TTL"])
+
+# Typeahead terms; loaded by gunicorn before forking (gunicorn.conf.py), or
+# on the first /api/suggest otherwise
+suggest_index = SuggestIndex(app.config["SUGGEST_REFRESH_INTERVAL"], app.config["SUGGEST_LOG_RETENTION"])
+
+# In-process filter index (columnar.py), when COLUMNAR_ENGINE is on: mapped
+# from the snapshots in COLUMNAR_SNAPSHOT_DIR, or loaded by each process
+columnar_engine = ColumnarEngine(app.config["COLUMNAR_SNAPSHOT_DIR"])
 
 ######################
 # ✅ Health Check
@@ -42,15 +73,18 @@ def home():
 
 
 # -------------------------
-# Save In-Memory UI Config
+# Save Admin Display Config
 # -------------------------
 @app.route("/api/config", methods=["POST"])
 def save_ui_config():
-    global provider_config
-    data = request.json
-    if data:
-        provider_config.update(data)
-    return jsonify({"message": "Configuration saved", "config": provider_config}), 200
+    # Saved in display_config; other workers see it within DISPLAY_CONFIG_CACHE_TTL
+    try:
+        changes = validate_display_config(request.get_json(silent=True))
+    except InvalidDisplayConfig as e:
+        return jsonify({"error": str(e)}), 400
+    config = save_display_config(db.session, changes)
+    display_config_cache.clear()
+    return jsonify({"message": "Configuration saved", "config": config}), 200
 
 
 # -------------------------
@@ -58,7 +92,7 @@ def save_ui_config():
 # -------------------------
 @app.route("/api/config", methods=["GET"])
 def get_ui_config():
-    return jsonify({"config": provider_config}), 200
+    return jsonify({"config": display_config_cache.get()}), 200
 
 
 ######################
@@ -66,222 +100,216 @@ def get_ui_config():
 ######################
 @app.route("/api/providers", methods=["GET"])
 def get_providers_paginated_filtered():
-    # Pagination
-    page = int(request.args.get("page", 1))
-    per_page = int(request.args.get("per_page", 9))
-    offset = (page - 1) * per_page
-
-    # Filters
-    name = request.args.get("name", "").strip().lower()
-    specialty = request.args.get("specialty", "").strip().lower()
-    location = request.args.get("location", "").strip().lower()
-    gender = request.args.get("gender")
-    min_experience = int(request.args.get("minExperience", 0))
-    board_certified = request.args.get("boardCertified")
-    accepting_new = request.args.get("acceptingNewPatients")
-    virtual_care = request.args.get("virtualCare")
-    hospital_affiliations = request.args.get("hospitalAffiliations")
-    languages = request.args.getlist("languagesSpoken")  # array
-
-    # Optional UI config (if saved from frontend)
-    provider_config = {
-        "gender": True,
-        "npiId": True,
-        "phoneNumber": True,
-        "emailId": True,
-        "yearsOfExperience": True,
-        "rating": True,
-        "acceptingStatus": True,
-        "virtualCareStatus": True,
-        "boardCertified": True,
-        "boardName": True,
-        "affiliationName": True,
-        "hospitalAffiliation": True
-    }
-
-    query = ProviderInfo.query
-
-    # -----------------
-    # Apply filters
-    # -----------------
-    if name:
-        query = query.filter(
-            or_(
-                ProviderInfo.ProviderFirstName.ilike(f"%{name}%"),
-                ProviderInfo.ProviderLastName.ilike(f"%{name}%"),
-                ProviderInfo.ProviderMiddleInitial.ilike(f"%{name}%")
-            )
-        )
-
-    if specialty:
-        query = query.join(ProviderInfo.specialities).filter(
-            ProviderSpeciality.ProviderSpecialityName.ilike(f"%{specialty}%")
-        )
-
-    if location:
-        query = query.join(ProviderInfo.addresses).filter(
-            or_(
-                ProviderAddress.ProviderCity.ilike(f"%{location}%"),
-                ProviderAddress.ProviderState.ilike(f"%{location}%"),
-                ProviderAddress.ProviderZIPCode.ilike(f"%{location}%")
-            )
-        )
-
-    if gender:
-        query = query.filter(ProviderInfo.ProviderGender == gender)
-
-    if min_experience > 0:
-        query = query.join(ProviderInfo.certifications).filter(
-            ProviderCertification.ProviderYearsOfExperience >= min_experience
-        )
-
-    if board_certified:
-        query = query.join(ProviderInfo.certifications).filter(
-            ProviderCertification.ProviderBoardCertified == ('Yes' if board_certified == 'true' else 'No')
-        )
-
-    if accepting_new:
-        query = query.join(ProviderInfo.visit_modes).filter(
-            ProviderVisitMode.Acceptingnewpatients == ('Yes' if accepting_new == 'true' else 'No')
-        )
-
-    if virtual_care:
-        query = query.join(ProviderInfo.visit_modes).filter(
-            ProviderVisitMode.VirtualCare == ('Yes' if virtual_care == 'true' else 'No')
-        )
-
-    if hospital_affiliations:
-        if hospital_affiliations == 'true':
-            query = query.join(ProviderInfo.affiliations)
-        else:
-            query = query.outerjoin(ProviderInfo.affiliations).filter(
-                ProviderAffiliation.ProviderAffiliationName == None
+    # Parameters, filters, sorting and the response body: search_request.py
+    search = SearchRequest(request.args, app.config, display_config_cache.get())
+    version, search_as_of = directory_state()
+    try:
+        search.prepare(search_as_of=search_as_of)
+    except InvalidSearch as e:
+        return jsonify({"error": str(e)}), 400
+
+    note_search(filter_shape(search.filters), search.sort_by)
+
+    cache_key = search.cache_key(version)
+    if response_cache is not None:
+        body = response_cache.get(cache_key)
+        if body is not None:
+            response = app.response_class(body, mimetype="application/json")
+            response.headers["X-Cache"] = "HIT"
+            return response
+
+    found = None
+    if app.config["COLUMNAR_ENGINE"]:
+        with phase("columnar"):
+            found = columnar_engine.search(search, version)
+
+    if found is not None:
+        # The index found the page; its rows come from Provider_Search
+        ids, total, total_mode = found
+        with phase("page"):
+            rows = search.hydrate_query(ids).all() if ids else []
+    else:
+        with phase("count"):
+            total, total_mode = count_providers(
+                search.query, search.count_key(version), search.count_mode, count_cache, app.config
             )
+        # The page and, on the live tables, its child collections
+        with phase("page"):
+            rows = search.page_query().all()
 
-    if languages:
-        query = query.join(ProviderInfo.languages).filter(
-            ProviderLanguage.ProviderLanguage.overlap(languages)
-        )
-
-    # -----------------
-    # Sorting
-    # -----------------
-    sort_by = request.args.get("sortBy", "rating")
-    if sort_by == "name-asc":
-        query = query.order_by(ProviderInfo.ProviderFirstName.asc())
-    elif sort_by == "name-desc":
-        query = query.order_by(ProviderInfo.ProviderFirstName.desc())
-    elif sort_by == "experience":
-        query = query.join(ProviderInfo.certifications).order_by(
-            ProviderCertification.ProviderYearsOfExperience.desc()
-        )
-    elif sort_by == "rating":
-        query = query.outerjoin(ProviderInfo.ratings).order_by(
-            ProviderRatings.RatingValue.desc()
-        )
-
-    # -----------------
-    # Pagination
-    # -----------------
-    total = query.count()
-    providers = query.offset(offset).limit(per_page).all()
-
-    # -----------------
-    # Result construction
-    # -----------------
-    result = []
-    for p in providers:
-        address = p.addresses[0] if p.addresses else None
-        contact = p.communications[0] if p.communications else None
-        specialty = p.specialities[0] if p.specialities else None
-        certification = p.certifications[0] if p.certifications else None
-        insurance = p.insurances[0] if p.insurances else None
-        affiliation = p.affiliations[0] if p.affiliations else None
-        visit_mode = p.visit_modes[0] if p.visit_modes else None
-
-        languages_spoken = list(
-            set(lang for lang_obj in p.languages for lang in (lang_obj.ProviderLanguage or []))
-        )
-        rating = (
-            sum([r.RatingValue for r in p.ratings]) / len(p.ratings)
-            if p.ratings
-            else None
-        )
-
-        provider_data = {
-            "id": p.ProviderID,
-            "firstName": p.ProviderFirstName,
-            "middleInitial": p.ProviderMiddleInitial,
-            "lastName": p.ProviderLastName,
-            "degree": certification.ProviderDegree if certification else "",
-            "type": p.ProviderType,
-            "specialtyName": specialty.ProviderSpecialityName if specialty else "",
-            "addressLine1": address.ProviderAddressLine1 if address else "",
-            "addressLine2": address.ProviderAddressLine2 if address else "",
-            "city": address.ProviderCity if address else "",
-            "state": address.ProviderState if address else "",
-            "zipCode": address.ProviderZIPCode if address else "",
-            "planName": insurance.ProviderPlanName[0] if insurance and insurance.ProviderPlanName else "",
-            "acceptedAllPlans": insurance.ProviderPlanName if insurance and insurance.ProviderPlanName else [],
-            "workingHours": "Mon-Fri: 8:00 AM - 5:00 PM",
-            "languagesSpoken": languages_spoken,
-        }
-
-        # Conditionally include fields
-        if provider_config.get("gender", True):
-            provider_data["gender"] = p.ProviderGender
-        if provider_config.get("npiId", True):
-            provider_data["npiId"] = p.ProviderNPI
-        if provider_config.get("phoneNumber", True):
-            provider_data["phoneNumber"] = contact.ProviderPhoneNo if contact else ""
-        if provider_config.get("emailId", True):
-            provider_data["emailId"] = contact.ProviderEmail if contact else ""
-        if provider_config.get("yearsOfExperience", True):
-            provider_data["yearOfExperience"] = certification.ProviderYearsOfExperience if certification else 0
-        if provider_config.get("rating", True):
-            provider_data["rating"] = float(rating) if rating else None
-        if provider_config.get("acceptingStatus", True):
-            provider_data["acceptingNewPatients"] = (
-                visit_mode.Acceptingnewpatients == "Yes" if visit_mode else False
-            )
-        if provider_config.get("virtualCareStatus", True):
-            provider_data["virtualCareAvailable"] = (
-                visit_mode.VirtualCare == "Yes" if visit_mode else False
-            )
-        if provider_config.get("boardCertified", True):
-            provider_data["boardCertified"] = (
-                certification.ProviderBoardCertified == "Yes" if certification else False
-            )
-        if provider_config.get("boardName", True):
-            provider_data["boardName"] = certification.ProviderBoardName if certification else ""
-        if provider_config.get("affiliationName", True):
-            provider_data["affiliationName"] = affiliation.ProviderAffiliationName if affiliation else ""
-        if provider_config.get("hospitalAffiliation", True):
-            provider_data["hospitalAffiliations"] = True if affiliation else False
-
-        result.append(provider_data)
-
-    return jsonify({
-        "providers": result,
-        "total": total,
-        "page": page,
-        "pages": (total + per_page - 1) // per_page
-    }), 200
+    with phase("serialize"):
+        body = dumps(search.response(rows, total, total_mode))
+    response = app.response_class(body, mimetype="application/json")
+    if response_cache is not None:
+        response_cache.set(cache_key, body)
+        response.headers["X-Cache"] = "MISS"
+    return response, 200
+
+
+# -------------------------
+# Facet counts for a search
+# -------------------------
+@app.route("/api/providers/facets", methods=["GET"])
+def get_provider_facets():
+    # Same filter parameters as /api/providers; counts always come from
+    # Provider_Search, in one query (facets.py), so only as of its date
+    filters = parse_filters(request.args)
+    version, search_as_of = directory_state()
+    try:
+        locate(filters, app.config["NEAR_MAX_RADIUS_MILES"])
+        resolve_availability(filters, app.config["DIRECTORY_TIMEZONE"])
+        if filters["asOf"]:
+            resolve_as_of(filters, app.config["DIRECTORY_TIMEZONE"])
+            if filters["asOf"] != search_as_of.isoformat():
+                raise InvalidEffectiveDate(f"Facet counts are only available as of {search_as_of.isoformat()}")
+    except (InvalidLocation, InvalidAvailability, InvalidEffectiveDate) as e:
+        return jsonify({"error": str(e)}), 400
+    filters["asOf"] = search_as_of.isoformat()
+
+    note_search(filter_shape(filters))
+
+    cache_key = response_key(version, facets=filters)
+    if response_cache is not None:
+        body = response_cache.get(cache_key)
+        if body is not None:
+            response = app.response_class(body, mimetype="application/json")
+            response.headers["X-Cache"] = "HIT"
+            return response
+
+    with phase("facets"):
+        facets = count_facets(filters)
+    with phase("serialize"):
+        body = dumps({"facets": facets})
+    response = app.response_class(body, mimetype="application/json")
+    if response_cache is not None:
+        response_cache.set(cache_key, body)
+        response.headers["X-Cache"] = "MISS"
+    return response, 200
+
+
+# -------------------------
+# Plan catalogue
+# -------------------------
+@app.route("/api/plans", methods=["GET"])
+def get_plan_catalogue():
+    # Precomputed counts as of Provider_Search's date (plans.py); plan,
+    # network and contractStatus narrow each other's lists
+    filters = parse_filters(request.args)
+    version, search_as_of = directory_state()
+
+    cache_key = response_key(version, plans={name: filters[name] for name in PLAN_FILTERS})
+    if response_cache is not None:
+        body = response_cache.get(cache_key)
+        if body is not None:
+            response = app.response_class(body, mimetype="application/json")
+            response.headers["X-Cache"] = "HIT"
+            return response
+
+    with phase("plans"):
+        catalogue = plan_catalogue(filters)
+    with phase("serialize"):
+        body = dumps({"asOf": search_as_of.isoformat(), **catalogue})
+    response = app.response_class(body, mimetype="application/json")
+    if response_cache is not None:
+        response_cache.set(cache_key, body)
+        response.headers["X-Cache"] = "MISS"
+    return response, 200
+
+
+# -------------------------
+# Typeahead suggestions
+# -------------------------
+@app.route("/api/suggest", methods=["GET"])
+def get_suggestions():
+    try:
+        prefix, kinds, limit = parse_suggest(request.args, app.config["SUGGEST_LIMIT"])
+    except InvalidSuggest as e:
+        return jsonify({"error": str(e)}), 400
+    with phase("suggest"):
+        suggestions = suggest_index.suggest(prefix, kinds, limit)
+    return app.response_class(dumps(suggestions), mimetype="application/json")
+
+
+@app.route("/api/suggest/stats", methods=["GET"])
+def get_suggest_stats():
+    return jsonify(suggest_index.stats()), 200
+
+
+@app.route("/api/columnar/stats", methods=["GET"])
+def get_columnar_stats():
+    return jsonify({"enabled": app.config["COLUMNAR_ENGINE"], **columnar_engine.stats()}), 200
+
+
+# -------------------------
+# Full directory export
+# -------------------------
+@app.route("/api/providers/export", methods=["GET"])
+def export_providers():
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+
+    compress = "gzip" in request.accept_encodings
+    body = export_directory(export_format, app.config["SEARCH_SOURCE"], app.config["EXPORT_CHUNK_SIZE"],
+                            app.config["DIRECTORY_TIMEZONE"], compress)
+    # Streamed as it is produced; the request context (and its database
+    # session) stays open until the last chunk is sent
+    response = app.response_class(stream_with_context(body), mimetype=EXPORT_FORMATS[export_format])
+    response.headers["Content-Disposition"] = f'attachment; filename="providers.{export_format}"'
+    response.headers["Vary"] = "Accept-Encoding"
+    if compress:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+# -------------------------
+# Prometheus metrics
+# -------------------------
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    body, content_type = metrics()
+    return app.response_class(body, content_type=content_type)
+
+
+# -------------------------
+# Response cache metrics
+# -------------------------
+@app.route("/api/cache/stats", methods=["GET"])
+def get_cache_stats():
+    if response_cache is None:
+        return jsonify({"backend": "off"}), 200
+    return jsonify({"backend": app.config["RESPONSE_CACHE"], **response_cache.stats()}), 200
 
 ######################
 # ✅ Brand & Logo Config
 ######################
 @app.route("/config", methods=["GET"])
 def get_brand_logo_config():
-    config = ProviderConfig.query.order_by(ProviderConfig.id.desc()).first()
-    if not config:
-        return jsonify({"brand_name": "", "logo": None})
-    
-    logo_base64 = config.logo.hex() if config.logo else None
-    return jsonify({
-        "brand_name": config.brand_name,
-        "logo": logo_base64
+    brand = brand_cache.get()
+    # The logo is served separately, at a URL that changes with its content
+    response = jsonify({
+        "brand_name": brand.brand_name,
+        "logo_url": url_for("get_brand_logo", v=brand.logo_etag) if brand.logo else None
     })
+    response.set_etag(brand.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config["BRAND_MAX_AGE"]
+    return response.make_conditional(request)
+
+
+@app.route("/config/logo", methods=["GET"])
+def get_brand_logo():
+    brand = brand_cache.get()
+    if not brand.logo:
+        return jsonify({"error": "No logo configured"}), 404
+
+    # The versioned URL from /config never changes content; revalidate others
+    versioned = request.args.get("v") == brand.logo_etag
+    response = send_file(io.BytesIO(brand.logo), mimetype=brand.logo_mimetype, etag=brand.logo_etag,
+                         conditional=True, max_age=31536000 if versioned else None)
+    if versioned:
+        response.cache_control.immutable = True
+    return response
 
 
 @app.route("/config", methods=["POST", "PUT"])
@@ -305,6 +333,7 @@ def update_brand_logo_config():
         db.session.add(config)
 
     db.session.commit()
+    brand_cache.clear()
     return jsonify({"message": "Configuration updated successfully!"})
 
 
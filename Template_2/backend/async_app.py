@@ -0,0 +1,162 @@
+import asyncio
+
+from quart import Quart, Response, jsonify, request, url_for
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Query
+
+from models import DisplayConfig, ProviderConfig
+from search_request import SearchRequest, InvalidSearch
+from cards import dumps
+from counting import CountCache, count_providers_async
+from brand import BrandCache
+from display_config import DisplayConfigCache
+from response_cache import make_response_cache
+from effective import DIRECTORY_STATE
+from instrumentation import init_async_app, note_search, phase
+from search import filter_shape
+import config
+
+# asyncio variant of app.py's read endpoints, for high-concurrency traffic:
+#
+#     uvicorn async_app:app --host 0.0.0.0 --port 5000 --workers 4
+#
+# /api/providers and /config behave and respond exactly as in app.py (both
+# use search_request.py); the difference is that a request waiting on
+# Postgres holds no thread, and the count and the page of a search run at
+# the same time on two connections from one pool. Writes, the admin config
+# and the CLI stay in app.py.
+
+app = Quart(__name__)
+app.config.from_object(config)
+
+engine = create_async_engine(app.config["ASYNC_DATABASE_URI"], **app.config["SQLALCHEMY_ENGINE_OPTIONS"])
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+# Per-process caches, as in app.py
+count_cache = CountCache(app.config["COUNT_CACHE_MAX_ENTRIES"], app.config["COUNT_CACHE_TTL"])
+response_cache = make_response_cache(app.config)
+brand_cache = BrandCache(app.config["BRAND_CACHE_TTL"])
+display_config_cache = DisplayConfigCache(app.config["DISPLAY_CONFIG_CACHE_TTL"])
+
+# Server-Timing and Prometheus metrics, as app.py records them
+init_async_app(app)
+
+
+@app.after_request
+async def allow_cors(response):
+    # What flask_cors.CORS(app) sends for app.py
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    return response
+
+
+######################
+# ✅ Health Check
+######################
+@app.route("/", methods=["GET"])
+async def home():
+    return jsonify({"message": "Healthcare Provider API is running ✅"}), 200
+
+
+######################
+# ✅ Get All Providers
+######################
+async def current_display_config(session):
+    # The admin display toggles app.py's /api/config saves
+    config = display_config_cache.cached()
+    if config is None:
+        config = display_config_cache.store(await session.get(DisplayConfig, True))
+    return config
+
+
+@app.route("/api/providers", methods=["GET"])
+async def get_providers_paginated_filtered():
+    async with Session() as session:
+        search = SearchRequest(request.args, app.config, await current_display_config(session))
+        lookup = search.zip_lookup()
+        zip_center = (await session.execute(lookup)).one() if lookup is not None else None
+        version, search_as_of = (await session.execute(DIRECTORY_STATE)).one()
+        try:
+            search.prepare(zip_center, query_for=Query, search_as_of=search_as_of)
+        except InvalidSearch as e:
+            return jsonify({"error": str(e)}), 400
+
+    note_search(filter_shape(search.filters), search.sort_by)
+
+    cache_key = search.cache_key(version)
+    if response_cache is not None:
+        body = response_cache.get(cache_key)
+        if body is not None:
+            response = Response(body, mimetype="application/json")
+            response.headers["X-Cache"] = "HIT"
+            return response
+
+    async def count():
+        async with Session() as session:
+            with phase("count"):
+                return await count_providers_async(
+                    search.query, search.count_key(version), search.count_mode, count_cache, app.config, session
+                )
+
+    async def page():
+        # page_query() eager-loads everything a card reads, so the rows can be
+        # turned into cards after the session is closed
+        async with Session() as session:
+            with phase("page"):
+                return (await session.execute(search.page_query().statement)).all()
+
+    (total, total_mode), rows = await asyncio.gather(count(), page())
+
+    with phase("serialize"):
+        body = dumps(search.response(rows, total, total_mode))
+    response = Response(body, mimetype="application/json")
+    if response_cache is not None:
+        response_cache.set(cache_key, body)
+        response.headers["X-Cache"] = "MISS"
+    return response, 200
+
+
+######################
+# ✅ Brand & Logo Config
+######################
+LATEST_BRAND = select(ProviderConfig).order_by(ProviderConfig.id.desc()).limit(1)
+
+
+async def current_brand():
+    brand = brand_cache.cached()
+    if brand is None:
+        async with Session() as session:
+            row = (await session.execute(LATEST_BRAND)).scalar()
+        brand = brand_cache.store(row)
+    return brand
+
+
+@app.route("/config", methods=["GET"])
+async def get_brand_logo_config():
+    brand = await current_brand()
+    response = jsonify({
+        "brand_name": brand.brand_name,
+        "logo_url": url_for("get_brand_logo", v=brand.logo_etag) if brand.logo else None
+    })
+    response.set_etag(brand.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config["BRAND_MAX_AGE"]
+    return await response.make_conditional(request)
+
+
+@app.route("/config/logo", methods=["GET"])
+async def get_brand_logo():
+    brand = await current_brand()
+    if not brand.logo:
+        return jsonify({"error": "No logo configured"}), 404
+
+    response = Response(brand.logo, mimetype=brand.logo_mimetype)
+    response.set_etag(brand.logo_etag)
+    # The versioned URL from /config never changes content; revalidate others
+    if request.args.get("v") == brand.logo_etag:
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return await response.make_conditional(request)
@@ -0,0 +1,152 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import Boolean, and_, exists, func, literal, literal_column, not_
+from models import ProviderInfo, ProviderLeaveSchedule, ProviderSearch
+
+
+class InvalidAvailability(ValueError):
+    pass
+
+
+##########################
+# Availability filters   #
+##########################
+
+# Provider_Search."WeeklyHours" has one bit per quarter hour of the week,
+# from Monday 00:00 (migrations/009_availability.sql)
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+# Longest notOnLeaveFrom-notOnLeaveTo range, in days. Recurring leave is
+# expanded over the range, so it bounds the work per provider.
+MAX_LEAVE_RANGE_DAYS = 366
+
+
+def _weekday(value):
+    day = value.strip().lower()[:3]
+    if day not in WEEKDAYS:
+        raise InvalidAvailability(f"availableDay must be a day of the week, not {value!r}")
+    return WEEKDAYS.index(day)
+
+
+def _slot(value):
+    try:
+        hours, minutes = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise InvalidAvailability(f"availableTime must be HH:MM, not {value!r}")
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise InvalidAvailability(f"availableTime must be HH:MM, not {value!r}")
+    return (hours * 60 + minutes) // SLOT_MINUTES
+
+
+def _date(name, value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise InvalidAvailability(f"{name} must be a date (YYYY-MM-DD), not {value!r}")
+
+
+def resolve(filters, timezone, now=None):
+    """Resolve the availability filters from search.parse_filters in place.
+
+    ``availableDay`` (Mon..Sun), optionally with ``availableTime`` (HH:MM),
+    sets ``weeklySlots`` to ``[first slot, slots]``: the whole day, or the
+    quarter hour containing the time. ``openNow`` uses the current day and
+    time in ``timezone`` instead and also excludes providers on leave today.
+    ``notOnLeaveFrom``/``notOnLeaveTo`` (either alone means that one day)
+    set ``leaveRange`` to ``[from, to]`` as ISO dates, so the filters stay
+    JSON for ``filter_key``. Raises InvalidAvailability.
+    """
+    if filters["openNow"]:
+        try:
+            now = now or datetime.now(ZoneInfo(timezone))
+        except ZoneInfoNotFoundError:
+            raise InvalidAvailability(f"Unknown DIRECTORY_TIMEZONE: {timezone}")
+        slot = now.weekday() * SLOTS_PER_DAY + (now.hour * 60 + now.minute) // SLOT_MINUTES
+        filters["weeklySlots"] = [slot, 1]
+        today = now.date().isoformat()
+        filters["leaveRange"] = [today, today]
+    elif filters["availableDay"]:
+        first = _weekday(filters["availableDay"]) * SLOTS_PER_DAY
+        if filters["availableTime"]:
+            filters["weeklySlots"] = [first + _slot(filters["availableTime"]), 1]
+        else:
+            filters["weeklySlots"] = [first, SLOTS_PER_DAY]
+    elif filters["availableTime"]:
+        raise InvalidAvailability("availableTime needs availableDay")
+
+    if filters["notOnLeaveFrom"] or filters["notOnLeaveTo"]:
+        start = filters["notOnLeaveFrom"] and _date("notOnLeaveFrom", filters["notOnLeaveFrom"])
+        end = filters["notOnLeaveTo"] and _date("notOnLeaveTo", filters["notOnLeaveTo"])
+        start, end = start or end, end or start
+        if end < start:
+            raise InvalidAvailability("notOnLeaveTo is before notOnLeaveFrom")
+        if (end - start).days >= MAX_LEAVE_RANGE_DAYS:
+            raise InvalidAvailability(f"Leave ranges are limited to {MAX_LEAVE_RANGE_DAYS} days")
+        if filters["leaveRange"]:
+            # openNow already asks for today; keep both
+            start = min(start, date.fromisoformat(filters["leaveRange"][0]))
+            end = max(end, date.fromisoformat(filters["leaveRange"][1]))
+        filters["leaveRange"] = [start.isoformat(), end.isoformat()]
+
+
+##########################
+# Predicates             #
+##########################
+
+def _weekly_hours(model):
+    if model is ProviderSearch:
+        return ProviderSearch.WeeklyHours
+    # Computed per candidate row; Provider_Search has it precomputed
+    return func.provider_weekly_hours(ProviderInfo.ProviderID)
+
+
+def available(model, filters):
+    """Providers working in any of the ``weeklySlots`` quarter hours."""
+    first, slots = filters["weeklySlots"]
+    return func.provider_available(_weekly_hours(model), first, slots, type_=Boolean)
+
+
+def not_on_leave(model, filters):
+    """Providers with no leave overlapping ``leaveRange``.
+
+    One-off periods are matched by range overlap, the expression of the GiST
+    index in migrations/009_availability.sql; recurring ones, by expanding
+    their pattern over the range in SQL.
+    """
+    start, end = (date.fromisoformat(day) for day in filters["leaveRange"])
+    leave = ProviderLeaveSchedule
+    # Provider_Search's varchar key in the leave table's type (uuid in
+    # postgre.sql), so the leave table's ProviderID indexes apply
+    provider_id = model.ProviderID
+    if model is ProviderSearch:
+        provider_id = func.provider_key(ProviderSearch.ProviderID, type_=leave.ProviderID.type)
+    recurs = func.provider_leave_recurs(leave.IsRecurring, leave.RecurringPattern, type_=Boolean)
+    period = func.daterange(
+        leave.LeaveStartDate,
+        func.greatest(leave.LeaveStartDate, func.coalesce(leave.LeaveEndDate, leave.LeaveStartDate)),
+        literal_column("'[]'")
+    )
+    wanted = func.daterange(literal(start), literal(end), literal_column("'[]'"))
+    one_off = exists().where(
+        leave.ProviderID == provider_id, leave.LeaveStartDate != None, not_(recurs),
+        period.op("&&")(wanted)
+    )
+    recurring = exists().where(
+        leave.ProviderID == provider_id, leave.LeaveStartDate != None, recurs,
+        func.provider_leave_overlaps(leave.LeaveStartDate, leave.LeaveEndDate, leave.RecurringPattern,
+                                     start, end, type_=Boolean)
+    )
+    return and_(~one_off, ~recurring)
+
+
+def availability_conditions(model, filters):
+    """Predicates for the resolved availability filters, keyed like search.search_conditions."""
+    conditions = {}
+    if filters["weeklySlots"]:
+        conditions["available"] = available(model, filters)
+    if filters["leaveRange"]:
+        conditions["notOnLeave"] = not_on_leave(model, filters)
+    return conditions
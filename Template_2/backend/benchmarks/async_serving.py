@@ -0,0 +1,75 @@
+"""Side-by-side benchmark of app.py (gunicorn) and async_app.py (uvicorn).
+
+Starts each server with the same number of worker processes and the same
+database pool per worker, drives it with many concurrent keep-alive clients
+and reports requests per second and latency percentiles. The client loop and
+request mix are those of benchmarks/serving.py; the response cache is off so
+every request runs its queries.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.async_serving --workers 2 --clients 500
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.serving import BACKEND_DIR, run
+
+
+def start(command, port, env):
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/")
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("%s did not start" % command[2])
+
+
+def servers(args):
+    env = dict(os.environ, DB_POOL_SIZE=str(args.pool_size), DB_MAX_OVERFLOW="0", RESPONSE_CACHE="off")
+    yield "sync", [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null"], dict(
+        env, WEB_CONCURRENCY=str(args.workers), GUNICORN_THREADS=str(args.threads),
+        GUNICORN_BIND="127.0.0.1:%d" % args.port
+    )
+    yield "async", [sys.executable, "-m", "uvicorn", "async_app:app", "--host", "127.0.0.1",
+                    "--port", str(args.port), "--workers", str(args.workers), "--no-access-log"], env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=2, help="processes for both servers")
+    parser.add_argument("--threads", type=int, default=4, help="GUNICORN_THREADS per sync worker")
+    parser.add_argument("--pool-size", type=int, default=8, help="DB_POOL_SIZE per worker, both servers")
+    parser.add_argument("--clients", type=int, default=500, help="concurrent client connections")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--port", type=int, default=5099)
+    args = parser.parse_args()
+
+    print("%6s %8s %8s %10s %8s %8s %7s" % ("server", "workers", "clients", "req/s", "p50 ms", "p99 ms", "errors"))
+    for name, command, env in servers(args):
+        server = start(command, args.port, env)
+        try:
+            run(args.port, args.clients, 2)  # warm up every worker and pool
+            latencies, errors = run(args.port, args.clients, args.seconds)
+        finally:
+            server.terminate()
+            server.wait()
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+        print("%6s %8d %8d %10.1f %8.1f %8.1f %7d" % (
+            name, args.workers, args.clients, len(latencies) / args.seconds,
+            statistics.median(latencies) if latencies else 0, p99, len(errors)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Load test for the brand config endpoints (/config, /config/logo).
+
+Replays page views of a results page with a growing number of provider
+cards, once the way the frontend fetched brand data before (header, footer
+and every card each requesting /config) and once the way it does now
+(hooks/useBrand.ts: one /config and one logo request per session, later
+views revalidated with If-None-Match). For each card count it reports the
+requests, response bytes and database statements per page view; with the
+current client none of them grow with the card count.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.brand_load --cards 10 50 200 --views 20
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+
+from app import app, brand_cache
+from models import db
+
+
+class Counter:
+    def __init__(self):
+        self.requests = self.bytes = self.statements = 0
+
+    def get(self, client, url, etags):
+        headers = {"If-None-Match": etags[url]} if url in etags else {}
+        response = client.get(url, headers=headers)
+        if response.status_code == 200 and response.headers.get("ETag"):
+            etags[url] = response.headers["ETag"]
+        self.requests += 1
+        self.bytes += len(response.data)
+        return response
+
+
+def per_card_view(client, counter, cards, etags):
+    # Header + footer + one request per card, none of them conditional
+    for _ in range(cards + 2):
+        counter.get(client, "/config", {})
+
+
+def per_session_view(client, counter, cards, etags):
+    # The browser cache revalidates what the first view stored
+    data = counter.get(client, "/config", etags).get_json()
+    if data and data["logo_url"]:
+        counter.get(client, data["logo_url"], etags)
+
+
+def run(client, view, cards, views):
+    counter = Counter()
+    etags = {}
+    brand_cache.clear()
+
+    def count_statement(*args, **kwargs):
+        counter.statements += 1
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", count_statement)
+        try:
+            start = time.perf_counter()
+            for _ in range(views):
+                view(client, counter, cards, etags)
+            elapsed = (time.perf_counter() - start) * 1000
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count_statement)
+    return counter, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--views", type=int, default=20, help="page views per session")
+    args = parser.parse_args()
+
+    client = app.test_client()
+    print("%-12s %6s %10s %12s %11s %9s" % ("client", "cards", "req/view", "bytes/view", "db/session", "ms/view"))
+    for name, view in (("per-card", per_card_view), ("per-session", per_session_view)):
+        for cards in args.cards:
+            counter, elapsed = run(client, view, cards, args.views)
+            print("%-12s %6d %10.1f %12.0f %11d %9.2f" % (
+                name, cards, counter.requests / args.views, counter.bytes / args.views,
+                counter.statements, elapsed / args.views))
+
+
+if __name__ == "__main__":
+    main()
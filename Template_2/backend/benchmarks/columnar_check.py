@@ -0,0 +1,331 @@
+"""Latency and equality check for the in-process filter index (columnar.py).
+
+Without a database (--memory) it builds a ColumnarIndex from synthetic
+Provider_Search rows of each given size, saves it as a snapshot and maps it
+back, then times every filter of the benchmark suite on its own and all
+together (filter, count and one page, in microseconds), checking each
+result against a plain Python evaluation of the same filters (--verify up
+to that many providers). --workers N starts N processes on the snapshot and
+reports how long mapping took and the memory each holds.
+
+With a database it loads the suite's synthetic directory and requests every
+scenario the index can answer, plus the cursor pages after them, with
+COLUMNAR_ENGINE on and off; the JSON bodies must be identical. Exits 1 on
+any difference.
+
+    python -m benchmarks.columnar_check --memory 100k 1M
+    python -m benchmarks.columnar_check --memory 1M --workers 8
+    DATABASE_URL=postgresql://... python -m benchmarks.columnar_check --providers 10k --throwaway
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from urllib.parse import parse_qs, quote
+
+from benchmarks.suite import FILTERS, scale, throwaway_database
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda",
+               "David", "Elizabeth", "Priya", "Wei", "Carlos", "Fatima", "Olga", "Kwame"]
+SORTS = ("name-asc", "name-desc", "experience", "rating")
+UNSUPPORTED = ("name", "near")
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def synthetic_rows(rng, count, children=3):
+    """Provider_Search rows shaped like columnar.LOAD_COLUMNS, plus name and rating keys."""
+    from benchmarks.synthetic import SPECIALTIES, CITIES, LANGUAGES, GENDERS
+
+    names, weights = [s for s, _ in SPECIALTIES], [w for _, w in SPECIALTIES]
+    rows = []
+    for number in range(count):
+        places = [rng.choice(CITIES) for _ in range(children)]
+        locations = []
+        for city, state, zip_prefix in places:
+            locations.extend([city, state, zip_prefix + "%02d" % rng.randint(0, 99)])
+        languages = set()
+        for _ in range(children):
+            languages.update(lang.lower() for lang in rng.sample(LANGUAGES, rng.randint(1, 3)))
+        affiliated = [rng.random() < 0.7 for _ in range(children)]
+        rows.append((
+            "%032x" % rng.getrandbits(128),
+            rng.choice(GENDERS),
+            rng.randint(0, 40) if rng.random() < 0.98 else -1,
+            sorted({rng.choice(["Yes", "No"]) for _ in range(children)}),
+            sorted({rng.choice(["Yes", "No"]) for _ in range(children)}),
+            sorted({rng.choice(["Yes", "No"]) for _ in range(children)}),
+            any(affiliated),
+            any(affiliated),
+            sorted(languages),
+            "\n".join(rng.choices(names, weights, k=children)),
+            "\n".join(locations),
+            rng.choice(FIRST_NAMES),
+            Decimal("%.2f" % rng.uniform(1, 5)) if rng.random() < 0.95 else Decimal(-1),
+        ))
+    return rows
+
+
+def python_orders(rows):
+    """INDEX_SORTS orders and keys, sorted in Python the way apply_sort sorts in SQL."""
+    keyed = {
+        "name-asc": (sorted(rows, key=lambda r: (r[11], r[0])), 11),
+        "experience": (sorted(rows, key=lambda r: (r[2], r[0]), reverse=True), 2),
+        "rating": (sorted(rows, key=lambda r: (r[12], r[0]), reverse=True), 12),
+    }
+    orders = {sort_by: [r[0] for r in ordered] for sort_by, (ordered, _) in keyed.items()}
+    keys = {sort_by: [r[column] for r in ordered] for sort_by, (ordered, column) in keyed.items()}
+    return orders, keys
+
+
+def python_matches(row, filters):
+    # search.search_conditions, one row at a time
+    if filters["gender"] and row[1] != filters["gender"]:
+        return False
+    if filters["minExperience"] > 0 and row[2] < filters["minExperience"]:
+        return False
+    for column, name in enumerate(("boardCertified", "acceptingNewPatients", "virtualCare"), start=3):
+        if filters[name] and ("Yes" if filters[name] == "true" else "No") not in row[column]:
+            return False
+    if filters["hospitalAffiliations"] == "true" and not row[6]:
+        return False
+    if filters["hospitalAffiliations"] and filters["hospitalAffiliations"] != "true" and row[7]:
+        return False
+    if filters["languagesSpoken"] and not set(filters["languagesSpoken"]) & set(row[8]):
+        return False
+    if filters["specialty"] and filters["specialty"] not in row[9].lower():
+        return False
+    if filters["location"] and filters["location"] not in row[10].lower():
+        return False
+    return True
+
+
+def memory_filters():
+    """Scenario name -> parsed filters, for every filter the index answers."""
+    from werkzeug.datastructures import MultiDict
+    from search import parse_filters
+
+    supported = {name: query for name, query in FILTERS.items() if name not in UNSUPPORTED}
+    queries = {"none": ""}
+    queries.update(supported)
+    queries["all filters"] = "&".join(supported.values())
+    return {name: parse_filters(MultiDict(parse_qs(query))) for name, query in queries.items()}
+
+
+def run_memory(sizes, verify, lookups, workers):
+    from columnar import ColumnarIndex, available
+
+    if not available():
+        print("numpy is not installed", file=sys.stderr)
+        sys.exit(2)
+
+    rng = random.Random(42)
+    failures = 0
+    directory = tempfile.mkdtemp(prefix="columnar_check")
+    print("%10s %-22s %-11s %9s %9s %9s %9s" % ("providers", "filters", "sortBy", "matches", "p50 us", "p99 us", "max us"))
+    for size in sizes:
+        rows = synthetic_rows(rng, size)
+        orders, keys = python_orders(rows)
+        start = time.perf_counter()
+        built = ColumnarIndex.from_rows(1, [row[:11] for row in rows], orders, keys)
+        print("%10d built in %.1fs, %.1f MiB" % (size, time.perf_counter() - start, built.nbytes() / 2 ** 20))
+
+        # Every search below runs on the index mapped back from its snapshot
+        path = os.path.join(directory, "columnar-%d.idx" % size)
+        start = time.perf_counter()
+        built.save(path)
+        saved = time.perf_counter() - start
+        del built
+        start = time.perf_counter()
+        index = ColumnarIndex.open(path)
+        print("%10d snapshot saved in %.2fs, mapped in %.1f ms" % (size, saved, (time.perf_counter() - start) * 1000))
+
+        for name, filters in memory_filters().items():
+            for sort_by in SORTS:
+                timings = []
+                for _ in range(lookups):
+                    start = time.perf_counter()
+                    words = index.matches(filters)
+                    total = index.count(words)
+                    page = index.page(words, total, sort_by, 0, 10)
+                    timings.append((time.perf_counter() - start) * 1e6)
+                timings.sort()
+                print("%10d %-22s %-11s %9d %9.0f %9.0f %9.0f" % (
+                    size, name[:22], sort_by, total, percentile(timings, 0.5), percentile(timings, 0.99), timings[-1]))
+
+                if size <= verify:
+                    failures += verify_page(index, rows, orders, filters, sort_by, total, page)
+
+        if workers:
+            worker_memory(path, workers)
+    shutil.rmtree(directory, ignore_errors=True)
+    return failures
+
+
+def _worker(path, ready, done, results):
+    # A fresh interpreter that maps the snapshot and runs every scenario once
+    from columnar import ColumnarIndex
+
+    before = _memory()
+    start = time.perf_counter()
+    index = ColumnarIndex.open(path)
+    opened = time.perf_counter() - start
+    for filters in memory_filters().values():
+        for sort_by in SORTS:
+            words = index.matches(filters)
+            index.page(words, index.count(words), sort_by, 0, 10)
+    after = _memory()
+    ready.set()
+    # Measured while every worker still maps the file
+    done.wait()
+    results.put((opened, after["Private"] - before["Private"], _memory()["Pss"]))
+
+
+def _memory():
+    """Private and proportional set size of this process, in kB (Linux)."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {"Private": fields["Private_Clean"] + fields["Private_Dirty"], "Pss": fields["Pss"]}
+
+
+def worker_memory(path, count):
+    """Start ``count`` worker processes on one snapshot and report what each holds."""
+    context = multiprocessing.get_context("spawn")
+    done, results = context.Event(), context.Queue()
+    started = []
+    for _ in range(count):
+        ready = context.Event()
+        process = context.Process(target=_worker, args=(path, ready, done, results))
+        process.start()
+        started.append((process, ready))
+    for _, ready in started:
+        ready.wait()
+    done.set()
+    measured = [results.get() for _ in started]
+    for process, _ in started:
+        process.join()
+    size = os.path.getsize(path) / 2 ** 20
+    print("%d workers on a %.1f MiB snapshot: mapped in %.1f ms (max), %.1f MiB private and %.1f MiB PSS each (max)" % (
+        count, size, max(m[0] for m in measured) * 1000,
+        max(m[1] for m in measured) / 1024, max(m[2] for m in measured) / 1024))
+
+
+def cursor_key(rows, sort_by, provider_id):
+    # The sort key pagination.encode_cursor would put in the cursor
+    row = next(row for row in rows if row[0] == provider_id)
+    if sort_by in ("name-asc", "name-desc"):
+        return row[11]
+    return Decimal(str(row[2] if sort_by == "experience" else row[12]))
+
+
+def verify_page(index, rows, orders, filters, sort_by, total, page):
+    """Compare ``page`` (and the pages after it) with a plain Python evaluation."""
+    matching = {row[0] for row in rows if python_matches(row, filters)}
+    order = orders["name-asc"][::-1] if sort_by == "name-desc" else orders[sort_by]
+    expected = [provider_id for provider_id in order if provider_id in matching]
+    found = index.provider_ids(page)
+    problems = []
+    if total != len(expected):
+        problems.append("total %d, expected %d" % (total, len(expected)))
+    if found != expected[:10]:
+        problems.append("first page differs")
+    # An offset page, and the page after a cursor on the 10th match
+    if index.provider_ids(index.page(index.matches(filters), total, sort_by, 30, 10)) != expected[30:40]:
+        problems.append("offset page differs")
+    if len(expected) > 10:
+        after = index.cursor_row(sort_by, {"id": expected[9], "key": cursor_key(rows, sort_by, expected[9])})
+        nxt = index.page(index.matches(filters), total, sort_by, 0, 10, after)
+        if after is None or index.provider_ids(nxt) != expected[10:20]:
+            problems.append("cursor page differs")
+    for problem in problems:
+        print("MISMATCH  %s sortBy=%s: %s" % (filters, sort_by, problem))
+    return len(problems)
+
+
+def run_database(args):
+    if args.throwaway:
+        os.environ["DATABASE_URL"] = throwaway_database(
+            os.environ.get("DATABASE_URL", "postgresql://postgres@localhost/omc"))
+    os.environ["RESPONSE_CACHE"] = "off"
+    os.environ["SEARCH_SOURCE"] = "denormalized"
+
+    from app import app, columnar_engine
+    from migrate import apply_migrations
+    from counting import COUNT_MODES
+    from benchmarks import synthetic
+
+    client = app.test_client()
+    failures = 0
+    with app.app_context():
+        apply_migrations()
+        if not args.no_load:
+            synthetic.load(args.providers, children=args.children)
+        start = time.perf_counter()
+        columnar_engine.load()
+        print("Index of %d providers loaded in %.1fs" % (columnar_engine.index.size, time.perf_counter() - start))
+
+        urls = []
+        for sort_by in SORTS:
+            base = "/api/providers?sortBy=%s" % sort_by
+            urls.append(base)
+            urls.extend("%s&%s" % (base, query) for name, query in FILTERS.items() if name not in UNSUPPORTED)
+            urls.append("%s&%s" % (base, "&".join(q for n, q in FILTERS.items() if n not in UNSUPPORTED)))
+        urls.extend("/api/providers?countMode=%s&%s" % (mode, FILTERS["specialty"]) for mode in COUNT_MODES
+                    if mode != "estimate")
+        urls.extend(["/api/providers?page=50", "/api/providers?sortBy=experience&page=7&per_page=25"])
+
+        checked = 0
+        while urls:
+            url = urls.pop(0)
+            app.config["COLUMNAR_ENGINE"] = False
+            expected = client.get(url)
+            app.config["COLUMNAR_ENGINE"] = True
+            searches = columnar_engine.stats()["searches"]
+            found = client.get(url)
+            checked += 1
+            if columnar_engine.stats()["searches"] == searches:
+                print("NOT ANSWERED BY THE INDEX  %s" % url)
+                failures += 1
+            elif found.get_data() != expected.get_data():
+                print("MISMATCH  %s" % url)
+                failures += 1
+            # Follow each scenario's first cursor once
+            cursor = (expected.get_json() or {}).get("nextCursor")
+            if cursor and "cursor=" not in url and "page=" not in url:
+                urls.append("%s&cursor=%s" % (url, quote(cursor)))
+    print("%d responses compared, %d difference(s)" % (checked, failures))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--memory", type=scale, nargs="+", help="index sizes to time without a database")
+    parser.add_argument("--verify", type=scale, default="100k", help="check results up to this many providers")
+    parser.add_argument("--lookups", type=int, default=200, help="timed searches per scenario")
+    parser.add_argument("--workers", type=int, default=0, help="processes mapping each snapshot, for memory")
+    parser.add_argument("--providers", type=scale, default="10k")
+    parser.add_argument("--children", type=int, default=3)
+    parser.add_argument("--throwaway", action="store_true", help='use "<database>_bench" on the same server')
+    parser.add_argument("--no-load", action="store_true", help="reuse the data already loaded")
+    args = parser.parse_args()
+
+    if args.memory:
+        failures = run_memory(args.memory, args.verify, args.lookups, args.workers)
+    else:
+        failures = run_database(args)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""asOf benchmark: effective-dated live searches against the unfiltered ones.
+
+For every filter of the benchmark suite (and none), runs the count and the
+first page of the live /api/providers queries (with the card's child
+collections) twice: with every dated child table limited to the rows valid
+on --as-of, and without that restriction, as before asOf existed. Reports
+p50 latency and table rows read (EXPLAIN ANALYZE) for each, plus
+Provider_Search's time for the same search, which answers searches as of
+its own date. Exits 1 when an asOf plan needs a sequential scan (or a
+filtered full index scan) that the unfiltered one does not.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.effective_dates --providers 100k --load
+    DATABASE_URL=postgresql://... python -m benchmarks.effective_dates --as-of 2021-06-01
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+from werkzeug.datastructures import MultiDict
+
+
+def parse_query(query):
+    return MultiDict([pair.split("=", 1) for pair in query.split("&") if pair])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--providers", default="10k", help="providers to load with --load (10k, 100k, 1M, ...)")
+    parser.add_argument("--load", action="store_true", help="replace the directory with synthetic data first")
+    parser.add_argument("--as-of", type=date.fromisoformat, default=date.today(), help="date to search as of")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--sort", default="rating", help="sortBy of the page queries")
+    args = parser.parse_args()
+
+    os.environ["RESPONSE_CACHE"] = "off"
+
+    from app import app
+    from models import db, ProviderInfo, ProviderSearch
+    from migrate import apply_migrations
+    from search import parse_filters, build_filtered_query, build_search_query
+    from search_table import advance_search_date
+    from geo import locate
+    from pagination import apply_sort
+    from counting import count_statement
+    from cards import CARD_FIELDS, card_plan
+    from benchmarks import synthetic
+    from benchmarks.suite import FILTERS, scale
+    from benchmarks.measure import StatementLog, percentile, rows_scanned
+    from benchmarks.explain_check import explain, fallback_scans, describe
+
+    def statements(model, build, filters):
+        query = build(filters)
+        plan = card_plan(model, CARD_FIELDS, filters["asOf"] if model is ProviderInfo else None)
+        page = apply_sort(query, model, args.sort, filters=filters).options(*plan.options).limit(10)
+        return count_statement(query), page
+
+    def run(model, build, filters):
+        count, page = statements(model, build, filters)
+        timings = []
+        for _ in range(args.repeat + 1):
+            start = time.perf_counter()
+            db.session.execute(count).scalar()
+            page.all()
+            timings.append((time.perf_counter() - start) * 1000)
+        with StatementLog(db.engine) as log:
+            db.session.execute(count).scalar()
+            page.all()
+        db.session.rollback()
+        # The first run warms up
+        return percentile(timings[1:], 0.5), rows_scanned(db.engine, log.statements)
+
+    def fallbacks(filters):
+        count, page = statements(ProviderInfo, build_filtered_query, filters)
+        found = {describe(node) for statement in (count, page.statement)
+                 for node in fallback_scans(explain(statement))}
+        db.session.rollback()
+        return found
+
+    scenarios = {"none": "", **FILTERS}
+    as_of = args.as_of.isoformat()
+    failed = False
+    with app.app_context():
+        apply_migrations()
+        if args.load:
+            start = time.perf_counter()
+            synthetic.load(scale(args.providers))
+            print("Loaded %s providers in %.0fs" % (args.providers, time.perf_counter() - start))
+        changed = advance_search_date(args.as_of)
+        print("Provider_Search as of %s (%d providers re-derived)" % (as_of, changed))
+
+        print("%-22s %12s %12s %8s %12s %12s %12s" % (
+            "filter", "live ms", "asOf ms", "change", "live rows", "asOf rows", "search ms"))
+        for name, query in scenarios.items():
+            unfiltered = parse_filters(parse_query(query))
+            locate(unfiltered, app.config["NEAR_MAX_RADIUS_MILES"])
+            dated = dict(unfiltered, asOf=as_of)
+
+            live_ms, live_rows = run(ProviderInfo, build_filtered_query, unfiltered)
+            dated_ms, dated_rows = run(ProviderInfo, build_filtered_query, dated)
+            search_ms, _ = run(ProviderSearch, build_search_query, dated)
+            print("%-22s %12.2f %12.2f %7.0f%% %12d %12d %12.2f" % (
+                name, live_ms, dated_ms, (dated_ms / live_ms - 1) * 100 if live_ms else 0,
+                live_rows, dated_rows, search_ms))
+
+            for scan in sorted(fallbacks(dated) - fallbacks(unfiltered)):
+                failed = True
+                print("       asOf adds: " + scan)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
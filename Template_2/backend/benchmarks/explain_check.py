@@ -0,0 +1,120 @@
+"""EXPLAIN-based index coverage check for /api/providers.
+
+Plans the count and page queries of every supported filter combination,
+on both the live tables and Provider_Search, with enable_seqscan off and
+fails if any of them still needs a sequential scan, or a full index scan
+with a row filter standing in for one. Either means an index from
+migrations/ is missing or no longer matches the SQL that search.py and
+pagination.py generate.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.explain_check
+"""
+import sys
+
+from werkzeug.datastructures import MultiDict
+
+from app import app
+from models import db, ProviderInfo, ProviderSearch
+from search import parse_filters, build_filtered_query, build_search_query
+from geo import locate
+from effective import resolve as resolve_as_of
+from pagination import SORT_KEYS, apply_sort
+from counting import id_query
+
+# Filter combinations the index set is expected to serve. Low-selectivity
+# flags (gender, boardCertified, ...) are always paired with a selective
+# filter: on their own a full scan is the right plan.
+COMBINATIONS = [
+    "name=smith",
+    "name=kim&gender=Female",
+    "specialty=cardio",
+    "location=newark",
+    "location=071",
+    "languagesSpoken=Spanish",
+    "languagesSpoken=Korean&languagesSpoken=Hindi",
+    "specialty=family&location=nj",
+    "name=lee&minExperience=10&boardCertified=true",
+    "specialty=pedi&acceptingNewPatients=true&virtualCare=true",
+    "location=ny&hospitalAffiliations=true",
+    "location=pa&hospitalAffiliations=false",
+    "languagesSpoken=Arabic&specialty=internal&location=new&minExperience=5",
+    "name=jon smith",
+    "specialty=cardiolgy&location=newark",
+    "lat=40.73&lon=-74.17&distance=10",
+    "lat=40.73&lon=-74.17&distance=25&specialty=family&languagesSpoken=Spanish",
+    "plan=Omnia",
+    "plan=Liberty&network=In Network&contractStatus=Active",
+    "network=Out of Network&contractStatus=Pending&specialty=cardio",
+]
+
+FULL_INDEX_SCANS = ("Index Scan", "Index Only Scan")
+
+
+def explain(statement):
+    compiled = statement.compile(dialect=db.engine.dialect)
+    connection = db.session.connection()
+    connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    return connection.exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+    ).scalar()[0]["Plan"]
+
+
+def fallback_scans(node):
+    if node["Node Type"] == "Seq Scan":
+        yield node
+    elif node["Node Type"] in FULL_INDEX_SCANS and "Filter" in node and "Index Cond" not in node:
+        yield node
+    for child in node.get("Plans", []):
+        yield from fallback_scans(child)
+
+
+def describe(node):
+    return "%s on %s%s" % (
+        node["Node Type"],
+        node.get("Relation Name", "?"),
+        " (filter: %s)" % node["Filter"] if "Filter" in node else "",
+    )
+
+
+# Both search paths: the live Provider_* tables and Provider_Search
+SOURCES = [("live", ProviderInfo, build_filtered_query), ("search", ProviderSearch, build_search_query)]
+
+
+def check(combination):
+    pairs = [pair.split("=", 1) for pair in combination.split("&")]
+    statements = {}
+    for source, model, build_query in SOURCES:
+        for sort_by in SORT_KEYS[model]:
+            # sortBy=relevance also changes how the text boxes match
+            filters = parse_filters(MultiDict(pairs + [("sortBy", sort_by)]))
+            locate(filters, app.config["NEAR_MAX_RADIUS_MILES"])
+            resolve_as_of(filters, app.config["DIRECTORY_TIMEZONE"])
+            if sort_by == "distance" and not filters["center"]:
+                continue
+            query = build_query(filters)
+            count = "%s count%s" % (source, " (relevance)" if filters["relevance"] else "")
+            statements[count] = id_query(query).statement
+            statements["%s %s" % (source, sort_by)] = apply_sort(query, model, sort_by, filters=filters).limit(10).statement
+
+    problems = []
+    for label, statement in statements.items():
+        for node in fallback_scans(explain(statement)):
+            problems.append("%s: %s" % (label, describe(node)))
+    db.session.rollback()
+    return problems
+
+
+def main():
+    failed = False
+    with app.app_context():
+        for combination in COMBINATIONS:
+            problems = check(combination)
+            failed |= bool(problems)
+            print("%-4s %s" % ("ok" if not problems else "FAIL", combination))
+            for problem in problems:
+                print("       " + problem)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Memory benchmark for the full directory export (export.py).
+
+Loads synthetic directories of increasing size and streams the whole export
+for each, reporting throughput and the peak Python memory allocated while
+streaming. The peak should stay flat as the directory grows.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.export_memory --providers 1000 10000 100000
+"""
+import argparse
+import time
+import tracemalloc
+
+from app import app
+from migrate import apply_migrations
+from export import EXPORT_FORMATS, export_directory
+from benchmarks import synthetic
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--providers", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--children", type=int, default=2, help="rows per provider in each child table")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--source", choices=["denormalized", "live"], default=app.config["SEARCH_SOURCE"])
+    args = parser.parse_args()
+
+    print("%10s %12s %10s %14s" % ("providers", "bytes", "rows/s", "peak KiB"))
+    with app.app_context():
+        apply_migrations()
+        for providers in args.providers:
+            synthetic.load(providers, children=args.children)
+            tracemalloc.start()
+            start = time.perf_counter()
+            size = 0
+            for chunk in export_directory(args.format, args.source, app.config["EXPORT_CHUNK_SIZE"],
+                                          app.config["DIRECTORY_TIMEZONE"], args.gzip):
+                size += len(chunk)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print("%10d %12d %10.0f %14.0f" % (providers, size, providers / elapsed, peak / 1024))
+
+
+if __name__ == "__main__":
+    main()
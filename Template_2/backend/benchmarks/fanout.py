@@ -0,0 +1,101 @@
+"""Join fan-out regression benchmark for /api/providers.
+
+Loads a synthetic directory where every provider has several rows in each
+child table, then runs filter/sort combinations that touch the same child
+table more than once. Each scenario pages through the whole result with
+cursors and fails if a provider appears twice or `total` disagrees with
+the number of distinct providers returned, or, with --budget-ms, if a
+scenario's first page is slower than the budget.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.fanout --providers 1000 --children 6
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from app import app, count_cache, response_cache
+from migrate import apply_migrations
+from benchmarks import synthetic
+
+SCENARIOS = [
+    "",
+    "minExperience=10&boardCertified=true",
+    "acceptingNewPatients=true&virtualCare=true",
+    "sortBy=experience&minExperience=5&boardCertified=false",
+    "sortBy=rating&location=nj&specialty=medicine",
+    "languagesSpoken=Spanish&languagesSpoken=Hindi&hospitalAffiliations=true",
+    "hospitalAffiliations=false&sortBy=name-asc",
+    "specialty=family&location=new&acceptingNewPatients=true&virtualCare=false"
+    "&minExperience=3&boardCertified=true&languagesSpoken=English&sortBy=experience",
+    "sortBy=relevance&name=smith",
+    "sortBy=relevance&specialty=cardiolgy&location=new york",
+    "sortBy=distance&lat=40.73&lon=-74.17&distance=25",
+    "sortBy=distance&lat=40.73&lon=-74.17&distance=50&specialty=family&languagesSpoken=Spanish",
+]
+
+
+def walk(client, query, per_page):
+    ids, cursor, total = [], None, None
+    while True:
+        url = "/api/providers?countMode=exact&per_page=%d&%s" % (per_page, query)
+        if cursor:
+            url += "&cursor=" + cursor
+        data = client.get(url).get_json()
+        if total is None:
+            total = data["total"]
+        ids.extend(p["id"] for p in data["providers"])
+        cursor = data["nextCursor"]
+        if not cursor:
+            return total, ids
+
+
+def first_page_ms(client, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        count_cache.clear()
+        if response_cache is not None:
+            response_cache.clear()
+        start = time.perf_counter()
+        client.get("/api/providers?countMode=exact&" + query)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--providers", type=int, default=1000)
+    parser.add_argument("--children", type=int, default=6, help="rows per provider in each child table")
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-load", action="store_true", help="reuse the data already loaded")
+    parser.add_argument("--source", choices=["denormalized", "live"], default=app.config["SEARCH_SOURCE"])
+    parser.add_argument("--budget-ms", type=float, help="fail scenarios whose first-page p50 exceeds this")
+    args = parser.parse_args()
+
+    app.config["SEARCH_SOURCE"] = args.source
+    client = app.test_client()
+    with app.app_context():
+        apply_migrations()
+        if not args.no_load:
+            synthetic.load(args.providers, children=args.children)
+
+    failed = False
+    print("%-100s %7s %7s %6s %9s" % ("scenario", "total", "rows", "dupes", "p50 ms"))
+    for query in SCENARIOS:
+        total, ids = walk(client, query, args.per_page)
+        dupes = len(ids) - len(set(ids))
+        p50 = first_page_ms(client, query, args.repeat)
+        problem = ""
+        if dupes or total != len(ids):
+            problem = "  FAN-OUT"
+        elif args.budget_ms is not None and p50 > args.budget_ms:
+            problem = "  OVER BUDGET"
+        failed |= bool(problem)
+        print("%-100s %7d %7d %6d %9.1f%s" % (query or "(no filters)", total, len(ids), dupes, p50, problem))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Request measurements shared by the benchmark suite (suite.py, template1.py).
+
+Imports nothing from either backend, so it works with Template_1's app as
+well as this one.
+"""
+import time
+
+from sqlalchemy import event
+
+# Plan nodes that read table rows, for rowsScanned
+SCAN_NODES = ("Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan", "Tid Scan")
+
+
+class StatementLog:
+    """Records every statement ``engine`` executes while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+def _scanned(node):
+    rows = 0
+    if node["Node Type"] in SCAN_NODES:
+        loops = node.get("Actual Loops", 1)
+        rows += (node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)
+                 + node.get("Rows Removed by Index Recheck", 0)) * loops
+    for child in node.get("Plans", []):
+        rows += _scanned(child)
+    return rows
+
+
+def rows_scanned(engine, statements):
+    """Table rows read by ``statements``, re-run under EXPLAIN ANALYZE (reads only)."""
+    total = 0
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+                continue
+            plan = connection.exec_driver_sql("EXPLAIN (ANALYZE, FORMAT JSON) " + statement, parameters).scalar()
+            total += _scanned(plan[0]["Plan"])
+        connection.rollback()
+    return total
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(client, engine, url, repeat, before=None):
+    """Latency percentiles (ms), statements per request and rows scanned for one GET.
+
+    ``before()`` runs ahead of every timed request (to clear caches the
+    scenario should not benefit from). One untimed request warms up; one
+    more records the statements for the counts.
+    """
+    if before:
+        before()
+    status = client.get(url).status_code
+    timings = []
+    for _ in range(repeat):
+        if before:
+            before()
+        start = time.perf_counter()
+        client.get(url)
+        timings.append((time.perf_counter() - start) * 1000)
+    if before:
+        before()
+    with StatementLog(engine) as log:
+        client.get(url)
+    return {
+        "status": status,
+        "p50": round(percentile(timings, 0.50), 3),
+        "p95": round(percentile(timings, 0.95), 3),
+        "p99": round(percentile(timings, 0.99), 3),
+        "statements": len(log.statements),
+        "rowsScanned": rows_scanned(engine, log.statements),
+    }
@@ -0,0 +1,109 @@
+"""Throughput benchmark for the production server (gunicorn.conf.py).
+
+Starts gunicorn once per worker count, drives it with a fixed number of
+concurrent keep-alive clients for a few seconds, and reports requests per
+second and latency percentiles. The response cache is switched off so every
+request runs its queries; the database is whatever DATABASE_URL points at.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.serving --workers 1 2 4 --clients 16
+"""
+import argparse
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = [
+    "/api/providers?countMode=exact",
+    "/api/providers?specialty=family&location=new&sortBy=rating",
+    "/api/providers?languagesSpoken=Spanish&minExperience=5&sortBy=experience",
+    "/config",
+]
+
+
+def start_server(port, workers, threads, pool_size):
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads),
+               GUNICORN_BIND="127.0.0.1:%d" % port, DB_POOL_SIZE=str(pool_size),
+               DB_MAX_OVERFLOW="0", RESPONSE_CACHE="off")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--access-logfile", "/dev/null"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            connection.request("GET", "/")
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("gunicorn did not start")
+
+
+def client(port, stop_at, latencies, errors):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    i = 0
+    while time.monotonic() < stop_at:
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def run(port, clients, seconds):
+    latencies, errors = [], []
+    stop_at = time.monotonic() + seconds
+    threads = [threading.Thread(target=client, args=(port, stop_at, latencies, errors))
+               for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=4, help="GUNICORN_THREADS per worker")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent client connections")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=5099)
+    args = parser.parse_args()
+
+    print("%8s %8s %8s %10s %8s %8s %7s" % ("workers", "threads", "db conn", "req/s", "p50 ms", "p99 ms", "errors"))
+    for workers in args.workers:
+        server = start_server(args.port, workers, args.threads, pool_size=args.threads)
+        try:
+            run(args.port, args.clients, 1)  # warm up every worker
+            latencies, errors = run(args.port, args.clients, args.seconds)
+        finally:
+            server.terminate()
+            server.wait()
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+        print("%8d %8d %8d %10.1f %8.1f %8.1f %7d" % (
+            workers, args.threads, workers * args.threads, len(latencies) / args.seconds,
+            statistics.median(latencies) if latencies else 0, p99, len(errors)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Latency and memory benchmark for the typeahead index (suggest.py).
+
+Builds a TermIndex from synthetic terms with skewed weights, at each of the
+given sizes, and times lookups for random 1-4 character prefixes of existing
+terms (each prefix looked up twice, as consecutive keystrokes repeat
+prefixes). Reports build time, bytes held and lookup p50/p99/max in
+microseconds. Needs no database.
+
+    python -m benchmarks.suggest_latency --terms 10000 100000 500000
+"""
+import argparse
+import random
+import string
+import time
+
+from suggest import TermIndex
+
+
+def synthetic_terms(rng, count):
+    terms = set()
+    while len(terms) < count:
+        length = rng.randint(4, 12)
+        terms.add(rng.choice(string.ascii_uppercase) + "".join(rng.choices(string.ascii_lowercase, k=length)))
+    # Zipf-like: a few terms carry most rows, as specialties and cities do
+    return [(term, max(1, int(10000 / (rank + 1)))) for rank, term in enumerate(sorted(terms, key=lambda _: rng.random()))]
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--terms", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print("%10s %10s %12s %10s %10s %10s" % ("terms", "build s", "KiB", "p50 us", "p99 us", "max us"))
+    for count in args.terms:
+        counts = synthetic_terms(rng, count)
+        start = time.perf_counter()
+        index = TermIndex(counts)
+        build = time.perf_counter() - start
+
+        prefixes = [term[:rng.randint(1, 4)].casefold() for term, _ in rng.choices(counts, k=args.lookups // 2)]
+        timings = []
+        for prefix in prefixes + prefixes:
+            start = time.perf_counter()
+            index.top(prefix, args.limit)
+            timings.append((time.perf_counter() - start) * 1e6)
+        timings.sort()
+        print("%10d %10.2f %12.0f %10.1f %10.1f %10.1f" % (
+            count, build, index.nbytes() / 1024,
+            percentile(timings, 0.5), percentile(timings, 0.99), timings[-1]))
+
+
+if __name__ == "__main__":
+    main()
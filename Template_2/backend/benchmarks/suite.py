@@ -0,0 +1,233 @@
+"""Benchmark suite for the search API, with a JSON baseline to catch regressions.
+
+Loads a synthetic directory (benchmarks/synthetic.py) and measures every
+/api/providers sort on its own, with each filter, and with all filters at
+once, plus count modes, deep and cursor pages, sparse fieldsets, /config
+(warm and cold) and Template_1's provider list. For each scenario it records
+latency p50/p95/p99 (ms, in-process through the Flask test client, caches
+that would hide the queries cleared), SQL statements per request and table
+rows read (from EXPLAIN ANALYZE of those statements).
+
+The first run for a scale and source saves a baseline; later runs compare
+against it and exit 1 when a scenario got slower than --tolerance (and by
+more than --noise-ms), runs more statements, reads more rows, or is
+missing. A set of scenarios that fails to run (Template_1's) exits 1
+without saving or comparing anything.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.suite --providers 10k --throwaway
+    DATABASE_URL=postgresql://... python -m benchmarks.suite --providers 10k --throwaway --no-load
+    DATABASE_URL=postgresql://... python -m benchmarks.suite --providers 100k --save-baseline
+
+With --throwaway the data goes into a separate "<database>_bench" database
+on the same server (created when missing); otherwise DATABASE_URL itself
+must be a throwaway database, since loading replaces every Provider_* row.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE1_DIR = os.path.join(BENCH_DIR, "..", "..", "..", "Template_1", "backend")
+
+# What Template_1's models map beyond this template's schema; added to the
+# benchmark database before its scenarios run
+TEMPLATE1_SCHEMA = 'ALTER TABLE "Provider_Info" ADD COLUMN IF NOT EXISTS "ProviderImage" varchar'
+
+SCALES = {"k": 1000, "m": 1000000}
+
+# One representative value per /api/providers filter
+FILTERS = {
+    "name": "name=smith",
+    "specialty": "specialty=cardio",
+    "location": "location=newark",
+    "zip": "location=071",
+    "gender": "gender=Female",
+    "minExperience": "minExperience=10",
+    "boardCertified": "boardCertified=true",
+    "acceptingNewPatients": "acceptingNewPatients=true",
+    "virtualCare": "virtualCare=true",
+    "hospitalAffiliations": "hospitalAffiliations=false",
+    "languagesSpoken": "languagesSpoken=Spanish",
+    "near": "lat=40.73&lon=-74.17&distance=25",
+    "availableAt": "availableDay=Tue&availableTime=10:30",
+    "notOnLeave": "notOnLeaveFrom=2026-11-02&notOnLeaveTo=2026-11-06",
+    "plan": "plan=Omnia&network=In Network",
+}
+
+
+def scale(value):
+    """``10000``, ``10k`` or ``1M``."""
+    value = value.strip().lower()
+    if value[-1:] in SCALES:
+        return int(float(value[:-1]) * SCALES[value[-1]])
+    return int(value)
+
+
+def throwaway_database(url):
+    """``url`` with its database replaced by "<database>_bench", created if missing."""
+    url = make_url(url)
+    bench = url.set(database="%s_bench" % url.database)
+    engine = create_engine(url, isolation_level="AUTOCOMMIT")
+    try:
+        with engine.connect() as connection:
+            exists = connection.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                                        {"name": bench.database}).scalar()
+            if not exists:
+                connection.exec_driver_sql('CREATE DATABASE "%s"' % bench.database)
+    finally:
+        engine.dispose()
+    return bench.render_as_string(hide_password=False)
+
+
+def scenarios(sort_keys, count_modes):
+    """Scenario name -> /api/providers URL."""
+    urls = {}
+    for sort_by in sort_keys:
+        base = "/api/providers?sortBy=%s" % sort_by
+        urls["sortBy=%s" % sort_by] = base
+        for name, query in FILTERS.items():
+            urls["sortBy=%s %s" % (sort_by, name)] = "%s&%s" % (base, query)
+        urls["sortBy=%s all filters" % sort_by] = "%s&%s" % (base, "&".join(FILTERS.values()))
+    for mode in count_modes:
+        urls["countMode=%s" % mode] = "/api/providers?countMode=%s" % mode
+        urls["countMode=%s specialty" % mode] = "/api/providers?countMode=%s&%s" % (mode, FILTERS["specialty"])
+    urls["page=50"] = "/api/providers?page=50"
+    urls["fields=card summary"] = "/api/providers?fields=id,firstName,lastName,specialtyName,city,rating"
+    return urls
+
+
+def run_template1(repeat, env):
+    """Template_1's measurements, or None (the error printed) when its scenarios failed."""
+    script = os.path.join(BENCH_DIR, "template1.py")
+    result = subprocess.run([sys.executable, script, "--repeat", str(repeat)], cwd=TEMPLATE1_DIR,
+                            env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        print("Template_1 scenarios failed:\n" + result.stderr, file=sys.stderr)
+        return None
+    return json.loads(result.stdout)
+
+
+def compare(baseline, results, tolerance, noise_ms):
+    """(scenario, problem) pairs for every regression against ``baseline``."""
+    problems = [(name, "missing from this run") for name in baseline if name not in results]
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if now["status"] != before["status"]:
+            problems.append((name, "status %s -> %s" % (before["status"], now["status"])))
+        for key in ("p50", "p95"):
+            if now[key] > before[key] * (1 + tolerance) and now[key] - before[key] > noise_ms:
+                problems.append((name, "%s %.1f -> %.1f ms" % (key, before[key], now[key])))
+        if now["statements"] > before["statements"]:
+            problems.append((name, "statements %d -> %d" % (before["statements"], now["statements"])))
+        if now["rowsScanned"] > before["rowsScanned"] * (1 + tolerance):
+            problems.append((name, "rows scanned %d -> %d" % (before["rowsScanned"], now["rowsScanned"])))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--providers", type=scale, default="10k", help="10k, 100k, 1M, ...")
+    parser.add_argument("--children", type=int, default=3, help="rows per provider in each child table")
+    parser.add_argument("--repeat", type=int, default=20, help="timed requests per scenario")
+    parser.add_argument("--source", choices=["denormalized", "live"], default="denormalized")
+    parser.add_argument("--throwaway", action="store_true", help='use "<database>_bench" on the same server')
+    parser.add_argument("--no-load", action="store_true", help="reuse the data already loaded")
+    parser.add_argument("--baseline", help="baseline file (default benchmarks/baselines/<providers>-<source>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed growth, as a fraction")
+    parser.add_argument("--noise-ms", type=float, default=2.0, help="latency changes below this are ignored")
+    parser.add_argument("--skip-template1", action="store_true")
+    args = parser.parse_args()
+
+    # The app reads its settings on import: point it at the benchmark
+    # database and switch off the response cache first
+    if args.throwaway:
+        os.environ["DATABASE_URL"] = throwaway_database(
+            os.environ.get("DATABASE_URL", "postgresql://postgres@localhost/omc"))
+    os.environ["RESPONSE_CACHE"] = "off"
+    os.environ["SEARCH_SOURCE"] = args.source
+
+    from app import app, count_cache, brand_cache
+    from models import db, ProviderInfo, ProviderSearch
+    from migrate import apply_migrations
+    from pagination import SORT_KEYS
+    from counting import COUNT_MODES
+    from benchmarks import synthetic
+    from benchmarks.measure import measure
+
+    client = app.test_client()
+    with app.app_context():
+        apply_migrations()
+        if not args.no_load:
+            start = time.perf_counter()
+            synthetic.load(args.providers, children=args.children)
+            print("Loaded %d providers in %.0fs" % (args.providers, time.perf_counter() - start))
+
+        if not args.skip_template1:
+            db.session.execute(text(TEMPLATE1_SCHEMA))
+            db.session.commit()
+
+        model = ProviderInfo if args.source == "live" else ProviderSearch
+        urls = scenarios(SORT_KEYS[model], COUNT_MODES)
+        for sort_by in ("rating", "name-asc"):
+            first = client.get("/api/providers?sortBy=%s" % sort_by).get_json()
+            if first.get("nextCursor"):
+                urls["sortBy=%s cursor page 2" % sort_by] = "/api/providers?sortBy=%s&cursor=%s" % (
+                    sort_by, quote(first["nextCursor"]))
+
+        results = {}
+        for name, url in urls.items():
+            results[name] = measure(client, db.engine, url, args.repeat, count_cache.clear)
+        results["/config"] = measure(client, db.engine, "/config", args.repeat)
+        results["/config cold"] = measure(client, db.engine, "/config", args.repeat, brand_cache.clear)
+
+    failed = []
+    if not args.skip_template1:
+        template1 = run_template1(args.repeat, dict(os.environ))
+        if template1 is None:
+            failed.append("Template_1")
+        else:
+            results.update(template1)
+
+    print("%-64s %6s %8s %8s %8s %5s %12s" % ("scenario", "status", "p50 ms", "p95 ms", "p99 ms", "stmts", "rows"))
+    for name, r in results.items():
+        print("%-64s %6d %8.1f %8.1f %8.1f %5d %12d" % (
+            name[:64], r["status"], r["p50"], r["p95"], r["p99"], r["statements"], r["rowsScanned"]))
+
+    if failed:
+        # A baseline or comparison without them would hide the failure
+        print("Scenarios failed: %s" % ", ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+    meta = {"providers": args.providers, "children": args.children, "source": args.source, "repeat": args.repeat}
+    path = args.baseline or os.path.join(BENCH_DIR, "baselines", "%d-%s.json" % (args.providers, args.source))
+    if args.save_baseline or not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"meta": meta, "scenarios": results}, f, indent=2, sort_keys=True)
+        print("Baseline saved to %s" % path)
+        return
+
+    with open(path) as f:
+        baseline = json.load(f)
+    if baseline["meta"] != meta:
+        print("Baseline %s was recorded with %s, not %s" % (path, baseline["meta"], meta), file=sys.stderr)
+        sys.exit(2)
+    problems = compare(baseline["scenarios"], results, args.tolerance, args.noise_ms)
+    for name, problem in problems:
+        print("REGRESSION  %-64s %s" % (name, problem))
+    print("%d regression(s) against %s" % (len(problems), path))
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Synthetic provider directory for benchmarks.
+
+Generates Provider_* rows with several children per provider and bulk
+loads them with COPY. Point DATABASE_URL at a throwaway database: loading
+truncates every Provider_* table first.
+"""
+import csv
+import io
+import random
+from datetime import date, timedelta
+from uuid import UUID
+
+from models import (
+    db, ProviderInfo, ProviderAddress, ProviderCommunication, ProviderSpeciality,
+    ProviderCertification, ProviderLanguage, ProviderLocation, ProviderInsurance,
+    ProviderAffiliation, ProviderLicense, ProviderVisitMode, ProviderRatings,
+    ProviderLeaveSchedule, ProviderWorkingHours
+)
+
+FIRST_NAMES = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda",
+               "David", "Elizabeth", "Priya", "Wei", "Carlos", "Fatima", "Olga", "Kwame"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+              "Patel", "Nguyen", "Kim", "Lopez", "Harris", "Clark", "Lewis", "Walker"]
+PROVIDER_TYPES = ["Physician", "Dentist", "Pediatrician", "Nurse Practitioner", "Therapist"]
+GENDERS = ["Male", "Female", "Other"]
+# (name, relative weight) - a few specialties dominate, like a real directory
+SPECIALTIES = [
+    ("Family Medicine", 30), ("Internal Medicine", 25), ("Pediatrics", 15),
+    ("General Practice", 10), ("Cardiology", 5), ("Dermatology", 4),
+    ("Orthopedic Surgery", 3), ("Psychiatry", 3), ("Neurology", 2),
+    ("Oncology", 1), ("Endocrinology", 1), ("Rheumatology", 1),
+]
+CITIES = [
+    ("Newark", "NJ", "071"), ("Jersey City", "NJ", "073"), ("Trenton", "NJ", "086"),
+    ("New York", "NY", "100"), ("Buffalo", "NY", "142"), ("Philadelphia", "PA", "191"),
+    ("Pittsburgh", "PA", "152"), ("Boston", "MA", "021"), ("Hartford", "CT", "061"),
+]
+LANGUAGES = ["English", "Spanish", "Hindi", "Korean", "Arabic", "Portuguese", "Chinese", "French"]
+PLANS = ["DIRECT ACCESS", "CWA UNITY DIRECT", "EPO/EPO PLUS", "ADVANTAGE EPO NJPA",
+         "OMNIA", "LIBERTY", "MEDICARE ADVANTAGE", "HMO SELECT"]
+INSURERS = ["Blue Cross", "Aetna", "Cigna", "Kaiser Permanente", "UnitedHealthcare"]
+HOSPITALS = ["Newark General Hospital", "Trinitas Regional Medical Center",
+             "Mercy Hospital", "St. Mary's Medical Center", "University Hospital"]
+BOARDS = ["American Board of Pediatrics", "American Board of Internal Medicine",
+          "American Board of Family Medicine"]
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat"]
+# Provider_WorkingHours spans (DayOfWeek, start, end) for the providers that have them
+SHIFTS = [("Mon-Fri", "08:00", "17:00"), ("Mon-Thu", "07:30", "16:00"), ("Sat", "09:00", "12:00"),
+          ("Tue,Thu", "12:00", "20:00"), ("Fri-Sun", "22:00", "06:00")]
+LEAVE_PATTERNS = ["Weekly", "Monthly", "Yearly"]
+
+# Parents first so foreign keys are satisfied while loading
+TABLES = [
+    ProviderInfo, ProviderLocation, ProviderAddress, ProviderCommunication,
+    ProviderSpeciality, ProviderCertification, ProviderLanguage, ProviderInsurance,
+    ProviderAffiliation, ProviderLicense, ProviderVisitMode, ProviderRatings,
+    ProviderLeaveSchedule, ProviderWorkingHours,
+]
+
+
+def _uuid(rng):
+    return str(UUID(int=rng.getrandbits(128), version=4))
+
+
+def _date(rng, start_year=2010, span_days=5000):
+    return date(start_year, 1, 1) + timedelta(days=rng.randrange(span_days))
+
+
+def _end_date(rng):
+    # Most windows stay open; the rest end somewhere between 2020 and 2030,
+    # so searches as of different dates see different rows
+    return _date(rng, start_year=2020, span_days=3650) if rng.random() < 0.2 else None
+
+
+def _array(values):
+    return "{" + ",".join('"%s"' % v for v in values) + "}"
+
+
+def generate_provider(rng, children):
+    """Return ``{Model: [row, ...]}`` for one provider.
+
+    ``children`` is the number of rows in each fan-out child table (addresses,
+    certifications, visit modes, languages, ratings, ...).
+    """
+    pid = _uuid(rng)
+    specialty_names = [s for s, _ in SPECIALTIES]
+    specialty_weights = [w for _, w in SPECIALTIES]
+    rows = {model: [] for model in TABLES}
+
+    rows[ProviderInfo].append({
+        "ProviderID": pid,
+        "ProviderFirstName": rng.choice(FIRST_NAMES),
+        "ProviderMiddleInitial": rng.choice("ABCDEFGHJKLMNPRSTW"),
+        "ProviderLastName": rng.choice(LAST_NAMES),
+        "ProviderType": rng.choice(PROVIDER_TYPES),
+        "ProviderGender": rng.choice(GENDERS),
+        "ProviderAge": rng.randint(28, 75),
+        "ProviderNPI": str(rng.randrange(10 ** 9, 10 ** 10)),
+    })
+
+    for _ in range(children):
+        location_id = _uuid(rng)
+        city, state, zip_prefix = rng.choice(CITIES)
+        rows[ProviderLocation].append({
+            "ProviderLocationID": location_id,
+            "ProviderID": pid,
+            "ProviderAvailabilityDayOfWeek": _array(rng.sample(DAYS, 3)),
+            "ProviderAvailabilityStartTime": "%02d:00" % rng.randint(7, 10),
+            "ProviderAvailabilityEndTime": "%02d:30" % rng.randint(16, 19),
+        })
+        rows[ProviderAddress].append({
+            "AddressID": _uuid(rng),
+            "ProviderID": pid,
+            "ProviderAddressType": rng.choice(["Mailing", "Practice"]),
+            "ProviderAddressLine1": "%d Main St" % rng.randint(1, 9999),
+            "ProviderCity": city,
+            "ProviderState": state,
+            "ProviderCountry": "United States",
+            "ProviderZIPCode": zip_prefix + "%02d" % rng.randint(0, 99),
+            "ProviderLatitude": round(rng.uniform(38.9, 42.5), 6),
+            "ProviderLongitude": round(rng.uniform(-80.0, -71.0), 6),
+        })
+        rows[ProviderCommunication].append({
+            "CommunicationID": _uuid(rng),
+            "ProviderID": pid,
+            "ProviderContactType": "Telephone",
+            "ProviderPhoneNo": "%03d-%03d-%04d" % (rng.randint(200, 999), rng.randint(0, 999), rng.randint(0, 9999)),
+            "ProviderEmail": "provider%d@example.com" % rng.randint(0, 10 ** 6),
+        })
+        rows[ProviderSpeciality].append({
+            "SpecialityID": _uuid(rng),
+            "ProviderID": pid,
+            "ProviderSpecialityType": rng.choice(["Primary", "Secondary"]),
+            "ProviderSpecialityName": rng.choices(specialty_names, specialty_weights)[0],
+            "ProviderSpecialityStartDate": _date(rng),
+            "ProviderSpecialityEndDate": date(9999, 12, 31),
+        })
+        rows[ProviderCertification].append({
+            "CertificationID": _uuid(rng),
+            "ProviderID": pid,
+            "ProviderBoardCertified": rng.choice(["Yes", "No"]),
+            "ProviderCertificateIssueDate": _date(rng),
+            "ProviderCertificateExpiryDate": _end_date(rng),
+            "ProviderDegree": rng.choice(["MD", "DO", "MBBS"]),
+            "ProviderBoardName": rng.choice(BOARDS),
+            "ProviderYearsOfExperience": rng.randint(0, 40),
+        })
+        rows[ProviderLanguage].append({
+            "LanguageRecordID": _uuid(rng),
+            "ProviderID": pid,
+            "LocationID": location_id,
+            "ProviderLanguage": _array(rng.sample(LANGUAGES, rng.randint(1, 3))),
+            "ProviderLanguageStartDate": _date(rng),
+            "ProviderLanguageEndDate": _end_date(rng),
+        })
+        rows[ProviderInsurance].append({
+            "InsuranceRecordID": _uuid(rng),
+            "ProviderID": pid,
+            "LocationID": location_id,
+            "ProviderInsuranceName": rng.choice(INSURERS),
+            "ProviderPlanName": _array(rng.sample(PLANS, rng.randint(1, 4))),
+            "ProviderNetworkType": rng.choice(["In Network", "Out of Network"]),
+            "ProviderPlanStartDate": _date(rng),
+            "ProviderPlanEndDate": _end_date(rng),
+            "ProviderContractStatus": rng.choice(["Active", "Pending", "Terminated"]),
+        })
+        if rng.random() < 0.7:
+            rows[ProviderAffiliation].append({
+                "AffiliationID": _uuid(rng),
+                "ProviderID": pid,
+                "ProviderAffliated": "Yes",
+                "ProviderAffiliationName": rng.choice(HOSPITALS),
+                "ProviderAffiliationType": rng.choice(["Hospital", "Clinic"]),
+                "ProviderAffiliationStartDate": _date(rng),
+                "ProviderAffiliationEndDate": _end_date(rng),
+            })
+        rows[ProviderLicense].append({
+            "LicenseRecordID": _uuid(rng),
+            "ProviderID": pid,
+            "LicenseNumber": str(rng.randrange(10 ** 7)),
+            "LicenseState": state,
+            "IssueDate": _date(rng),
+            "Status": "Active",
+        })
+        rows[ProviderVisitMode].append({
+            "VisitModeID": _uuid(rng),
+            "ProviderID": pid,
+            "LocationID": location_id,
+            "Acceptingnewpatients": rng.choice(["Yes", "No"]),
+            "VirtualCare": rng.choice(["Yes", "No"]),
+            "VisitMode": rng.choice(["In-person", "Telehealth"]),
+        })
+        rows[ProviderRatings].append({
+            "RatingID": _uuid(rng),
+            "ProviderID": pid,
+            "RatingSourceName": rng.choice(["Vitals", "Healthgrades", "Internal Audit"]),
+            "RatingType": "Patient",
+            "RatingValue": round(rng.uniform(1, 5), 1),
+            "RatingStartDate": _date(rng),
+        })
+
+    # A third of the providers keep explicit working hours; the rest fall
+    # back to their locations' availability
+    if rng.random() < 0.3:
+        for day_of_week, start, end in rng.sample(SHIFTS, rng.randint(1, 2)):
+            rows[ProviderWorkingHours].append({
+                "WorkingHourID": _uuid(rng),
+                "ProviderID": pid,
+                "LocationID": location_id,
+                "DayOfWeek": day_of_week,
+                "StartTime": start,
+                "EndTime": end,
+                "IsActive": rng.random() < 0.9,
+            })
+    if rng.random() < 0.2:
+        start = _date(rng, start_year=2024, span_days=1200)
+        recurring = rng.random() < 0.25
+        rows[ProviderLeaveSchedule].append({
+            "LeaveID": _uuid(rng),
+            "ProviderID": pid,
+            "LocationID": location_id,
+            "LeaveType": rng.choice(["Vacation", "Conference", "Medical"]),
+            "LeaveStartDate": start,
+            "LeaveEndDate": start + timedelta(days=rng.randint(0, 14)),
+            "IsRecurring": recurring,
+            "RecurringPattern": rng.choice(LEAVE_PATTERNS) if recurring else None,
+        })
+    return rows
+
+
+def _copy(cursor, model, rows):
+    columns = [c.name for c in model.__table__.columns]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row.get(c) for c in columns])
+    buffer.seek(0)
+    cursor.copy_expert(
+        'COPY "%s" (%s) FROM STDIN WITH (FORMAT csv)'
+        % (model.__tablename__, ", ".join('"%s"' % c for c in columns)),
+        buffer
+    )
+
+
+def load(providers, children=5, seed=42, chunk_size=5000, progress=None):
+    """Replace the directory with ``providers`` synthetic providers.
+
+    Must run inside an app context, after migrations. Rows are generated and
+    copied in chunks, so memory stays bounded whatever the scale; the
+    Provider_Search triggers are deferred and the table rebuilt once at the end.
+    """
+    rng = random.Random(seed)
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SET provider_search.defer = on")
+        cursor.execute("TRUNCATE %s CASCADE" % ", ".join('"%s"' % m.__tablename__ for m in TABLES))
+        for start in range(0, providers, chunk_size):
+            chunk = {model: [] for model in TABLES}
+            for _ in range(min(chunk_size, providers - start)):
+                for model, rows in generate_provider(rng, children).items():
+                    chunk[model].extend(rows)
+            for model in TABLES:
+                _copy(cursor, model, chunk[model])
+            connection.commit()
+            if progress:
+                progress(min(start + chunk_size, providers), providers)
+        cursor.execute("SELECT provider_search_rebuild()")
+        cursor.execute("ANALYZE")
+        # Session-level, so it would outlive the load on the pooled connection
+        cursor.execute("RESET provider_search.defer")
+        connection.commit()
+    finally:
+        connection.close()
@@ -0,0 +1,41 @@
+"""Template_1 scenarios for the benchmark suite (suite.py).
+
+Run by suite.py as a script from Template_1/backend, so that ``app`` and
+``models`` are Template_1's; prints the measurements as JSON.
+
+    cd Template_1/backend && DATABASE_URL=... python ../../Template_2/backend/benchmarks/template1.py --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.getcwd())
+
+from measure import measure  # noqa: E402  (after the path change)
+from app import app, brand_cache  # noqa: E402
+from models import db  # noqa: E402
+
+# name -> (URL, whether to drop the cached brand row before each request)
+SCENARIOS = {
+    "template1 /api/providers": ("/api/providers", False),
+    "template1 /config": ("/config", False),
+    "template1 /config cold": ("/config", True),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    results = {}
+    with app.app_context():
+        for name, (url, cold) in SCENARIOS.items():
+            results[name] = measure(client, db.engine, url, args.repeat, brand_cache.clear if cold else None)
+    json.dump(results, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
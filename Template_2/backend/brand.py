@@ -0,0 +1,77 @@
+import hashlib
+import threading
+import time
+
+from models import ProviderConfig
+
+
+# Logo types the admin page accepts, by their leading bytes
+LOGO_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"RIFF", "image/webp"),
+]
+
+
+def logo_mimetype(logo):
+    for signature, mimetype in LOGO_SIGNATURES:
+        if logo.startswith(signature):
+            return mimetype
+    if b"<svg" in logo[:1024]:
+        return "image/svg+xml"
+    return "application/octet-stream"
+
+
+class Brand:
+    """The latest brand row, with the validators /config and /config/logo send."""
+
+    def __init__(self, brand_name, logo):
+        self.brand_name = brand_name or ""
+        self.logo = logo or None
+        self.logo_etag = hashlib.sha256(self.logo).hexdigest()[:32] if self.logo else None
+        self.logo_mimetype = logo_mimetype(self.logo) if self.logo else None
+        self.etag = hashlib.sha256(
+            ("%s\n%s" % (self.brand_name, self.logo_etag)).encode()
+        ).hexdigest()[:32]
+
+
+class BrandCache:
+    """Process-local copy of the brand row.
+
+    Reloaded after ``ttl`` seconds, so workers that did not handle an update
+    pick it up within that time; the one that did calls ``clear()``.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._brand = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        brand = self.cached()
+        if brand is None:
+            row = ProviderConfig.query.order_by(ProviderConfig.id.desc()).first()
+            brand = self.store(row)
+        return brand
+
+    def cached(self):
+        """The cached brand, or None once it has expired or been cleared."""
+        with self._lock:
+            if self._brand is None or self._expires_at < time.monotonic():
+                return None
+            return self._brand
+
+    def store(self, row):
+        # `row` is the latest ProviderConfig, or None when there is none
+        brand = Brand(row.brand_name, row.logo) if row else Brand("", None)
+        with self._lock:
+            self._brand = brand
+            self._expires_at = time.monotonic() + self.ttl
+        return brand
+
+    def clear(self):
+        with self._lock:
+            self._brand = None
@@ -0,0 +1,220 @@
+import json
+from functools import lru_cache
+
+from sqlalchemy.orm import load_only, selectinload
+
+from models import ProviderInfo, ProviderSearch
+from effective import EFFECTIVE_COLUMNS, effective_on
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used without it
+    orjson = None
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+##########################
+# Provider card fields   #
+##########################
+
+# Admin display toggles (provider_config keys) and the card field each one
+# controls. Fields not listed here are always returned.
+CONFIG_FIELDS = {
+    "gender": "gender",
+    "npiId": "npiId",
+    "phoneNumber": "phoneNumber",
+    "emailId": "emailId",
+    "yearsOfExperience": "yearOfExperience",
+    "rating": "rating",
+    "acceptingStatus": "acceptingNewPatients",
+    "virtualCareStatus": "virtualCareAvailable",
+    "boardCertified": "boardCertified",
+    "boardName": "boardName",
+    "affiliationName": "affiliationName",
+    "hospitalAffiliation": "hospitalAffiliations",
+}
+
+
+def _first(rows):
+    return rows[0] if rows else None
+
+
+def _attr(row, name, default=""):
+    value = getattr(row, name) if row is not None else None
+    return value or default
+
+
+def _languages(p):
+    return sorted(set(lang for lang_obj in p.languages for lang in (lang_obj.ProviderLanguage or [])))
+
+
+def _rating(p):
+    rating = p.rating_summary.AverageRating if p.rating_summary else None
+    return float(rating) if rating else None
+
+
+# Card field -> (Provider_Search columns it reads, value from a ProviderSearch row)
+SEARCH_FIELDS = {
+    "id": (["ProviderID"], lambda r: r.ProviderID),
+    "firstName": (["ProviderFirstName"], lambda r: r.ProviderFirstName),
+    "middleInitial": (["ProviderMiddleInitial"], lambda r: r.ProviderMiddleInitial),
+    "lastName": (["ProviderLastName"], lambda r: r.ProviderLastName),
+    "degree": (["ProviderDegree"], lambda r: r.ProviderDegree or ""),
+    "type": (["ProviderType"], lambda r: r.ProviderType),
+    "specialtyName": (["ProviderSpecialityName"], lambda r: r.ProviderSpecialityName or ""),
+    "addressLine1": (["ProviderAddressLine1"], lambda r: r.ProviderAddressLine1 or ""),
+    "addressLine2": (["ProviderAddressLine2"], lambda r: r.ProviderAddressLine2 or ""),
+    "city": (["ProviderCity"], lambda r: r.ProviderCity or ""),
+    "state": (["ProviderState"], lambda r: r.ProviderState or ""),
+    "zipCode": (["ProviderZIPCode"], lambda r: r.ProviderZIPCode or ""),
+    "planName": (["ProviderPlanName"], lambda r: r.ProviderPlanName[0] if r.ProviderPlanName else ""),
+    "acceptedAllPlans": (["ProviderPlanName"], lambda r: r.ProviderPlanName or []),
+    "workingHours": (["WorkingHours"], lambda r: r.WorkingHours or ""),
+    "languagesSpoken": (["Languages"], lambda r: r.Languages or []),
+    "gender": (["ProviderGender"], lambda r: r.ProviderGender),
+    "npiId": (["ProviderNPI"], lambda r: r.ProviderNPI),
+    "phoneNumber": (["ProviderPhoneNo"], lambda r: r.ProviderPhoneNo or ""),
+    "emailId": (["ProviderEmail"], lambda r: r.ProviderEmail or ""),
+    "yearOfExperience": (["ProviderYearsOfExperience"], lambda r: r.ProviderYearsOfExperience or 0),
+    "rating": (["AverageRating"], lambda r: float(r.AverageRating) if r.AverageRating else None),
+    "acceptingNewPatients": (["Acceptingnewpatients"], lambda r: r.Acceptingnewpatients == "Yes"),
+    "virtualCareAvailable": (["VirtualCare"], lambda r: r.VirtualCare == "Yes"),
+    "boardCertified": (["ProviderBoardCertified"], lambda r: r.ProviderBoardCertified == "Yes"),
+    "boardName": (["ProviderBoardName"], lambda r: r.ProviderBoardName or ""),
+    "affiliationName": (["ProviderAffiliationName"], lambda r: r.ProviderAffiliationName or ""),
+    "hospitalAffiliations": (["HasAffiliation"], lambda r: bool(r.HasAffiliation)),
+}
+
+# Card field -> (ProviderInfo relationship or None, columns it reads there,
+# value from a ProviderInfo). Child collections are ordered by their ID
+# (models.py), so "first" is stable.
+LIVE_FIELDS = {
+    "id": (None, ["ProviderID"], lambda p: p.ProviderID),
+    "firstName": (None, ["ProviderFirstName"], lambda p: p.ProviderFirstName),
+    "middleInitial": (None, ["ProviderMiddleInitial"], lambda p: p.ProviderMiddleInitial),
+    "lastName": (None, ["ProviderLastName"], lambda p: p.ProviderLastName),
+    "degree": ("certifications", ["ProviderDegree"],
+               lambda p: _attr(_first(p.certifications), "ProviderDegree")),
+    "type": (None, ["ProviderType"], lambda p: p.ProviderType),
+    "specialtyName": ("specialities", ["ProviderSpecialityName"],
+                      lambda p: _attr(_first(p.specialities), "ProviderSpecialityName")),
+    "addressLine1": ("addresses", ["ProviderAddressLine1"],
+                     lambda p: _attr(_first(p.addresses), "ProviderAddressLine1")),
+    "addressLine2": ("addresses", ["ProviderAddressLine2"],
+                     lambda p: _attr(_first(p.addresses), "ProviderAddressLine2")),
+    "city": ("addresses", ["ProviderCity"], lambda p: _attr(_first(p.addresses), "ProviderCity")),
+    "state": ("addresses", ["ProviderState"], lambda p: _attr(_first(p.addresses), "ProviderState")),
+    "zipCode": ("addresses", ["ProviderZIPCode"], lambda p: _attr(_first(p.addresses), "ProviderZIPCode")),
+    "planName": ("insurances", ["ProviderPlanName"],
+                 lambda p: _attr(_first(p.insurances), "ProviderPlanName", [""])[0]),
+    "acceptedAllPlans": ("insurances", ["ProviderPlanName"],
+                         lambda p: _attr(_first(p.insurances), "ProviderPlanName", [])),
+    "workingHours": (None, ["WorkingHours"], lambda p: p.WorkingHours or ""),
+    "languagesSpoken": ("languages", ["ProviderLanguage"], _languages),
+    "gender": (None, ["ProviderGender"], lambda p: p.ProviderGender),
+    "npiId": (None, ["ProviderNPI"], lambda p: p.ProviderNPI),
+    "phoneNumber": ("communications", ["ProviderPhoneNo"],
+                    lambda p: _attr(_first(p.communications), "ProviderPhoneNo")),
+    "emailId": ("communications", ["ProviderEmail"],
+                lambda p: _attr(_first(p.communications), "ProviderEmail")),
+    "yearOfExperience": ("certifications", ["ProviderYearsOfExperience"],
+                         lambda p: _attr(_first(p.certifications), "ProviderYearsOfExperience", 0)),
+    "rating": ("rating_summary", ["AverageRating"], _rating),
+    "acceptingNewPatients": ("visit_modes", ["Acceptingnewpatients"],
+                             lambda p: _attr(_first(p.visit_modes), "Acceptingnewpatients") == "Yes"),
+    "virtualCareAvailable": ("visit_modes", ["VirtualCare"],
+                             lambda p: _attr(_first(p.visit_modes), "VirtualCare") == "Yes"),
+    "boardCertified": ("certifications", ["ProviderBoardCertified"],
+                       lambda p: _attr(_first(p.certifications), "ProviderBoardCertified") == "Yes"),
+    "boardName": ("certifications", ["ProviderBoardName"],
+                  lambda p: _attr(_first(p.certifications), "ProviderBoardName")),
+    "affiliationName": ("affiliations", ["ProviderAffiliationName"],
+                        lambda p: _attr(_first(p.affiliations), "ProviderAffiliationName")),
+    "hospitalAffiliations": ("affiliations", [], lambda p: bool(p.affiliations)),
+}
+
+# Every card field, in the order a card lists them
+CARD_FIELDS = tuple(SEARCH_FIELDS)
+
+
+def card_fields(requested=None, provider_config=None):
+    """The card fields to return, in card order.
+
+    ``requested`` is the comma-separated ``fields=`` parameter (every field
+    when empty); fields the admin config (``provider_config`` toggles, see
+    CONFIG_FIELDS) hides are dropped whether requested or not.
+    """
+    fields = CARD_FIELDS
+    if requested:
+        wanted = {f.strip() for f in requested.split(",") if f.strip()}
+        unknown = wanted - set(CARD_FIELDS)
+        if unknown:
+            raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}")
+        fields = tuple(f for f in CARD_FIELDS if f in wanted)
+    hidden = {field for toggle, field in CONFIG_FIELDS.items() if not (provider_config or {}).get(toggle, True)}
+    return tuple(f for f in fields if f not in hidden)
+
+
+##########################
+# Card plans             #
+##########################
+
+class CardPlan:
+    """A compiled card serializer for one source model and set of fields.
+
+    ``options`` are the query options that load exactly what the fields read:
+    only their columns of the row, and on the live tables only the child
+    collections they use (one selectinload each, again column-pruned).
+    With ``as_of`` (an ISO date) the dated collections load only the rows
+    valid on it, as Provider_Search's card columns hold them.
+    ``card(row)`` then builds the card with one getter per field.
+    """
+
+    def __init__(self, model, fields, as_of=None):
+        self.model = model
+        self.fields = fields
+        if model is ProviderSearch:
+            columns = {"ProviderID"}
+            for field in fields:
+                columns.update(SEARCH_FIELDS[field][0])
+            self.options = [load_only(*[getattr(ProviderSearch, c) for c in sorted(columns)])]
+            self.getters = [(field, SEARCH_FIELDS[field][1]) for field in fields]
+        else:
+            columns, children = {"ProviderID"}, {}
+            for field in fields:
+                relationship, names, _ = LIVE_FIELDS[field]
+                if relationship is None:
+                    columns.update(names)
+                else:
+                    children.setdefault(relationship, {"ProviderID"}).update(names)
+            self.options = [load_only(*[getattr(ProviderInfo, c) for c in sorted(columns)])]
+            for relationship, names in sorted(children.items()):
+                attribute = getattr(ProviderInfo, relationship)
+                child = attribute.property.mapper.class_
+                if as_of and child in EFFECTIVE_COLUMNS:
+                    attribute = attribute.and_(effective_on(child, as_of))
+                self.options.append(selectinload(attribute).load_only(*[getattr(child, c) for c in sorted(names)]))
+            self.getters = [(field, LIVE_FIELDS[field][2]) for field in fields]
+
+    def card(self, row):
+        return {field: get(row) for field, get in self.getters}
+
+
+@lru_cache(maxsize=256)
+def card_plan(model, fields, as_of=None):
+    """The CardPlan for ``model`` (ProviderInfo or ProviderSearch), a tuple of fields and ``as_of``, compiled once."""
+    return CardPlan(model, fields, as_of)
+
+
+##########################
+# JSON                   #
+##########################
+
+def dumps(body):
+    """Compact JSON bytes, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(body)
+    return json.dumps(body, separators=(",", ":")).encode()
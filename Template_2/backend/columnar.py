@@ -0,0 +1,657 @@
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from decimal import Decimal
+
+from flask import current_app
+from sqlalchemy import func, literal_column, select
+
+from models import db, ProviderSearch
+from pagination import SORTS, apply_sort
+from plans import plan_term
+from response_cache import DATA_VERSION
+
+try:
+    import numpy as np
+except ImportError:  # optional; without it every search runs in SQL
+    np = None
+
+log = logging.getLogger(__name__)
+
+
+# An in-process copy of the Provider_Search filter columns, answering
+# /api/providers filters with bitwise AND/OR over one bitset per value and
+# sorting with permutations read from Postgres. Postgres stays the source of
+# truth: the index is a snapshot at one directory_data_version, searches run
+# in SQL while it is stale (or the search uses something it does not hold),
+# and the page of ProviderIDs it finds is hydrated from Provider_Search.
+#
+# Bitsets are numpy uint64 words, bit i of word w being row 64*w + i. Rows
+# are the providers in ProviderID order. Specialties and locations, with
+# many distinct values each held by few rows, are interned strings with a
+# list of rows per string instead of a bitset.
+
+# The sorts the index holds a permutation for; name-desc is name-asc reversed
+INDEX_SORTS = ("name-asc", "experience", "rating")
+SORTED = ("name-asc", "name-desc", "experience", "rating")
+
+# Filters testing a Yes/No array column, in LOAD_COLUMNS order
+YES_NO_FILTERS = ("boardCertified", "acceptingNewPatients", "virtualCare")
+
+# Strings on more than one row in this many get a bitset (see Postings), and
+# the number of text-box values whose matches each Postings keeps
+DENSE_FRACTION = 64
+MATCH_CACHE_ENTRIES = 64
+
+# Snapshot files (see ColumnarIndex.save): format tag, and array alignment
+SNAPSHOT_MAGIC = b"PSCOLIX1"
+SNAPSHOT_ALIGN = 64
+
+# Seconds a worker waits before looking again for a snapshot not yet written
+SNAPSHOT_POLL = 0.5
+
+# Characters that make an ILIKE pattern mean more than a substring
+PATTERN_CHARACTERS = ("%", "_", "\\", "\n")
+
+LOAD_COLUMNS = (
+    ProviderSearch.ProviderID,
+    ProviderSearch.ProviderGender,
+    func.coalesce(ProviderSearch.MaxYearsOfExperience, literal_column("-1")),
+    ProviderSearch.BoardCertifiedValues,
+    ProviderSearch.AcceptingNewPatientsValues,
+    ProviderSearch.VirtualCareValues,
+    ProviderSearch.HasAffiliation,
+    ProviderSearch.HasNamedAffiliation,
+    ProviderSearch.LanguagesFolded,
+    ProviderSearch.SpecialityNames,
+    ProviderSearch.LocationNames,
+)
+
+
+def available():
+    return np is not None
+
+
+def _pack(mask):
+    """Bitset (uint64 words) of a boolean row mask."""
+    packed = np.packbits(mask, bitorder="little")
+    padded = np.zeros((len(packed) + 7) // 8 * 8, dtype=np.uint8)
+    padded[:len(packed)] = packed
+    return padded.view("<u8")
+
+
+def _rows(words):
+    """Row numbers of the set bits, ascending."""
+    nonzero = np.flatnonzero(words)
+    bits = np.unpackbits(words[nonzero].view(np.uint8), bitorder="little").reshape(-1, 64)
+    word, bit = np.nonzero(bits)
+    return nonzero[word] * 64 + bit
+
+
+if np is not None:
+    _POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _count(words):
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+    return int(_POPCOUNT[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def _align(offset):
+    return (offset + SNAPSHOT_ALIGN - 1) // SNAPSHOT_ALIGN * SNAPSHOT_ALIGN
+
+
+def _intern(values, table):
+    code = table.get(values)
+    if code is None:
+        code = table[values] = len(table)
+    return code
+
+
+class InvalidSnapshot(ValueError):
+    pass
+
+
+class Postings:
+    """Interned strings and, for each, the rows carrying it.
+
+    ``match(value)`` is the bitset of rows carrying a string that contains
+    ``value``: the strings are few next to the rows, so the substring test
+    scans them rather than the rows. Strings carried by at least one row in
+    DENSE_FRACTION keep a bitset (a row of ``dense``), the others a sorted
+    range of ``rows`` between two ``offsets``.
+    """
+
+    def __init__(self, terms, arrays, name, size):
+        self.size = size
+        self.terms = terms
+        self.folded = [term.lower() for term in terms]
+        self.offsets = arrays[name + ".offsets"]
+        self.rows = arrays[name + ".rows"]
+        self.dense = arrays[name + ".dense"]
+        self.dense_of = {int(code): at for at, code in enumerate(arrays[name + ".dense_codes"])}
+        # value -> bitset of its matches; values repeat as people page and refine
+        self._matches = {}
+
+    @staticmethod
+    def build(rows_per_term, name, size):
+        """(terms, arrays) for ``rows_per_term``, a dict of string -> row numbers."""
+        dense, dense_codes, sparse = [], [], []
+        offsets = np.zeros(len(rows_per_term) + 1, dtype=np.int64)
+        for code, rows in enumerate(rows_per_term.values()):
+            if len(rows) * DENSE_FRACTION >= size:
+                mask = np.zeros(size, dtype=bool)
+                mask[rows] = True
+                dense.append(_pack(mask))
+                dense_codes.append(code)
+                rows = ()
+            sparse.append(rows)
+            offsets[code + 1] = offsets[code] + len(rows)
+        words = (size + 63) // 64
+        return list(rows_per_term), {
+            name + ".offsets": offsets,
+            name + ".rows": np.fromiter((row for rows in sparse for row in rows), dtype=np.uint32,
+                                        count=int(offsets[-1])),
+            name + ".dense": np.array(dense, dtype="<u8").reshape(len(dense), words),
+            name + ".dense_codes": np.array(dense_codes, dtype=np.int32),
+        }
+
+    def match(self, value):
+        words = self._matches.get(value)
+        if words is not None:
+            return words
+        codes = [code for code, term in enumerate(self.folded) if value in term]
+        words = np.zeros((self.size + 63) // 64, dtype="<u8")
+        for code in codes:
+            if code in self.dense_of:
+                words |= self.dense[self.dense_of[code]]
+        slices = [self.rows[self.offsets[code]:self.offsets[code + 1]] for code in codes if code not in self.dense_of]
+        if slices:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[np.concatenate(slices)] = True
+            words |= _pack(mask)
+        if len(self._matches) >= MATCH_CACHE_ENTRIES:
+            self._matches.clear()
+        self._matches[value] = words
+        return words
+
+
+class ColumnarIndex:
+    """The filter columns of every provider at data version ``version``.
+
+    Made of ``meta`` (the version, and the interned strings and key tables,
+    as JSON) and ``arrays`` (name -> numpy array), so that it can be saved to
+    a snapshot file and mapped back without copying the arrays (``save``,
+    ``open``). Built by ``from_rows``; immutable afterwards, so searches
+    need no lock.
+    """
+
+    def __init__(self, meta, arrays, path=None):
+        self.meta = meta
+        self.arrays = arrays
+        self.path = path
+        self.version = meta["version"]
+        self.size = meta["size"]
+        self.ids = arrays["ids"]
+        self.all = arrays["all"]
+        self.none = np.zeros_like(self.all)
+        # (filter, value) -> bitset, for gender and the Yes/No and affiliation filters
+        self.bitsets = {tuple(flag): arrays["flags"][at] for at, flag in enumerate(meta["flags"])}
+        # Distinct years of experience, ascending, and the rows with at least each
+        self.experience_values = arrays["experience.values"]
+        self.experience_at_least = arrays["experience.at_least"]
+        self.languages = {language: arrays["languages"][at] for at, language in enumerate(meta["languages"])}
+        self.specialties = Postings(meta["specialties"], arrays, "specialties", self.size)
+        self.locations = Postings(meta["locations"], arrays, "locations", self.size)
+        # sortBy -> rows in result order, and each row's place in it
+        self.orders = {sort_by: arrays["order." + sort_by] for sort_by in INDEX_SORTS}
+        self.orders["name-desc"] = self.orders["name-asc"][::-1]
+        self.positions = {sort_by: arrays["position." + sort_by] for sort_by in SORTED}
+        # sortBy -> (key code per row, key per code), to check cursors against
+        self.keys = {sort_by: (arrays["keys." + sort_by], meta["keys"][sort_by]) for sort_by in INDEX_SORTS}
+        self.keys["name-desc"] = self.keys["name-asc"]
+
+    @classmethod
+    def from_rows(cls, version, rows, orders, keys):
+        """Index ``rows``, Provider_Search rows shaped like LOAD_COLUMNS.
+
+        ``orders`` maps each INDEX_SORTS sortBy to the ProviderIDs in its
+        order and ``keys`` to each ProviderID's sort key (both as returned by
+        ``apply_sort``), so the index orders rows exactly as Postgres does.
+        """
+        rows = sorted(rows, key=lambda row: row[0])
+        size = len(rows)
+        ids = np.array([row[0] for row in rows])
+        # UUIDs and the like take a byte per character rather than four
+        if all(provider_id.isascii() for provider_id in ids.tolist()):
+            ids = ids.astype(np.bytes_)
+
+        def pack_where(test):
+            return _pack(np.fromiter((bool(test(row)) for row in rows), dtype=bool, count=size))
+
+        genders = {}
+        gender_codes = np.fromiter(
+            (_intern(row[1], genders) for row in rows), dtype=np.uint16, count=size
+        )
+        flags = {("gender", gender): _pack(gender_codes == code)
+                 for gender, code in genders.items() if gender is not None}
+        for column, name in enumerate(YES_NO_FILTERS, start=3):
+            for answer in ("Yes", "No"):
+                flags[(name, answer)] = pack_where(lambda row: answer in (row[column] or ()))
+        flags[("hospitalAffiliations", "true")] = pack_where(lambda row: row[6])
+        flags[("hospitalAffiliations", "false")] = pack_where(lambda row: not row[7])
+
+        experience = np.fromiter((row[2] for row in rows), dtype=np.int32, count=size)
+        experience_values = np.unique(experience[experience >= 0])
+
+        languages, specialties, locations = {}, {}, {}
+        for number, row in enumerate(rows):
+            for language in set(row[8] or ()):
+                languages.setdefault(language, []).append(number)
+            for names, terms in ((row[9], specialties), (row[10], locations)):
+                for term in set((names or "").split("\n")) - {""}:
+                    terms.setdefault(term, []).append(number)
+        language_bitsets = []
+        for numbers in languages.values():
+            mask = np.zeros(size, dtype=bool)
+            mask[numbers] = True
+            language_bitsets.append(_pack(mask))
+
+        words = (size + 63) // 64
+        arrays = {
+            "ids": ids,
+            "all": _pack(np.ones(size, dtype=bool)),
+            "flags": np.array(list(flags.values()), dtype="<u8").reshape(len(flags), words),
+            "experience.values": experience_values,
+            "experience.at_least": np.array([_pack(experience >= value) for value in experience_values],
+                                            dtype="<u8").reshape(len(experience_values), words),
+            "languages": np.array(language_bitsets, dtype="<u8").reshape(len(languages), words),
+        }
+        specialty_terms, specialty_arrays = Postings.build(specialties, "specialties", size)
+        location_terms, location_arrays = Postings.build(locations, "locations", size)
+        arrays.update(specialty_arrays)
+        arrays.update(location_arrays)
+
+        key_tables = {}
+        for sort_by in INDEX_SORTS:
+            order = np.searchsorted(ids, np.array(orders[sort_by], dtype=ids.dtype)).astype(np.uint32)
+            arrays["order." + sort_by] = order
+            table = {}
+            codes = np.empty(size, dtype=np.uint32)
+            codes[order] = np.fromiter((_intern(key, table) for key in keys[sort_by]), dtype=np.uint32, count=size)
+            arrays["keys." + sort_by] = codes
+            # Numeric keys as text, as pagination.encode_cursor writes them
+            key_tables[sort_by] = [key if isinstance(key, str) else str(key) for key in table]
+        for sort_by in SORTED:
+            order = arrays["order.name-asc"][::-1] if sort_by == "name-desc" else arrays["order." + sort_by]
+            position = np.empty(size, dtype=np.uint32)
+            position[order] = np.arange(size, dtype=np.uint32)
+            arrays["position." + sort_by] = position
+
+        meta = {
+            "version": version,
+            "size": size,
+            "flags": [list(flag) for flag in flags],
+            "languages": list(languages),
+            "specialties": specialty_terms,
+            "locations": location_terms,
+            "keys": key_tables,
+        }
+        return cls(meta, arrays)
+
+    ##########################
+    # Snapshot files         #
+    ##########################
+
+    # SNAPSHOT_MAGIC, the JSON header's length (8 bytes, little-endian), the
+    # header ({"meta", "arrays": {name: {offset, dtype, shape}}}), then each
+    # array's bytes at SNAPSHOT_ALIGN-aligned offsets from the first one.
+
+    def save(self, path):
+        """Write the index to ``path``, atomically: readers see the whole file or none."""
+        layout, offset = {}, 0
+        for name, array in self.arrays.items():
+            layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+            offset = _align(offset + array.nbytes)
+        header = json.dumps({"meta": self.meta, "arrays": layout}, separators=(",", ":")).encode()
+        base = _align(len(SNAPSHOT_MAGIC) + 8 + len(header))
+
+        temporary = "%s.%d.tmp" % (path, os.getpid())
+        with open(temporary, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<Q", len(header)))
+            f.write(header)
+            for name, array in self.arrays.items():
+                f.seek(base + layout[name]["offset"])
+                np.ascontiguousarray(array).tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+    @classmethod
+    def open(cls, path):
+        """Map the snapshot at ``path`` read-only; the arrays are views of the file's pages."""
+        mapped = np.memmap(path, dtype=np.uint8, mode="r")
+        start = len(SNAPSHOT_MAGIC) + 8
+        if len(mapped) < start or bytes(mapped[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            raise InvalidSnapshot(f"{path} is not a columnar index snapshot")
+        (length,) = struct.unpack("<Q", bytes(mapped[len(SNAPSHOT_MAGIC):start]))
+        header = json.loads(bytes(mapped[start:start + length]))
+        base = _align(start + length)
+        arrays = {
+            name: np.ndarray(tuple(spec["shape"]), dtype=np.dtype(spec["dtype"]), buffer=mapped,
+                             offset=base + spec["offset"])
+            for name, spec in header["arrays"].items()
+        }
+        return cls(header["meta"], arrays, path)
+
+    ##########################
+    # Filtering              #
+    ##########################
+
+    def supports(self, filters, sort_by):
+        """Whether the index can answer ``filters`` (search.parse_filters) sorted by ``sort_by``."""
+        if sort_by not in SORTED or filters["name"] or filters["relevance"] or filters["center"]:
+            return False
+        # Availability depends on the hour and on leave dates, not indexed here
+        if filters["weeklySlots"] or filters["leaveRange"]:
+            return False
+        # Plan terms are too many for a bitset each; the GIN index serves them
+        if plan_term(filters):
+            return False
+        # Substrings compare lower-cased ASCII the way ILIKE does; anything
+        # else is left to Postgres
+        for box in ("specialty", "location"):
+            value = filters[box]
+            if value and (not value.isascii() or any(c in value for c in PATTERN_CHARACTERS)):
+                return False
+        return True
+
+    def matches(self, filters):
+        """Bitset of the rows matching ``filters``, the predicates of search.search_conditions."""
+        words = self.all.copy()
+        if filters["gender"]:
+            words &= self.bitsets.get(("gender", filters["gender"]), self.none)
+        if filters["minExperience"] > 0:
+            at = np.searchsorted(self.experience_values, filters["minExperience"])
+            words &= self.experience_at_least[at] if at < len(self.experience_at_least) else self.none
+        for name in YES_NO_FILTERS:
+            if filters[name]:
+                words &= self.bitsets[(name, "Yes" if filters[name] == "true" else "No")]
+        if filters["hospitalAffiliations"]:
+            words &= self.bitsets[("hospitalAffiliations",
+                                   "true" if filters["hospitalAffiliations"] == "true" else "false")]
+        if filters["languagesSpoken"]:
+            spoken = self.none.copy()
+            for language in filters["languagesSpoken"]:
+                if language in self.languages:
+                    spoken |= self.languages[language]
+            words &= spoken
+        if filters["specialty"]:
+            words &= self.specialties.match(filters["specialty"])
+        if filters["location"]:
+            words &= self.locations.match(filters["location"])
+        return words
+
+    def count(self, words):
+        return _count(words)
+
+    def cursor_row(self, sort_by, cursor):
+        """The row a cursor (pagination.decode_cursor) points at, or None.
+
+        None when the provider is gone or its sort key is no longer the one
+        in the cursor: the page after it then depends on keys the index does
+        not keep, and SQL answers instead.
+        """
+        provider_id = cursor["id"]
+        if self.ids.dtype.kind == "S":
+            if not provider_id.isascii():
+                return None
+            provider_id = provider_id.encode()
+        at = int(np.searchsorted(self.ids, provider_id))
+        if at == self.size or self.ids[at] != provider_id:
+            return None
+        codes, table = self.keys[sort_by]
+        key = table[codes[at]]
+        _, numeric = SORTS[sort_by]
+        if numeric:
+            return at if Decimal(str(key)) == cursor["key"] else None
+        return at if key == cursor["key"] else None
+
+    def page(self, words, total, sort_by, skip, limit, after=None):
+        """Row numbers of matches ``skip`` to ``skip + limit`` in ``sort_by`` order.
+
+        With ``after`` (a row number) the matches start after that row. A
+        broad match walks the permutation until it has enough rows; a
+        narrow one takes the matching rows and sorts their positions.
+        """
+        order = self.orders[sort_by]
+        start = 0 if after is None else int(self.positions[sort_by][after]) + 1
+        wanted = skip + limit
+        if total == 0 or wanted == 0 or start >= self.size:
+            return np.empty(0, dtype=np.uint32)
+
+        if wanted * self.size <= total * total:
+            found, count, step = [], 0, max(1024, 2 * wanted * self.size // total)
+            while start < self.size and count < wanted:
+                chunk = order[start:start + step]
+                hit = chunk[(words[chunk >> 6] >> (chunk & 63).astype(np.uint64)) & 1 == 1]
+                found.append(hit)
+                count += len(hit)
+                start += step
+                step *= 2
+            return np.concatenate(found)[skip:wanted]
+
+        positions = self.positions[sort_by][_rows(words)]
+        if after is not None:
+            positions = positions[positions >= start]
+        if len(positions) > wanted:
+            positions = np.partition(positions, wanted - 1)[:wanted]
+        positions.sort()
+        return order[positions[skip:wanted]]
+
+    def provider_ids(self, rows):
+        if self.ids.dtype.kind == "S":
+            return [provider_id.decode() for provider_id in self.ids[rows].tolist()]
+        return self.ids[rows].tolist()
+
+    def nbytes(self):
+        return sum(array.nbytes for array in self.arrays.values())
+
+
+def load_index():
+    """A ColumnarIndex of Provider_Search at the current data version."""
+    # The rows, orders and version come from one snapshot
+    with db.engine.connect().execution_options(isolation_level="REPEATABLE READ") as connection:
+        version = connection.execute(DATA_VERSION).scalar()
+        rows = connection.execute(select(*LOAD_COLUMNS)).all()
+        orders, keys = {}, {}
+        for sort_by in INDEX_SORTS:
+            query = apply_sort(db.session.query(ProviderSearch.ProviderID), ProviderSearch, sort_by)
+            ordered = connection.execute(query.statement).all()
+            orders[sort_by] = [provider_id for provider_id, _ in ordered]
+            keys[sort_by] = [key for _, key in ordered]
+    return ColumnarIndex.from_rows(version, rows, orders, keys)
+
+
+##########################
+# Shared snapshots       #
+##########################
+
+# With COLUMNAR_SNAPSHOT_DIR set, one builder process (``flask columnar-snapshot
+# --watch``, started by gunicorn.conf.py) writes columnar-<version>.idx there
+# whenever the data version moves, and workers map the file for the version
+# they see. The pages live once in the OS page cache whatever the number of
+# workers, and a worker switches versions by mapping another file.
+
+def snapshot_path(directory, version):
+    return os.path.join(directory, "columnar-%d.idx" % version)
+
+
+def _snapshot_versions(directory):
+    versions = []
+    for name in os.listdir(directory):
+        if name.startswith("columnar-") and name.endswith(".idx"):
+            try:
+                versions.append(int(name[len("columnar-"):-len(".idx")]))
+            except ValueError:
+                pass
+    return sorted(versions)
+
+
+def write_snapshot(directory, keep=2):
+    """Snapshot the current data version into ``directory`` unless it is there; returns its path.
+
+    Older snapshots beyond the ``keep`` newest are removed; workers still
+    mapping one keep reading it until they switch.
+    """
+    os.makedirs(directory, exist_ok=True)
+    with db.engine.connect() as connection:
+        version = connection.execute(DATA_VERSION).scalar()
+    path = snapshot_path(directory, version)
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        index = load_index()
+        path = snapshot_path(directory, index.version)
+        index.save(path)
+        log.info("columnar snapshot %s written: %d providers in %.2fs",
+                 path, index.size, time.perf_counter() - start)
+    for version in _snapshot_versions(directory)[:-keep]:
+        try:
+            os.remove(snapshot_path(directory, version))
+        except FileNotFoundError:
+            pass
+    return path
+
+
+def watch_snapshots(directory, interval=2, keep=2):
+    """Keep ``directory`` at the current data version, checking every ``interval`` seconds."""
+    while True:
+        try:
+            write_snapshot(directory, keep)
+        except Exception:
+            log.exception("columnar snapshot failed")
+        time.sleep(interval)
+
+
+class ColumnarEngine:
+    """The ColumnarIndex a worker searches.
+
+    ``search`` answers from the index only while it is at the current data
+    version. With ``snapshot_dir`` a search that sees a newer version maps
+    that version's snapshot if the builder has written it (checking at most
+    every SNAPSHOT_POLL seconds); without, it starts a reload of a private
+    index in a thread. Every search runs in SQL until the index catches up.
+    """
+
+    def __init__(self, snapshot_dir=None):
+        self.snapshot_dir = snapshot_dir or None
+        self.index = None
+        self._loaded_at = None
+        self._load_seconds = None
+        self._searches = self._fallbacks = 0
+        self._reload_lock = threading.Lock()
+        self._polled = (None, 0.0)
+
+    def load(self):
+        start = time.perf_counter()
+        self.index = load_index()
+        self._loaded_at = time.time()
+        self._load_seconds = time.perf_counter() - start
+        log.info("columnar index loaded: %d providers at version %d in %.2fs",
+                 self.index.size, self.index.version, self._load_seconds)
+
+    def open(self, version):
+        """Map the snapshot of ``version``; False when the builder has not written it yet."""
+        start = time.perf_counter()
+        try:
+            index = ColumnarIndex.open(snapshot_path(self.snapshot_dir, version))
+        except FileNotFoundError:
+            return False
+        self.index = index
+        self._loaded_at = time.time()
+        self._load_seconds = time.perf_counter() - start
+        return True
+
+    def _reload(self, app):
+        try:
+            with app.app_context():
+                self.load()
+        except Exception:
+            log.exception("columnar index reload failed")
+        finally:
+            self._reload_lock.release()
+
+    def _refresh(self, version):
+        if self.snapshot_dir is None:
+            if self._reload_lock.acquire(blocking=False):
+                threading.Thread(target=self._reload, args=(current_app._get_current_object(),),
+                                 daemon=True).start()
+            return
+        polled_version, polled_at = self._polled
+        if polled_version == version and time.monotonic() - polled_at < SNAPSHOT_POLL:
+            return
+        self._polled = (version, time.monotonic())
+        try:
+            self.open(version)
+        except (OSError, InvalidSnapshot):
+            log.exception("columnar snapshot of version %d not opened", version)
+
+    def search(self, search, version):
+        """``(page ProviderIDs, total, total mode)`` for a prepared SearchRequest, or None.
+
+        The page has one ID more than ``per_page`` when there is a next
+        page, as ``SearchRequest.page_query`` does. Totals are exact
+        (countMode=estimate included); atLeast stops at its threshold as
+        counting.py does. None sends the search to SQL: the index is
+        missing or stale, or cannot answer this search.
+        """
+        if np is None:
+            return None
+        if self.index is None or self.index.version != version:
+            self._refresh(version)
+        index = self.index
+        if index is None or index.version != version:
+            self._fallbacks += 1
+            return None
+        if search.model is not ProviderSearch or not index.supports(search.filters, search.sort_by):
+            self._fallbacks += 1
+            return None
+
+        after = None
+        if search.cursor is not None:
+            after = index.cursor_row(search.sort_by, search.cursor)
+            if after is None:
+                self._fallbacks += 1
+                return None
+
+        words = index.matches(search.filters)
+        total = index.count(words)
+        skip = 0 if after is not None else search.offset
+        rows = index.page(words, total, search.sort_by, skip, search.per_page + 1, after)
+        self._searches += 1
+
+        total_mode = "exact"
+        threshold = search.settings["COUNT_AT_LEAST_THRESHOLD"]
+        if search.count_mode == "atLeast" and total > threshold:
+            total, total_mode = threshold, "atLeast"
+        return index.provider_ids(rows), total, total_mode
+
+    def stats(self):
+        index = self.index
+        return {
+            "available": available(),
+            "loaded": index is not None,
+            "snapshot": index.path if index else None,
+            "version": index.version if index else None,
+            "providers": index.size if index else 0,
+            "bytes": index.nbytes() if index else 0,
+            "searches": self._searches,
+            "fallbacks": self._fallbacks,
+            "loadedAt": self._loaded_at,
+            "loadSeconds": self._load_seconds,
+        }
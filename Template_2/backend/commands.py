@@ -0,0 +1,96 @@
+import click
+
+from migrate import apply_migrations
+from search_table import rebuild_search_table, check_search_table, repair_search_rows, advance_search_date
+from effective import InvalidEffectiveDate, today
+from ingest import InvalidRoster, import_roster
+from export import EXPORT_FORMATS, export_directory
+from columnar import available as columnar_available, write_snapshot, watch_snapshots
+
+
+# Run from backend/ as `flask --app app <command>`
+def register_commands(app):
+
+    @app.cli.command("migrate")
+    def migrate_command():
+        """Apply pending SQL migrations from migrations/."""
+        applied = apply_migrations()
+        for version in applied:
+            click.echo(f"Applied {version}")
+        if not applied:
+            click.echo("Database is up to date")
+
+    @app.cli.command("rebuild-search")
+    def rebuild_search_command():
+        """Rebuild the Provider_Search table from the Provider_* tables."""
+        rebuild_search_table()
+        click.echo("Provider_Search rebuilt")
+
+    @app.cli.command("check-search")
+    @click.option("--repair", is_flag=True, help="Re-derive every row found out of sync.")
+    @click.option("--limit", default=100, show_default=True, help="Stop after this many differences.")
+    def check_search_command(repair, limit):
+        """Compare Provider_Search with the live Provider_* tables."""
+        problems = check_search_table(limit)
+        for provider_id, problem in problems:
+            click.echo(f"{problem:8} {provider_id}")
+        if not problems:
+            click.echo("Provider_Search is consistent")
+            return
+        if repair:
+            repair_search_rows(provider_id for provider_id, _ in problems)
+            click.echo(f"Repaired {len(problems)} provider(s)")
+        else:
+            raise SystemExit(1)
+
+    @app.cli.command("advance-search-date")
+    @click.option("--date", "as_of", type=click.DateTime(formats=["%Y-%m-%d"]),
+                  help="Date to move to (default: today in DIRECTORY_TIMEZONE).")
+    def advance_search_date_command(as_of):
+        """Move Provider_Search to the rows valid on a date; run daily just after midnight."""
+        try:
+            as_of = as_of.date() if as_of else today(app.config["DIRECTORY_TIMEZONE"])
+        except InvalidEffectiveDate as e:
+            raise click.ClickException(str(e))
+        changed = advance_search_date(as_of)
+        click.echo(f"Provider_Search is as of {as_of.isoformat()}; {changed} provider(s) re-derived")
+
+    @app.cli.command("import-roster")
+    @click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True))
+    @click.option("--workers", default=4, show_default=True, help="Files copied into staging at the same time.")
+    def import_roster_command(paths, workers):
+        """Bulk-load roster files or directories (CSV/NDJSON, optionally .gz), matched by NPI."""
+        def progress(table, done, size):
+            click.echo(f"{table:24} {done / size if size else 1:6.1%}  of {size:,} bytes")
+
+        try:
+            stats = import_roster(paths, workers, progress)
+        except InvalidRoster as e:
+            raise click.ClickException(str(e))
+        for row in stats:
+            click.echo(f"{row['table']:24} {row['inserted']:>10,} inserted {row['updated']:>10,} updated "
+                       f"{row['rejected']:>8,} rejected")
+
+    @app.cli.command("export-providers")
+    @click.option("--format", "export_format", type=click.Choice(list(EXPORT_FORMATS)), default="ndjson",
+                  show_default=True)
+    @click.option("--gzip", "compress", is_flag=True, help="Compress the output.")
+    @click.option("-o", "--output", type=click.File("wb"), default="-", help="File to write (default stdout).")
+    def export_providers_command(export_format, compress, output):
+        """Write every provider card, as /api/providers returns them."""
+        for chunk in export_directory(export_format, app.config["SEARCH_SOURCE"], app.config["EXPORT_CHUNK_SIZE"],
+                                      app.config["DIRECTORY_TIMEZONE"], compress):
+            output.write(chunk)
+
+    @app.cli.command("columnar-snapshot")
+    @click.option("--watch", is_flag=True, help="Keep writing a snapshot whenever the data changes.")
+    def columnar_snapshot_command(watch):
+        """Write the columnar index snapshot of the current data version to COLUMNAR_SNAPSHOT_DIR."""
+        directory = app.config["COLUMNAR_SNAPSHOT_DIR"]
+        if not directory:
+            raise click.ClickException("COLUMNAR_SNAPSHOT_DIR is not set")
+        if not columnar_available():
+            raise click.ClickException("numpy is not installed")
+        if watch:
+            watch_snapshots(directory, app.config["COLUMNAR_SNAPSHOT_INTERVAL"], app.config["COLUMNAR_SNAPSHOTS_KEPT"])
+        click.echo(write_snapshot(directory, app.config["COLUMNAR_SNAPSHOTS_KEPT"]))
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from models import db
+from instrumentation import note_cache
+
+
+# How the `total` of a search was produced:
+#   exact    - a real COUNT(*), cached per normalized filter set
+#   estimate - the planner's row estimate from EXPLAIN, for broad searches
+#   atLeast  - counting stopped at the threshold; total is a lower bound
+COUNT_MODES = ("exact", "estimate", "atLeast")
+
+
+class CountCache:
+    """A small thread-safe LRU of exact counts that expire after ``ttl`` seconds."""
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def id_query(query):
+    # Counting only needs the matching ProviderIDs, not whole rows or order.
+    # Works for both ProviderInfo and ProviderSearch queries.
+    model = query.column_descriptions[0]["entity"]
+    return query.with_entities(model.ProviderID).order_by(None)
+
+
+class explain(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` of a statement, keeping its bound parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def count_statement(query, limit=None):
+    # LIMIT inside the counted subquery lets Postgres stop scanning early
+    ids = id_query(query)
+    if limit is not None:
+        ids = ids.limit(limit)
+    return select(func.count()).select_from(ids.subquery())
+
+
+def estimate_statement(query):
+    return explain(id_query(query).statement)
+
+
+def plan_rows(plan):
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def count_providers(query, key, mode, cache, settings):
+    """Return ``(total, mode_used)`` for a filtered provider query.
+
+    ``settings`` is the app config; it supplies the estimate threshold below
+    which a search is considered narrow (and counted exactly instead) and the
+    cut-off for the atLeast mode.
+    """
+    if mode == "estimate":
+        estimate = plan_rows(db.session.execute(estimate_statement(query)).scalar())
+        if estimate >= settings["COUNT_ESTIMATE_MIN_ROWS"]:
+            return estimate, "estimate"
+
+    elif mode == "atLeast":
+        threshold = settings["COUNT_AT_LEAST_THRESHOLD"]
+        total = db.session.execute(count_statement(query, threshold + 1)).scalar()
+        if total > threshold:
+            return threshold, "atLeast"
+        return total, "exact"
+
+    total = cache.get(key)
+    note_cache("count", total is not None)
+    if total is None:
+        total = db.session.execute(count_statement(query)).scalar()
+        cache.set(key, total)
+    return total, "exact"
+
+
+async def count_providers_async(query, key, mode, cache, settings, session):
+    """``count_providers`` on an AsyncSession (async_app.py): same modes, same results."""
+    if mode == "estimate":
+        estimate = plan_rows((await session.execute(estimate_statement(query))).scalar())
+        if estimate >= settings["COUNT_ESTIMATE_MIN_ROWS"]:
+            return estimate, "estimate"
+
+    elif mode == "atLeast":
+        threshold = settings["COUNT_AT_LEAST_THRESHOLD"]
+        total = (await session.execute(count_statement(query, threshold + 1))).scalar()
+        if total > threshold:
+            return threshold, "atLeast"
+        return total, "exact"
+
+    total = cache.get(key)
+    note_cache("count", total is not None)
+    if total is None:
+        total = (await session.execute(count_statement(query))).scalar()
+        cache.set(key, total)
+    return total, "exact"
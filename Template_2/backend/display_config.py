@@ -0,0 +1,88 @@
+import threading
+import time
+
+from models import db, DisplayConfig
+
+
+class InvalidDisplayConfig(ValueError):
+    pass
+
+
+# Every toggle is on until the admin page saves it off (cards.CONFIG_FIELDS)
+DEFAULT_DISPLAY_CONFIG = {
+    "rating": True,
+    "yearsOfExperience": True,
+    "phoneNumber": True,
+    "acceptingStatus": True,
+    "virtualCareStatus": True
+}
+
+
+def display_config(row):
+    """The toggles in effect, given the display_config row (None when there is none)."""
+    return {**DEFAULT_DISPLAY_CONFIG, **(row.config if row else {})}
+
+
+class DisplayConfigCache:
+    """Process-local copy of the display_config row, as brand.BrandCache keeps the brand.
+
+    Reloaded after ``ttl`` seconds, so workers that did not handle an update
+    pick it up within that time; the one that did calls ``clear()``.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._config = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        config = self.cached()
+        if config is None:
+            config = self.store(db.session.get(DisplayConfig, True))
+        return config
+
+    def cached(self):
+        """The cached toggles, or None once they have expired or been cleared."""
+        with self._lock:
+            if self._config is None or self._expires_at < time.monotonic():
+                return None
+            return self._config
+
+    def store(self, row):
+        config = display_config(row)
+        with self._lock:
+            self._config = config
+            self._expires_at = time.monotonic() + self.ttl
+        return config
+
+    def clear(self):
+        with self._lock:
+            self._config = None
+
+
+def validate_display_config(changes):
+    """``changes`` (a POSTed JSON body) as toggles to save; raises InvalidDisplayConfig."""
+    if not isinstance(changes, dict) or not changes:
+        raise InvalidDisplayConfig("Expected a JSON object of display toggles")
+    unknown = sorted(set(changes) - set(DEFAULT_DISPLAY_CONFIG))
+    if unknown:
+        raise InvalidDisplayConfig(f"Unknown display toggles: {', '.join(unknown)}; "
+                                   f"expected {', '.join(DEFAULT_DISPLAY_CONFIG)}")
+    not_bool = sorted(name for name, value in changes.items() if not isinstance(value, bool))
+    if not_bool:
+        raise InvalidDisplayConfig(f"Display toggles must be true or false: {', '.join(not_bool)}")
+    return changes
+
+
+def save_display_config(session, changes):
+    """Merge ``changes`` (validated) into the saved toggles and commit; returns the toggles in effect."""
+    # Locked, so concurrent saves from different workers don't drop each other's toggles
+    row = session.get(DisplayConfig, True, with_for_update=True)
+    if row is None:
+        row = DisplayConfig(id=True, config={})
+        session.add(row)
+    row.config = {**row.config, **changes}
+    config = display_config(row)
+    session.commit()
+    return config
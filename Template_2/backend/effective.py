@@ -0,0 +1,73 @@
+from datetime import date, datetime
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import func, literal, text
+from sqlalchemy.dialects.postgresql import DATERANGE
+from models import (
+    db, ProviderSpeciality, ProviderCertification, ProviderLanguage, ProviderInsurance, ProviderAffiliation
+)
+
+
+class InvalidEffectiveDate(ValueError):
+    pass
+
+
+##########################
+# Search date            #
+##########################
+
+# The data version and the date Provider_Search is valid on, in one
+# statement: both move together (migrations/010_effective_dates.sql)
+DIRECTORY_STATE = text(
+    "SELECT v.version, e.as_of FROM directory_data_version v CROSS JOIN provider_search_effective e"
+)
+
+
+def directory_state():
+    """``(data version, Provider_Search's as-of date)``."""
+    return tuple(db.session.execute(DIRECTORY_STATE).one())
+
+
+def today(timezone):
+    try:
+        return datetime.now(ZoneInfo(timezone)).date()
+    except ZoneInfoNotFoundError:
+        raise InvalidEffectiveDate(f"Unknown DIRECTORY_TIMEZONE: {timezone}")
+
+
+def resolve(filters, timezone):
+    """Resolve ``asOf`` from search.parse_filters in place, to an ISO date.
+
+    Without one the search is as of today in ``timezone``. Raises
+    InvalidEffectiveDate.
+    """
+    if filters["asOf"]:
+        try:
+            as_of = date.fromisoformat(filters["asOf"])
+        except ValueError:
+            raise InvalidEffectiveDate(f"asOf must be a date (YYYY-MM-DD), not {filters['asOf']!r}")
+    else:
+        as_of = today(timezone)
+    filters["asOf"] = as_of.isoformat()
+
+
+##########################
+# Predicates             #
+##########################
+
+# Dated child table -> the columns bounding each row's validity window,
+# both inclusive, either open when NULL
+EFFECTIVE_COLUMNS = {
+    ProviderSpeciality: ("ProviderSpecialityStartDate", "ProviderSpecialityEndDate"),
+    ProviderCertification: ("ProviderCertificateIssueDate", "ProviderCertificateExpiryDate"),
+    ProviderLanguage: ("ProviderLanguageStartDate", "ProviderLanguageEndDate"),
+    ProviderInsurance: ("ProviderPlanStartDate", "ProviderPlanEndDate"),
+    ProviderAffiliation: ("ProviderAffiliationStartDate", "ProviderAffiliationEndDate"),
+}
+
+
+def effective_on(model, as_of):
+    """Rows of dated ``model`` valid on ``as_of`` (an ISO date), as provider_search_source selects them."""
+    valid_from, valid_to = EFFECTIVE_COLUMNS[model]
+    window = func.provider_effective(getattr(model, valid_from), getattr(model, valid_to), type_=DATERANGE)
+    return window.op("@>")(literal(date.fromisoformat(as_of)))
@@ -0,0 +1,98 @@
+import csv
+import io
+import zlib
+
+from sqlalchemy import select
+
+from models import db, ProviderInfo, ProviderSearch
+from cards import CARD_FIELDS, card_plan, dumps
+from effective import directory_state, today
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# List fields (acceptedAllPlans, languagesSpoken) in a CSV cell
+CSV_LIST_SEPARATOR = "|"
+
+# Encoded output is handed on in pieces of about this many bytes
+EXPORT_WRITE_SIZE = 64 * 1024
+
+
+def export_cards(source, chunk_size, timezone):
+    """Every provider's card, as /api/providers builds it, in ProviderID order.
+
+    Cards are as of today in ``timezone``, like those of a search without
+    ``asOf``: the live tables join only the child rows valid today, and
+    Provider_Search is read only when it is valid today (the live tables
+    otherwise, as in SearchRequest.prepare).
+    Rows come from a server-side cursor ``chunk_size`` at a time; on the live
+    tables each chunk loads its child rows with one query per child table.
+    Nothing is kept once a card has been yielded, so memory stays flat
+    however large the directory is.
+    """
+    as_of = today(timezone)
+    _, search_as_of = directory_state()
+    if search_as_of != as_of:
+        source = "live"
+    model = ProviderInfo if source == "live" else ProviderSearch
+    plan = card_plan(model, CARD_FIELDS, as_of.isoformat() if model is ProviderInfo else None)
+    # A 2.0-style select: Model.query with yield_per fails with "Can't use
+    # the ORM yield_per feature in conjunction with unique()"
+    statement = (
+        select(model).options(*plan.options).order_by(model.ProviderID)
+        .execution_options(yield_per=chunk_size)
+    )
+    for row in db.session.scalars(statement):
+        yield plan.card(row)
+
+
+def ndjson_lines(cards):
+    for card in cards:
+        yield dumps(card) + b"\n"
+
+
+def csv_lines(cards):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = None
+    for card in cards:
+        if columns is None:
+            columns = list(card)
+            writer.writerow(columns)
+        writer.writerow([
+            CSV_LIST_SEPARATOR.join(value) if isinstance(value, list) else value
+            for value in (card[c] for c in columns)
+        ])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _batched(lines):
+    batch, size = [], 0
+    for line in lines:
+        batch.append(line)
+        size += len(line)
+        if size >= EXPORT_WRITE_SIZE:
+            yield b"".join(batch)
+            batch, size = [], 0
+    if batch:
+        yield b"".join(batch)
+
+
+def gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_directory(export_format, source, chunk_size, timezone, compress=False):
+    """The whole directory as ``export_format`` (see EXPORT_FORMATS), in bytes chunks."""
+    encode = ndjson_lines if export_format == "ndjson" else csv_lines
+    chunks = _batched(encode(export_cards(source, chunk_size, timezone)))
+    return gzipped(chunks) if compress else chunks
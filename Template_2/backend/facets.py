@@ -0,0 +1,77 @@
+from sqlalchemy import and_, func, literal, select, true, union_all
+
+from models import db, ProviderSearch
+from search import search_conditions
+
+# Facets counted, each named after the search filter it counts values of
+FACETS = ("specialty", "gender", "languagesSpoken", "acceptingNewPatients",
+          "virtualCare", "boardCertified", "hospitalAffiliations")
+
+# Yes/no facets -> the condition a row has for the value "true" or "false"
+BOOLEAN_FACETS = {
+    "acceptingNewPatients": lambda yes: ProviderSearch.AcceptingNewPatientsValues.contains(["Yes" if yes else "No"]),
+    "virtualCare": lambda yes: ProviderSearch.VirtualCareValues.contains(["Yes" if yes else "No"]),
+    "boardCertified": lambda yes: ProviderSearch.BoardCertifiedValues.contains(["Yes" if yes else "No"]),
+    # Same tests as the hospitalAffiliations filter in search.search_conditions
+    "hospitalAffiliations": lambda yes: ProviderSearch.HasAffiliation if yes else ~ProviderSearch.HasNamedAffiliation,
+}
+
+
+def _values(facet, included):
+    """SELECTs of (facet, value) for one Provider_Search row, when ``included``."""
+    if facet in BOOLEAN_FACETS:
+        return [
+            select(literal(facet).label("facet"), literal(value).label("value"))
+            .where(included, BOOLEAN_FACETS[facet](value == "true"))
+            for value in ("true", "false")
+        ]
+    if facet == "gender":
+        return [select(literal(facet).label("facet"), ProviderSearch.ProviderGender.label("value"))
+                .where(included, ProviderSearch.ProviderGender != None)]
+    # render_derived: the column list makes ".value" a column of the alias
+    if facet == "languagesSpoken":
+        values = func.unnest(ProviderSearch.Languages).table_valued("value").render_derived()
+    else:
+        values = func.unnest(
+            func.string_to_array(ProviderSearch.SpecialityNames, "\n")
+        ).table_valued("value").render_derived()
+    # DISTINCT: a provider counts once per value however many rows list it
+    return [select(literal(facet).label("facet"), values.c.value.label("value"))
+            .select_from(values).where(included).distinct()]
+
+
+def facet_statement(filters):
+    """One grouped query counting providers per value of every facet.
+
+    Each Provider_Search row matching the non-facet filters (text boxes,
+    experience, distance) is expanded, through a LATERAL subquery, into one
+    (facet, value) row per value it has, for each facet whose other facet
+    filters it passes. A facet's own filter is left out of its counts, so
+    the counts say how many results choosing that value would give.
+    """
+    conditions = search_conditions(filters)
+    common = [c for key, c in conditions.items() if key not in FACETS]
+
+    selects = []
+    for facet in FACETS:
+        included = and_(true(), *[c for key, c in conditions.items() if key in FACETS and key != facet])
+        selects.extend(s.correlate(ProviderSearch) for s in _values(facet, included))
+    values = union_all(*selects).lateral("facet_values")
+
+    return (
+        select(values.c.facet, values.c.value, func.count().label("count"))
+        .select_from(ProviderSearch)
+        .join(values, true())
+        .where(*common)
+        .group_by(values.c.facet, values.c.value)
+    )
+
+
+def count_facets(filters):
+    """``{facet: [{"value", "count"}, ...]}`` for filters from search.parse_filters (located), most common first."""
+    facets = {facet: [] for facet in FACETS}
+    for facet, value, count in db.session.execute(facet_statement(filters)):
+        facets[facet].append({"value": value, "count": count})
+    for values in facets.values():
+        values.sort(key=lambda v: (-v["count"], v["value"]))
+    return facets
@@ -0,0 +1,126 @@
+import math
+
+from sqlalchemy import Float, and_, cast, func, select
+from models import db, ProviderAddress, ProviderInfo, ProviderSearch, ProviderSearchLocation
+
+
+class InvalidLocation(ValueError):
+    pass
+
+
+##########################
+# Search center          #
+##########################
+
+# Shortest length of a degree of latitude, so a bounding box built from it
+# always contains the whole circle
+MILES_PER_DEGREE = 68.7
+
+
+def zip_center_query(filters):
+    """The lookup ``locate`` needs for ``near``, or None when it needs none."""
+    if filters["near"] is None or (filters["lat"] is not None and filters["lon"] is not None):
+        return None
+    return select(
+        func.avg(cast(ProviderAddress.ProviderLatitude, Float)),
+        func.avg(cast(ProviderAddress.ProviderLongitude, Float))
+    ).where(
+        ProviderAddress.ProviderZIPCode == filters["near"],
+        ProviderAddress.ProviderLatitude != None,
+        ProviderAddress.ProviderLongitude != None
+    )
+
+
+def locate(filters, max_radius, zip_center=None):
+    """Resolve the distance filters from search.parse_filters in place.
+
+    ``lat``/``lon`` give the center directly; ``near`` is a ZIP code, centered
+    on the average position of the addresses in it. Sets ``center`` to
+    ``[lat, lon]`` and caps ``distance`` (miles) at ``max_radius``, which is
+    also the radius when none is given. Without a center nothing changes
+    but ``lat``, ``lon`` and ``distance`` becoming numbers.
+    ``zip_center`` is the result of ``zip_center_query`` when the caller has
+    already run it (async_app.py); otherwise it runs on db.session.
+    """
+    for name in ("lat", "lon", "distance"):
+        filters[name] = _number(name, filters[name])
+    if (filters["lat"] is None) != (filters["lon"] is None):
+        raise InvalidLocation("lat and lon must be given together")
+    if filters["distance"] is not None and not filters["distance"] > 0:
+        raise InvalidLocation("distance must be greater than 0")
+
+    if filters["lat"] is not None:
+        if not (-90 <= filters["lat"] <= 90 and -180 <= filters["lon"] <= 180):
+            raise InvalidLocation("lat/lon out of range")
+        center = [filters["lat"], filters["lon"]]
+    elif filters["near"]:
+        lat, lon = zip_center or db.session.execute(zip_center_query(filters)).one()
+        if lat is None:
+            raise InvalidLocation(f"Unknown ZIP code: {filters['near']}")
+        center = [lat, lon]
+    else:
+        return
+
+    filters["center"] = center
+    filters["distance"] = min(filters["distance"] or max_radius, max_radius)
+
+
+def _number(name, value):
+    if value is None or isinstance(value, float):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        raise InvalidLocation(f"{name} must be a number, not {value!r}")
+
+
+##########################
+# Distance predicates    #
+##########################
+
+# (location rows, provider id column, latitude, longitude) per searchable
+# model. The expressions match the GiST indexes in migrations/005_geo_search.sql.
+def _locations(model):
+    if model is ProviderSearch:
+        return (ProviderSearchLocation, ProviderSearchLocation.ProviderID,
+                ProviderSearchLocation.Latitude, ProviderSearchLocation.Longitude)
+    return (ProviderAddress, ProviderAddress.ProviderID,
+            cast(ProviderAddress.ProviderLatitude, Float), cast(ProviderAddress.ProviderLongitude, Float))
+
+
+def _distance(latitude, longitude, center):
+    return func.provider_distance_miles(latitude, longitude, center[0], center[1], type_=Float)
+
+
+def _box(center, miles):
+    # Widened towards the pole, where a degree of longitude is shortest.
+    # Searches across the antimeridian are not supported.
+    lat, lon = center
+    dlat = miles / MILES_PER_DEGREE
+    edge = min(abs(lat) + dlat, 89.0)
+    dlon = min(miles / (MILES_PER_DEGREE * math.cos(math.radians(edge))), 180.0)
+    return func.box(func.point(lon - dlon, lat - dlat), func.point(lon + dlon, lat + dlat))
+
+
+def within_distance(model, filters):
+    """Providers with an address within ``distance`` miles of ``center``."""
+    _, provider_id, latitude, longitude = _locations(model)
+    center, miles = filters["center"], filters["distance"]
+    # The box test is the indexed one; the exact distance rechecks its corners
+    near = and_(
+        func.point(longitude, latitude).op("<@")(_box(center, miles)),
+        _distance(latitude, longitude, center) <= miles
+    )
+    if model is ProviderSearch:
+        return ProviderSearch.ProviderID.in_(select(provider_id).where(near))
+    return ProviderInfo.addresses.any(near)
+
+
+def distance_key(model, center):
+    """Miles from ``center`` to the provider's nearest address."""
+    _, provider_id, latitude, longitude = _locations(model)
+    return (
+        select(func.min(_distance(latitude, longitude, center)))
+        .where(provider_id == model.ProviderID)
+        .scalar_subquery()
+    )
@@ -0,0 +1,96 @@
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+
+# Production server: gunicorn -c gunicorn.conf.py
+#
+# The app is imported once in the master and forked into WEB_CONCURRENCY
+# workers, each serving GUNICORN_THREADS requests at a time. Every worker has
+# its own SQLAlchemy pool (DB_POOL_SIZE + DB_MAX_OVERFLOW connections, see
+# config.py), so the database sees up to
+#
+#     WEB_CONCURRENCY * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+#
+# connections from one instance. README.md ("Production serving") has the
+# sizing rules.
+
+wsgi_app = "app:app"
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then, staggered so they do not restart together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+
+# Every worker writes its Prometheus metrics (instrumentation.py) here, and
+# /metrics merges them. Set before the app is imported; emptied on start so
+# counters from a previous run are not merged in.
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/provider_metrics")
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+# The columnar snapshot builder (columnar.py), when one runs
+columnar_builder = None
+
+
+def when_ready(server):
+    # Load the typeahead index once, in the master, so every worker starts
+    # with it (and shares its pages until they are written to)
+    global columnar_builder
+    from app import app, suggest_index, columnar_engine
+    from columnar import available
+
+    with app.app_context():
+        try:
+            suggest_index.load()
+        except Exception:
+            server.log.exception("Suggest index not loaded; workers load it on first use")
+        # The filter index: a builder process keeps the snapshot the workers
+        # map up to date or, without a snapshot directory, the master loads
+        # it for the workers to share read-only until they reload it
+        if app.config["COLUMNAR_ENGINE"] and available():
+            if app.config["COLUMNAR_SNAPSHOT_DIR"]:
+                columnar_builder = subprocess.Popen(
+                    [sys.executable, "-m", "flask", "--app", "app", "columnar-snapshot", "--watch"]
+                )
+            else:
+                try:
+                    columnar_engine.load()
+                except Exception:
+                    server.log.exception("Columnar index not loaded; workers load it on first search")
+
+
+def on_exit(server):
+    if columnar_builder is not None:
+        columnar_builder.terminate()
+        columnar_builder.wait()
+
+
+def post_fork(server, worker):
+    # Connections opened while the master imported the app (db.create_all)
+    # must not be shared with the forked workers: drop them from the pool
+    # without closing the master's sockets.
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges; its counters and histograms stay
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
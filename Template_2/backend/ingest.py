@@ -0,0 +1,433 @@
+import csv
+import gzip
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from models import (
+    db, ProviderInfo, ProviderAddress, ProviderCommunication, ProviderSpeciality,
+    ProviderCertification, ProviderLanguage, ProviderLocation, ProviderInsurance,
+    ProviderAffiliation, ProviderLicense, ProviderVisitMode, ProviderRatings
+)
+
+
+class InvalidRoster(ValueError):
+    pass
+
+
+##########################
+# Roster files           #
+##########################
+
+# File name (without .csv/.ndjson/.jsonl and an optional .gz) -> table, as
+# in Postgres_DB/. Merged in this order: providers first, then locations,
+# which the language, insurance and visit mode rows reference.
+ROSTER_FILES = {
+    "provider_info": ProviderInfo,
+    "provider_location": ProviderLocation,
+    "provider_address": ProviderAddress,
+    "provider_communication": ProviderCommunication,
+    "provider_speciality": ProviderSpeciality,
+    "provider_certification": ProviderCertification,
+    "provider_language": ProviderLanguage,
+    "provider_insurance": ProviderInsurance,
+    "provider_affiliation": ProviderAffiliation,
+    "provider_license": ProviderLicense,
+    "provider_visit_mode": ProviderVisitMode,
+    "provider_ratings": ProviderRatings,
+}
+MERGE_ORDER = list(ROSTER_FILES.values())
+
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+# Session advisory lock held for a whole import: staging tables have fixed
+# names, so two imports must not overlap
+IMPORT_LOCK = 7_310_001
+
+# Bytes read between progress reports for one file
+PROGRESS_EVERY = 8 * 1024 * 1024
+
+# An import touching more than this share of the directory rebuilds
+# Provider_Search and the rating summary instead of refreshing provider by provider
+REBUILD_FRACTION = 0.25
+
+
+def _split_name(path):
+    name = os.path.basename(path)
+    compressed = name.endswith(".gz")
+    stem, ext = os.path.splitext(name[:-3] if compressed else name)
+    return stem, ext, compressed
+
+
+def roster_files(paths):
+    """The roster files among ``paths``; directories contribute the files in them with roster names."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                stem, ext, _ = _split_name(name)
+                if stem in ROSTER_FILES and ext in FORMATS:
+                    files.append(os.path.join(path, name))
+        else:
+            files.append(path)
+    return files
+
+
+def _array_literal(values):
+    return "{" + ",".join(
+        "NULL" if v is None else '"%s"' % str(v).replace("\\", "\\\\").replace('"', '\\"') for v in values
+    ) + "}"
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return _array_literal(value)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return value
+
+
+class _NdjsonAsCsv:
+    """``read()`` over NDJSON lines that returns the same records as CSV, for COPY."""
+
+    def __init__(self, lines, columns):
+        self.lines = lines
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+
+    def read(self, size=8192):
+        while self.buffer.tell() < size:
+            line = self.lines.readline()
+            if not line:
+                break
+            if line.strip():
+                record = json.loads(line)
+                unknown = set(record) - set(self.columns)
+                if unknown:
+                    raise InvalidRoster("unexpected fields %s (the first record sets the columns)"
+                                        % ", ".join(sorted(unknown)))
+                self.writer.writerow([_csv_value(record.get(c)) for c in self.columns])
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+
+class _Progress:
+    """Passes ``read()`` through, reporting how far into the file (on disk) it is."""
+
+    def __init__(self, source, raw, report):
+        self.source = source
+        self.raw = raw
+        self.report = report
+        self.reported = 0
+
+    def read(self, size=8192):
+        data = self.source.read(size)
+        position = self.raw.tell()
+        if self.report and (not data or position - self.reported >= PROGRESS_EVERY):
+            self.report(position)
+            self.reported = position
+        return data
+
+
+class RosterFile:
+    """One roster file: the table it loads, its columns and its staging table.
+
+    CSV files need a header row; NDJSON files take their columns from the
+    first record. Column names are those of models.py. Provider_Info rows
+    need ``ProviderNPI``; child rows name their provider by ``ProviderNPI``
+    or by a ``ProviderID`` from the same import or already in the directory.
+    A child's own ID column is optional.
+    """
+
+    def __init__(self, path):
+        stem, ext, self.compressed = _split_name(path)
+        if stem not in ROSTER_FILES or ext not in FORMATS:
+            raise InvalidRoster(
+                f"{path}: expected <table>.csv, .ndjson or .jsonl (optionally .gz), "
+                f"with <table> one of {', '.join(ROSTER_FILES)}"
+            )
+        self.path = path
+        self.model = ROSTER_FILES[stem]
+        self.format = FORMATS[ext]
+        self.size = os.path.getsize(path)
+        self.table = self.model.__tablename__
+        self.staging = '"ingest_%s"' % self.table.lower()
+        self.primary_key = list(self.model.__table__.primary_key.columns)[0].name
+
+        raw, text = self._open()
+        try:
+            self.columns = self._read_columns(text)
+        finally:
+            raw.close()
+        self._check_columns()
+
+    def _open(self):
+        raw = open(self.path, "rb")
+        binary = gzip.GzipFile(fileobj=raw) if self.compressed else raw
+        return raw, io.TextIOWrapper(binary, encoding="utf-8", newline="")
+
+    def _read_columns(self, text):
+        if self.format == "csv":
+            return next(csv.reader(text), [])
+        for line in text:
+            if line.strip():
+                return list(json.loads(line))
+        return []
+
+    def _check_columns(self):
+        allowed = {c.name for c in self.model.__table__.columns} | {"ProviderNPI"}
+        unknown = [c for c in self.columns if c not in allowed]
+        if unknown:
+            raise InvalidRoster(f"{self.path}: unknown columns {', '.join(unknown)}")
+        if self.model is ProviderInfo:
+            if "ProviderNPI" not in self.columns:
+                raise InvalidRoster(f"{self.path}: ProviderNPI is required")
+            return
+        if "ProviderNPI" not in self.columns and "ProviderID" not in self.columns:
+            raise InvalidRoster(f"{self.path}: ProviderNPI or ProviderID is required")
+        if "LocationID" in allowed and "LocationID" not in self.columns:
+            raise InvalidRoster(f"{self.path}: LocationID is required")
+
+    def reader(self, report=None):
+        """The file's data rows as CSV text for COPY; close ``raw`` when done."""
+        raw, text = self._open()
+        if self.format == "csv":
+            next(csv.reader(text), None)  # the header
+            source = text
+        else:
+            source = _NdjsonAsCsv(text, self.columns)
+        return raw, _Progress(source, raw, report)
+
+
+##########################
+# Staging (parallel)     #
+##########################
+
+def _stage(engine, roster, progress):
+    # Each file is copied on its own connection into an UNLOGGED, all-text
+    # table; `_line` keeps file order so the last row for a key wins
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        columns = ", ".join('"%s"' % c for c in roster.columns)
+        cursor.execute("DROP TABLE IF EXISTS %s" % roster.staging)
+        cursor.execute("CREATE UNLOGGED TABLE %s (_line bigserial, %s)" % (
+            roster.staging, ", ".join('"%s" text' % c for c in roster.columns)
+        ))
+        report = (lambda done: progress(roster.table, done, roster.size)) if progress else None
+        raw, reader = roster.reader(report)
+        try:
+            cursor.copy_expert("COPY %s (%s) FROM STDIN WITH (FORMAT csv)" % (roster.staging, columns), reader)
+        finally:
+            raw.close()
+        cursor.execute("ANALYZE %s" % roster.staging)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+##########################
+# Merge (one transaction) #
+##########################
+
+def _column_types(cursor, table):
+    # models.py and postgre.sql disagree on key types (varchar vs uuid), so
+    # casts use whatever the database actually has
+    cursor.execute(
+        "SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute"
+        " WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped",
+        ('"%s"' % table,)
+    )
+    return dict(cursor.fetchall())
+
+
+def _upsert(cursor, table, key, columns, select):
+    """INSERT .. ON CONFLICT of ``select`` (yielding ``key`` then ``columns``); returns (inserted, updated)."""
+    names = ", ".join('"%s"' % c for c in [key] + columns)
+    assignments = ", ".join('"%s" = EXCLUDED."%s"' % (c, c) for c in columns)
+    cursor.execute(f"""
+        WITH upserted AS (
+            INSERT INTO "{table}" ({names})
+            {select}
+            ON CONFLICT ("{key}") DO UPDATE SET {assignments}
+            RETURNING (xmax = 0) AS inserted
+        )
+        SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM upserted
+    """)
+    return cursor.fetchone()
+
+
+def _merge_providers(cursor, roster):
+    types = _column_types(cursor, "Provider_Info")
+    id_type = types["ProviderID"]
+    file_id = 's."ProviderID"' if "ProviderID" in roster.columns else "NULL::text"
+
+    # One ProviderID per NPI: the existing provider's, else the file's when
+    # it is free, else one derived from the NPI so re-runs agree
+    cursor.execute(f"""
+        INSERT INTO ingest_provider_ids (_line, npi, file_id, provider_id)
+        SELECT DISTINCT ON (s."ProviderNPI") s._line, s."ProviderNPI", {file_id},
+               coalesce(
+                   (SELECT min(p."ProviderID"::text) FROM "Provider_Info" p
+                     WHERE p."ProviderNPI" = s."ProviderNPI"),
+                   CASE WHEN NOT EXISTS (SELECT 1 FROM "Provider_Info" p
+                                          WHERE p."ProviderID" = CAST({file_id} AS {id_type}))
+                        THEN {file_id} END,
+                   md5('provider:' || s."ProviderNPI")::uuid::text
+               )
+          FROM {roster.staging} s
+         WHERE s."ProviderNPI" IS NOT NULL
+         ORDER BY s."ProviderNPI", s._line DESC
+    """)
+    cursor.execute("ANALYZE ingest_provider_ids")
+    cursor.execute('SELECT count(*) FROM %s WHERE "ProviderNPI" IS NULL' % roster.staging)
+    rejected = cursor.fetchone()[0]
+
+    columns = [c for c in roster.columns if c != "ProviderID"]
+    values = ", ".join('CAST(s."%s" AS %s)' % (c, types[c]) for c in columns)
+    inserted, updated = _upsert(cursor, "Provider_Info", "ProviderID", columns, f"""
+        SELECT DISTINCT ON (m.provider_id) CAST(m.provider_id AS {id_type}), {values}
+          FROM ingest_provider_ids m JOIN {roster.staging} s ON s._line = m._line
+         ORDER BY m.provider_id, m._line DESC
+    """)
+    cursor.execute("INSERT INTO ingest_affected SELECT provider_id FROM ingest_provider_ids ON CONFLICT DO NOTHING")
+    return inserted, updated, rejected
+
+
+def _merge_children(cursor, roster):
+    table, key = roster.table, roster.primary_key
+    types = _column_types(cursor, table)
+    data = [c for c in roster.columns if c not in (key, "ProviderID", "ProviderNPI")]
+
+    if "ProviderNPI" in roster.columns:
+        provider = ('(SELECT min(p."ProviderID"::text) FROM "Provider_Info" p'
+                    ' WHERE p."ProviderNPI" = s."ProviderNPI")')
+        join = ""
+    else:
+        # A ProviderID from this import's Provider_Info file, or one already stored
+        provider = 'coalesce(m.provider_id, p."ProviderID"::text)'
+        join = ('LEFT JOIN ingest_provider_ids m ON m.file_id = s."ProviderID"'
+                ' LEFT JOIN "Provider_Info" p ON p."ProviderID"::text = s."ProviderID"')
+
+    # Rows without an ID get one derived from their provider and content, so
+    # importing the same file again updates them instead of adding copies
+    given_id = 'x."%s"' % key if key in roster.columns else "NULL"
+    content = ", ".join('x."%s"' % c for c in data)
+    cursor.execute(f"""
+        CREATE TEMP TABLE ingest_rows ON COMMIT DROP AS
+        SELECT x.*, coalesce({given_id}, md5(x.ingest_provider_id || ':' || ROW({content})::text)::uuid::text)
+                    AS ingest_record_id
+          FROM (SELECT s.*, {provider} AS ingest_provider_id FROM {roster.staging} s {join}) x
+    """)
+
+    unknown = "ingest_provider_id IS NULL"
+    if "LocationID" in data:
+        unknown += (' OR NOT EXISTS (SELECT 1 FROM "Provider_Location" l WHERE l."ProviderLocationID"'
+                    ' = CAST(ingest_rows."LocationID" AS %s))' % types["LocationID"])
+    cursor.execute("DELETE FROM ingest_rows WHERE %s" % unknown)
+    rejected = cursor.rowcount
+    cursor.execute("ANALYZE ingest_rows")
+
+    # The file is the full list of this table's rows for each provider in it
+    cursor.execute(f"""
+        DELETE FROM "{table}" t
+         USING (SELECT DISTINCT ingest_provider_id FROM ingest_rows) a
+         WHERE t."ProviderID" = CAST(a.ingest_provider_id AS {types["ProviderID"]})
+           AND NOT EXISTS (SELECT 1 FROM ingest_rows r WHERE r.ingest_record_id = t."{key}"::text)
+    """)
+
+    columns = ["ProviderID"] + data
+    values = ", ".join(['CAST(r.ingest_provider_id AS %s)' % types["ProviderID"]]
+                       + ['CAST(r."%s" AS %s)' % (c, types[c]) for c in data])
+    inserted, updated = _upsert(cursor, table, key, columns, f"""
+        SELECT DISTINCT ON (r.ingest_record_id) CAST(r.ingest_record_id AS {types[key]}), {values}
+          FROM ingest_rows r
+         ORDER BY r.ingest_record_id, r._line DESC
+    """)
+    cursor.execute("INSERT INTO ingest_affected SELECT DISTINCT ingest_provider_id FROM ingest_rows"
+                   " ON CONFLICT DO NOTHING")
+    cursor.execute("DROP TABLE ingest_rows")
+    return inserted, updated, rejected
+
+
+def _refresh_derived(cursor):
+    cursor.execute("SELECT (SELECT count(*) FROM ingest_affected), (SELECT count(*) FROM \"Provider_Info\")")
+    affected, providers = cursor.fetchone()
+    if affected > REBUILD_FRACTION * providers:
+        cursor.execute("SELECT provider_search_rebuild()")
+        return
+    ids = ('ARRAY(SELECT p."ProviderID" FROM "Provider_Info" p'
+           ' JOIN ingest_affected a ON a.provider_id = p."ProviderID"::text)')
+    cursor.execute("SELECT provider_rating_summary_refresh(%s)" % ids)
+    cursor.execute("SELECT provider_search_refresh(%s)" % ids)
+
+
+def _merge(cursor, rosters):
+    # Triggers would refresh Provider_Search once per statement; refresh the
+    # affected providers once at the end instead
+    cursor.execute("SET LOCAL provider_search.defer = on")
+    cursor.execute("CREATE TEMP TABLE ingest_provider_ids"
+                   " (_line bigint, npi text, file_id text, provider_id text) ON COMMIT DROP")
+    cursor.execute("CREATE TEMP TABLE ingest_affected (provider_id text PRIMARY KEY) ON COMMIT DROP")
+
+    stats = []
+    for roster in rosters:
+        merge = _merge_providers if roster.model is ProviderInfo else _merge_children
+        inserted, updated, rejected = merge(cursor, roster)
+        stats.append({"table": roster.table, "inserted": inserted, "updated": updated, "rejected": rejected})
+    _refresh_derived(cursor)
+    return stats
+
+
+def import_roster(paths, workers=4, progress=None):
+    """Bulk-load roster files into Provider_Info and its child tables.
+
+    Files (see ``RosterFile``) are streamed with COPY into staging tables,
+    ``workers`` at a time, then merged in one transaction: providers are
+    matched by NPI and updated or inserted; each child file replaces that
+    table's rows for the providers it lists, keeping rows by ID. Rows whose
+    provider or location cannot be found are skipped and counted. Importing
+    the same files twice changes nothing. Memory use does not depend on file
+    size. ``progress(table, bytes_read, file_size)`` is called while copying.
+    Must run inside an app context; returns per-table counts.
+    """
+    rosters = [RosterFile(path) for path in roster_files(paths)]
+    if not rosters:
+        raise InvalidRoster("no roster files given")
+    tables = [roster.table for roster in rosters]
+    duplicated = sorted({t for t in tables if tables.count(t) > 1})
+    if duplicated:
+        raise InvalidRoster(f"more than one file for {', '.join(duplicated)}")
+    rosters.sort(key=lambda roster: MERGE_ORDER.index(roster.model))
+
+    engine = db.engine
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT pg_advisory_lock(%s)", (IMPORT_LOCK,))
+        connection.commit()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(lambda roster: _stage(engine, roster, progress), rosters))
+            stats = _merge(cursor, rosters)
+            connection.commit()
+            for roster in rosters:
+                cursor.execute('ANALYZE "%s"' % roster.table)
+            connection.commit()
+            return stats
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            for roster in rosters:
+                cursor.execute("DROP TABLE IF EXISTS %s" % roster.staging)
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (IMPORT_LOCK,))
+            connection.commit()
+    finally:
+        connection.close()
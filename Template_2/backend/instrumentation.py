@@ -0,0 +1,220 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, multiprocess
+)
+
+
+# Per-request measurements: every SQL statement (through engine events),
+# named phases of the handler (``phase("count")``) and cache lookups, sent
+# back as a Server-Timing header and aggregated into Prometheus histograms
+# served by /metrics. Under gunicorn each worker writes its metrics to
+# PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py) and /metrics merges them.
+
+LATENCY_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+# Distinct filter shapes kept as labels per worker; later ones count as "other"
+MAX_SHAPES = 256
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Request handling time",
+                            ["route", "method", "status"], buckets=LATENCY_BUCKETS)
+DB_SECONDS = Histogram("db_time_seconds", "Time spent in SQL statements per request",
+                       ["route"], buckets=LATENCY_BUCKETS)
+DB_STATEMENTS = Histogram("db_statements_per_request", "SQL statements per request",
+                          ["route"], buckets=COUNT_BUCKETS)
+DB_ROWS = Histogram("db_rows_per_request", "Rows fetched per request", ["route"], buckets=ROW_BUCKETS)
+PHASE_SECONDS = Histogram("request_phase_seconds", "Time spent in a named phase of a request",
+                          ["route", "phase"], buckets=LATENCY_BUCKETS)
+SEARCH_SECONDS = Histogram("search_duration_seconds", "Search request time by filter shape and sort",
+                           ["route", "shape", "sort"], buckets=LATENCY_BUCKETS)
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result", ["cache", "result"])
+
+
+class RequestStats:
+    __slots__ = ("start", "statements", "db_seconds", "rows", "phases", "caches", "shape", "sort")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.phases = {}
+        self.caches = {}
+        self.shape = self.sort = None
+
+
+_current = ContextVar("request_stats", default=None)
+_shapes = set()
+_shapes_lock = threading.Lock()
+# (metric, label values) -> labelled child; labels() locks and validates on every call
+_children = {}
+
+
+def _child(metric, *labels):
+    child = _children.get((metric, labels))
+    if child is None:
+        child = _children[(metric, labels)] = metric.labels(*labels)
+    return child
+
+
+##########################
+# Recording              #
+##########################
+
+@contextmanager
+def phase(name):
+    """Time the enclosed block as ``name`` in the current request (no-op outside one)."""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[name] = stats.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def note_cache(cache, hit):
+    stats = _current.get()
+    if stats is not None:
+        stats.caches[cache] = "hit" if hit else "miss"
+
+
+def note_search(shape, sort_by="none"):
+    """Label the current request with its filter shape (see search.filter_shape) and sort."""
+    stats = _current.get()
+    if stats is None:
+        return
+    if shape not in _shapes:
+        with _shapes_lock:
+            if len(_shapes) < MAX_SHAPES:
+                _shapes.add(shape)
+            else:
+                shape = "other"
+    stats.shape, stats.sort = shape, sort_by
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._instrumentation_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    start = getattr(context, "_instrumentation_start", None)
+    if stats is None or start is None:
+        return
+    stats.db_seconds += time.perf_counter() - start
+    stats.statements += 1
+    # Client-side cursors know their row count; server-side (yield_per) ones do not
+    if cursor.description is not None and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+
+
+###########################
+# Flask/Quart integration #
+###########################
+
+def _server_timing(stats, total):
+    parts = ['db;dur=%.1f;desc="%d queries, %d rows"' % (stats.db_seconds * 1000, stats.statements, stats.rows)]
+    parts.extend("%s;dur=%.1f" % (name, seconds * 1000) for name, seconds in stats.phases.items())
+    parts.extend('%s-cache;desc="%s"' % (cache, result) for cache, result in stats.caches.items())
+    parts.append("total;dur=%.1f" % (total * 1000))
+    return ", ".join(parts)
+
+
+def _start():
+    _current.set(RequestStats())
+
+
+def _finish(response):
+    return _record(response, request)
+
+
+def _record(response, request):
+    stats = _current.get()
+    if stats is None:
+        return response
+    # The response cache reports itself through X-Cache (app.py)
+    if response.headers.get("X-Cache"):
+        stats.caches["response"] = response.headers["X-Cache"].lower()
+    total = time.perf_counter() - stats.start
+    response.headers["Server-Timing"] = _server_timing(stats, total)
+
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    _child(REQUEST_SECONDS, route, request.method, str(response.status_code)).observe(total)
+    _child(DB_SECONDS, route).observe(stats.db_seconds)
+    _child(DB_STATEMENTS, route).observe(stats.statements)
+    _child(DB_ROWS, route).observe(stats.rows)
+    for name, seconds in stats.phases.items():
+        _child(PHASE_SECONDS, route, name).observe(seconds)
+    for cache, result in stats.caches.items():
+        _child(CACHE_LOOKUPS, cache, result).inc()
+    if stats.shape is not None:
+        _child(SEARCH_SECONDS, route, stats.shape, stats.sort).observe(total)
+    return response
+
+
+def _teardown(exc):
+    _current.set(None)
+
+
+def _listen():
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def init_app(app):
+    """Instrument every request of ``app`` and every statement of any engine."""
+    if not app.config["INSTRUMENTATION"]:
+        return
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.teardown_request(_teardown)
+    _listen()
+
+
+def init_async_app(app):
+    """``init_app`` for async_app.py's Quart app.
+
+    The hooks are coroutines: Quart would run plain functions in a thread,
+    outside the request's context.
+    """
+    if not app.config["INSTRUMENTATION"]:
+        return
+    from quart import request as async_request
+
+    @app.before_request
+    async def start():
+        _start()
+
+    @app.after_request
+    async def finish(response):
+        return _record(response, async_request)
+
+    @app.teardown_request
+    async def teardown(exc):
+        _teardown(exc)
+
+    _listen()
+
+
+def metrics():
+    """(body, content type) of the Prometheus exposition of every worker's metrics."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,45 @@
+import os
+
+from models import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def pending_migrations(applied):
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        if filename.endswith(".sql") and filename[:-4] not in applied:
+            yield filename[:-4], os.path.join(MIGRATIONS_DIR, filename)
+
+
+def apply_migrations():
+    """Apply every migrations/*.sql file not yet recorded in schema_migrations.
+
+    Files run in name order, each in its own transaction, so a failing
+    migration leaves the earlier ones applied and itself not recorded.
+    Returns the versions applied by this call.
+    """
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            ' version varchar PRIMARY KEY,'
+            ' applied_at timestamptz NOT NULL DEFAULT now())'
+        )
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+        connection.commit()
+
+        done = []
+        for version, path in pending_migrations(applied):
+            with open(path) as f:
+                cursor.execute(f.read())
+            cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+            connection.commit()
+            done.append(version)
+        return done
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
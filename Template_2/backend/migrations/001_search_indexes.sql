@@ -0,0 +1,49 @@
+-- Indexes for the /api/providers hot paths.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Every child lookup (selectinload batches, EXISTS filters, sort subqueries)
+-- probes the child table by ProviderID.
+CREATE INDEX IF NOT EXISTS ix_provider_address_provider_id ON "Provider_Address" ("ProviderID");
+CREATE INDEX IF NOT EXISTS ix_provider_communication_provider_id ON "Provider_Communication" ("ProviderID");
+CREATE INDEX IF NOT EXISTS ix_provider_speciality_provider_id ON "Provider_Speciality" ("ProviderID");
+CREATE INDEX IF NOT EXISTS ix_provider_location_provider_id ON "Provider_Location" ("ProviderID");
+CREATE INDEX IF NOT EXISTS ix_provider_language_provider_id ON "Provider_Language" ("ProviderID");
+CREATE INDEX IF NOT EXISTS ix_provider_insurance_provider_id ON "Provider_Insurance" ("ProviderID");
+CREATE INDEX IF NOT EXISTS ix_provider_affiliation_provider_id ON "Provider_Affiliation" ("ProviderID");
+CREATE INDEX IF NOT EXISTS ix_provider_license_provider_id ON "Provider_License" ("ProviderID");
+CREATE INDEX IF NOT EXISTS ix_provider_visitmode_provider_id ON "Provider_VisitMode" ("ProviderID");
+CREATE INDEX IF NOT EXISTS ix_provider_leaveschedule_provider_id ON "Provider_LeaveSchedule" ("ProviderID");
+
+-- ProviderID-leading composites: they serve the plain ProviderID lookups
+-- too, and let the experience and rating sort keys (max / avg per
+-- provider) be computed from the index alone.
+CREATE INDEX IF NOT EXISTS ix_provider_certification_provider_id_experience
+    ON "Provider_Certification" ("ProviderID", "ProviderYearsOfExperience");
+CREATE INDEX IF NOT EXISTS ix_provider_ratings_provider_id_value
+    ON "Provider_Ratings" ("ProviderID", "RatingValue");
+
+-- ilike '%term%' filters: name, specialty and location boxes
+CREATE INDEX IF NOT EXISTS ix_provider_info_first_name_trgm
+    ON "Provider_Info" USING gin ("ProviderFirstName" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_provider_info_last_name_trgm
+    ON "Provider_Info" USING gin ("ProviderLastName" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_provider_info_middle_initial_trgm
+    ON "Provider_Info" USING gin ("ProviderMiddleInitial" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_provider_address_city_trgm
+    ON "Provider_Address" USING gin ("ProviderCity" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_provider_address_state_trgm
+    ON "Provider_Address" USING gin ("ProviderState" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_provider_address_zip_trgm
+    ON "Provider_Address" USING gin ("ProviderZIPCode" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_provider_speciality_name_trgm
+    ON "Provider_Speciality" USING gin ("ProviderSpecialityName" gin_trgm_ops);
+
+-- languagesSpoken uses the array overlap (&&) operator
+CREATE INDEX IF NOT EXISTS ix_provider_language_languages
+    ON "Provider_Language" USING gin ("ProviderLanguage");
+
+-- name-asc / name-desc order by this exact expression (see pagination.py),
+-- so the keyset seek and ORDER BY ... LIMIT walk the index.
+CREATE INDEX IF NOT EXISTS ix_provider_info_name_sort
+    ON "Provider_Info" ((coalesce("ProviderFirstName", '')), "ProviderID");
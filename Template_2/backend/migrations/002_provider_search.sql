@@ -0,0 +1,179 @@
+-- Denormalized "Provider_Search" table (models.ProviderSearch), kept in sync
+-- with the Provider_* tables by statement-level triggers.
+--
+-- provider_search_source computes the flattened row from the live tables;
+-- the table is a stored copy of it. "First" child rows are the ones with
+-- the lowest primary key, so the choice is stable across refreshes.
+
+CREATE OR REPLACE VIEW provider_search_source AS
+SELECT
+    p."ProviderID",
+    p."ProviderFirstName",
+    p."ProviderMiddleInitial",
+    p."ProviderLastName",
+    p."ProviderType",
+    p."ProviderGender",
+    p."ProviderNPI",
+    a."ProviderAddressLine1",
+    a."ProviderAddressLine2",
+    a."ProviderCity",
+    a."ProviderState",
+    a."ProviderZIPCode",
+    c."ProviderPhoneNo",
+    c."ProviderEmail",
+    s."ProviderSpecialityName",
+    ce."ProviderDegree",
+    ce."ProviderBoardName",
+    ce."ProviderBoardCertified",
+    ce."ProviderYearsOfExperience",
+    i."ProviderPlanName",
+    af."ProviderAffiliationName",
+    v."Acceptingnewpatients",
+    v."VirtualCare",
+    (SELECT avg(r."RatingValue") FROM "Provider_Ratings" r
+      WHERE r."ProviderID" = p."ProviderID") AS "AverageRating",
+    ARRAY(SELECT DISTINCT lang FROM "Provider_Language" l, unnest(l."ProviderLanguage") lang
+           WHERE l."ProviderID" = p."ProviderID" ORDER BY lang) AS "Languages",
+    (SELECT string_agg(x."ProviderSpecialityName", E'\n' ORDER BY x."SpecialityID")
+       FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID") AS "SpecialityNames",
+    (SELECT string_agg(concat_ws(E'\n', x."ProviderCity", x."ProviderState", x."ProviderZIPCode"), E'\n' ORDER BY x."AddressID")
+       FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID") AS "LocationNames",
+    (SELECT max(x."ProviderYearsOfExperience") FROM "Provider_Certification" x
+      WHERE x."ProviderID" = p."ProviderID") AS "MaxYearsOfExperience",
+    ARRAY(SELECT DISTINCT x."ProviderBoardCertified" FROM "Provider_Certification" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."ProviderBoardCertified" IS NOT NULL
+           ORDER BY 1) AS "BoardCertifiedValues",
+    ARRAY(SELECT DISTINCT x."Acceptingnewpatients" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."Acceptingnewpatients" IS NOT NULL
+           ORDER BY 1) AS "AcceptingNewPatientsValues",
+    ARRAY(SELECT DISTINCT x."VirtualCare" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."VirtualCare" IS NOT NULL
+           ORDER BY 1) AS "VirtualCareValues",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID") AS "HasAffiliation",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID" AND x."ProviderAffiliationName" IS NOT NULL) AS "HasNamedAffiliation"
+FROM "Provider_Info" p
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AddressID" LIMIT 1) a ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Communication" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CommunicationID" LIMIT 1) c ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."SpecialityID" LIMIT 1) s ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Certification" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CertificationID" LIMIT 1) ce ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Insurance" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."InsuranceRecordID" LIMIT 1) i ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Affiliation" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AffiliationID" LIMIT 1) af ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_VisitMode" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."VisitModeID" LIMIT 1) v ON true;
+
+
+-- Re-derive the rows of the given providers. `ids` has the type of
+-- Provider_Info."ProviderID" (uuid in postgre.sql, varchar when the tables
+-- come from models.py), so the lookup into the source stays indexable.
+CREATE OR REPLACE FUNCTION provider_search_refresh(ids anyarray) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM "Provider_Search" WHERE "ProviderID" = ANY (ids::text[]);
+    INSERT INTO "Provider_Search"
+    SELECT * FROM provider_search_source WHERE "ProviderID" = ANY (ids);
+END
+$$;
+
+CREATE OR REPLACE FUNCTION provider_search_rebuild() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE "Provider_Search";
+    INSERT INTO "Provider_Search" SELECT * FROM provider_search_source;
+END
+$$;
+
+
+-- Statement-level triggers see every changed row at once through their
+-- transition tables, so a multi-row write refreshes each provider once.
+-- Bulk loaders can `SET provider_search.defer = on`, load, then call
+-- provider_search_rebuild() instead.
+CREATE OR REPLACE FUNCTION provider_search_sync_inserted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('provider_search.defer', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM provider_search_refresh(ARRAY(SELECT DISTINCT "ProviderID" FROM new_rows));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION provider_search_sync_deleted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('provider_search.defer', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM provider_search_refresh(ARRAY(SELECT DISTINCT "ProviderID" FROM old_rows));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION provider_search_sync_updated() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('provider_search.defer', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM provider_search_refresh(ARRAY(
+        SELECT "ProviderID" FROM new_rows UNION SELECT "ProviderID" FROM old_rows
+    ));
+    RETURN NULL;
+END
+$$;
+
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'Provider_Info', 'Provider_Address', 'Provider_Communication', 'Provider_Speciality',
+        'Provider_Certification', 'Provider_Insurance', 'Provider_Affiliation',
+        'Provider_VisitMode', 'Provider_Language', 'Provider_Ratings'
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS provider_search_insert ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS provider_search_update ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS provider_search_delete ON %I', t);
+        EXECUTE format('CREATE TRIGGER provider_search_insert AFTER INSERT ON %I '
+                       'REFERENCING NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION provider_search_sync_inserted()', t);
+        EXECUTE format('CREATE TRIGGER provider_search_update AFTER UPDATE ON %I '
+                       'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION provider_search_sync_updated()', t);
+        EXECUTE format('CREATE TRIGGER provider_search_delete AFTER DELETE ON %I '
+                       'REFERENCING OLD TABLE AS old_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION provider_search_sync_deleted()', t);
+    END LOOP;
+END
+$$;
+
+
+-- Filters and sorts of search.build_search_query / pagination.SORT_KEYS
+CREATE INDEX IF NOT EXISTS ix_provider_search_first_name_trgm
+    ON "Provider_Search" USING gin ("ProviderFirstName" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_provider_search_last_name_trgm
+    ON "Provider_Search" USING gin ("ProviderLastName" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_provider_search_middle_initial_trgm
+    ON "Provider_Search" USING gin ("ProviderMiddleInitial" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_provider_search_specialities_trgm
+    ON "Provider_Search" USING gin ("SpecialityNames" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_provider_search_locations_trgm
+    ON "Provider_Search" USING gin ("LocationNames" gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS ix_provider_search_languages
+    ON "Provider_Search" USING gin ("Languages");
+CREATE INDEX IF NOT EXISTS ix_provider_search_name_sort
+    ON "Provider_Search" ((coalesce("ProviderFirstName", '')), "ProviderID");
+CREATE INDEX IF NOT EXISTS ix_provider_search_experience_sort
+    ON "Provider_Search" ((coalesce("MaxYearsOfExperience", -1)), "ProviderID");
+CREATE INDEX IF NOT EXISTS ix_provider_search_rating_sort
+    ON "Provider_Search" ((coalesce("AverageRating", -1)), "ProviderID");
+
+SELECT provider_search_rebuild();
@@ -0,0 +1,174 @@
+-- "Provider_Rating_Summary" (models.ProviderRatingSummary): average, count
+-- and latest date of each provider's ratings, kept in sync with
+-- Provider_Ratings by statement-level triggers. The rating sort and the
+-- card's rating read only this table (directly on the live path, through
+-- Provider_Search."AverageRating" otherwise).
+
+-- models.py declares ProviderID as a string; use Provider_Info's actual type
+-- (uuid in postgre.sql) so joins back to it stay plain equality
+DO $$
+DECLARE
+    id_type text;
+BEGIN
+    SELECT format_type(atttypid, atttypmod) INTO id_type
+      FROM pg_attribute
+     WHERE attrelid = '"Provider_Info"'::regclass AND attname = 'ProviderID';
+    EXECUTE format('ALTER TABLE "Provider_Rating_Summary" ALTER COLUMN "ProviderID" TYPE %s '
+                   'USING "ProviderID"::%s', id_type, id_type);
+END
+$$;
+
+-- `ids` has the type of Provider_Info."ProviderID"
+CREATE OR REPLACE FUNCTION provider_rating_summary_refresh(ids anyarray) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM "Provider_Rating_Summary" WHERE "ProviderID" = ANY (ids);
+    INSERT INTO "Provider_Rating_Summary" ("ProviderID", "AverageRating", "RatingCount", "LatestRatingDate")
+    SELECT "ProviderID", avg("RatingValue"), count("RatingValue"), max("RatingStartDate")
+      FROM "Provider_Ratings"
+     WHERE "ProviderID" = ANY (ids)
+     GROUP BY "ProviderID";
+END
+$$;
+
+CREATE OR REPLACE FUNCTION provider_rating_summary_rebuild() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE "Provider_Rating_Summary";
+    INSERT INTO "Provider_Rating_Summary" ("ProviderID", "AverageRating", "RatingCount", "LatestRatingDate")
+    SELECT "ProviderID", avg("RatingValue"), count("RatingValue"), max("RatingStartDate")
+      FROM "Provider_Ratings"
+     GROUP BY "ProviderID";
+END
+$$;
+
+
+-- Same deferral switch as Provider_Search: bulk loads skip both and
+-- provider_search_rebuild() (below) recomputes both.
+CREATE OR REPLACE FUNCTION provider_rating_summary_sync_inserted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('provider_search.defer', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM provider_rating_summary_refresh(ARRAY(SELECT DISTINCT "ProviderID" FROM new_rows));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION provider_rating_summary_sync_deleted() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('provider_search.defer', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM provider_rating_summary_refresh(ARRAY(SELECT DISTINCT "ProviderID" FROM old_rows));
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION provider_rating_summary_sync_updated() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('provider_search.defer', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    PERFORM provider_rating_summary_refresh(ARRAY(
+        SELECT "ProviderID" FROM new_rows UNION SELECT "ProviderID" FROM old_rows
+    ));
+    RETURN NULL;
+END
+$$;
+
+-- Triggers on a table fire in name order, so these run before the
+-- provider_search_* triggers on Provider_Ratings, which read the summary.
+DROP TRIGGER IF EXISTS provider_rating_summary_insert ON "Provider_Ratings";
+DROP TRIGGER IF EXISTS provider_rating_summary_update ON "Provider_Ratings";
+DROP TRIGGER IF EXISTS provider_rating_summary_delete ON "Provider_Ratings";
+CREATE TRIGGER provider_rating_summary_insert AFTER INSERT ON "Provider_Ratings"
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION provider_rating_summary_sync_inserted();
+CREATE TRIGGER provider_rating_summary_update AFTER UPDATE ON "Provider_Ratings"
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION provider_rating_summary_sync_updated();
+CREATE TRIGGER provider_rating_summary_delete AFTER DELETE ON "Provider_Ratings"
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION provider_rating_summary_sync_deleted();
+
+
+-- Provider_Search takes its rating from the summary instead of averaging
+-- Provider_Ratings itself; unchanged otherwise from 002_provider_search.sql
+CREATE OR REPLACE VIEW provider_search_source AS
+SELECT
+    p."ProviderID",
+    p."ProviderFirstName",
+    p."ProviderMiddleInitial",
+    p."ProviderLastName",
+    p."ProviderType",
+    p."ProviderGender",
+    p."ProviderNPI",
+    a."ProviderAddressLine1",
+    a."ProviderAddressLine2",
+    a."ProviderCity",
+    a."ProviderState",
+    a."ProviderZIPCode",
+    c."ProviderPhoneNo",
+    c."ProviderEmail",
+    s."ProviderSpecialityName",
+    ce."ProviderDegree",
+    ce."ProviderBoardName",
+    ce."ProviderBoardCertified",
+    ce."ProviderYearsOfExperience",
+    i."ProviderPlanName",
+    af."ProviderAffiliationName",
+    v."Acceptingnewpatients",
+    v."VirtualCare",
+    (SELECT rs."AverageRating" FROM "Provider_Rating_Summary" rs
+      WHERE rs."ProviderID" = p."ProviderID") AS "AverageRating",
+    ARRAY(SELECT DISTINCT lang FROM "Provider_Language" l, unnest(l."ProviderLanguage") lang
+           WHERE l."ProviderID" = p."ProviderID" ORDER BY lang) AS "Languages",
+    (SELECT string_agg(x."ProviderSpecialityName", E'\n' ORDER BY x."SpecialityID")
+       FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID") AS "SpecialityNames",
+    (SELECT string_agg(concat_ws(E'\n', x."ProviderCity", x."ProviderState", x."ProviderZIPCode"), E'\n' ORDER BY x."AddressID")
+       FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID") AS "LocationNames",
+    (SELECT max(x."ProviderYearsOfExperience") FROM "Provider_Certification" x
+      WHERE x."ProviderID" = p."ProviderID") AS "MaxYearsOfExperience",
+    ARRAY(SELECT DISTINCT x."ProviderBoardCertified" FROM "Provider_Certification" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."ProviderBoardCertified" IS NOT NULL
+           ORDER BY 1) AS "BoardCertifiedValues",
+    ARRAY(SELECT DISTINCT x."Acceptingnewpatients" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."Acceptingnewpatients" IS NOT NULL
+           ORDER BY 1) AS "AcceptingNewPatientsValues",
+    ARRAY(SELECT DISTINCT x."VirtualCare" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."VirtualCare" IS NOT NULL
+           ORDER BY 1) AS "VirtualCareValues",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID") AS "HasAffiliation",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID" AND x."ProviderAffiliationName" IS NOT NULL) AS "HasNamedAffiliation"
+FROM "Provider_Info" p
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AddressID" LIMIT 1) a ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Communication" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CommunicationID" LIMIT 1) c ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."SpecialityID" LIMIT 1) s ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Certification" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CertificationID" LIMIT 1) ce ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Insurance" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."InsuranceRecordID" LIMIT 1) i ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Affiliation" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AffiliationID" LIMIT 1) af ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_VisitMode" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."VisitModeID" LIMIT 1) v ON true;
+
+CREATE OR REPLACE FUNCTION provider_search_rebuild() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM provider_rating_summary_rebuild();
+    TRUNCATE "Provider_Search";
+    INSERT INTO "Provider_Search" SELECT * FROM provider_search_source;
+END
+$$;
+
+SELECT provider_search_rebuild();
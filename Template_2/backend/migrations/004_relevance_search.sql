@@ -0,0 +1,92 @@
+-- Relevance search for sortBy=relevance (search.relevance_filters /
+-- search.relevance_key): two more Provider_Search columns, appended so the
+-- table keeps the view's column order.
+--
+--   "ProviderFullName"  first, middle and last name, for trigram (typo
+--                       tolerant) matching of the name box
+--   "SearchDocument"    tsvector of name (weight A), specialties (B) and
+--                       cities/states/ZIPs (C); 'simple' configuration, so
+--                       names are not stemmed
+
+ALTER TABLE "Provider_Search" ADD COLUMN IF NOT EXISTS "ProviderFullName" varchar;
+ALTER TABLE "Provider_Search" ADD COLUMN IF NOT EXISTS "SearchDocument" tsvector;
+
+-- As in 003_rating_summary.sql, with the specialty and location strings
+-- moved into laterals so the document can reuse them
+CREATE OR REPLACE VIEW provider_search_source AS
+SELECT
+    p."ProviderID",
+    p."ProviderFirstName",
+    p."ProviderMiddleInitial",
+    p."ProviderLastName",
+    p."ProviderType",
+    p."ProviderGender",
+    p."ProviderNPI",
+    a."ProviderAddressLine1",
+    a."ProviderAddressLine2",
+    a."ProviderCity",
+    a."ProviderState",
+    a."ProviderZIPCode",
+    c."ProviderPhoneNo",
+    c."ProviderEmail",
+    s."ProviderSpecialityName",
+    ce."ProviderDegree",
+    ce."ProviderBoardName",
+    ce."ProviderBoardCertified",
+    ce."ProviderYearsOfExperience",
+    i."ProviderPlanName",
+    af."ProviderAffiliationName",
+    v."Acceptingnewpatients",
+    v."VirtualCare",
+    (SELECT rs."AverageRating" FROM "Provider_Rating_Summary" rs
+      WHERE rs."ProviderID" = p."ProviderID") AS "AverageRating",
+    ARRAY(SELECT DISTINCT lang FROM "Provider_Language" l, unnest(l."ProviderLanguage") lang
+           WHERE l."ProviderID" = p."ProviderID" ORDER BY lang) AS "Languages",
+    sn."SpecialityNames",
+    ln."LocationNames",
+    (SELECT max(x."ProviderYearsOfExperience") FROM "Provider_Certification" x
+      WHERE x."ProviderID" = p."ProviderID") AS "MaxYearsOfExperience",
+    ARRAY(SELECT DISTINCT x."ProviderBoardCertified" FROM "Provider_Certification" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."ProviderBoardCertified" IS NOT NULL
+           ORDER BY 1) AS "BoardCertifiedValues",
+    ARRAY(SELECT DISTINCT x."Acceptingnewpatients" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."Acceptingnewpatients" IS NOT NULL
+           ORDER BY 1) AS "AcceptingNewPatientsValues",
+    ARRAY(SELECT DISTINCT x."VirtualCare" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."VirtualCare" IS NOT NULL
+           ORDER BY 1) AS "VirtualCareValues",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID") AS "HasAffiliation",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID" AND x."ProviderAffiliationName" IS NOT NULL) AS "HasNamedAffiliation",
+    concat_ws(' ', p."ProviderFirstName", p."ProviderMiddleInitial", p."ProviderLastName") AS "ProviderFullName",
+    setweight(to_tsvector('simple', concat_ws(' ', p."ProviderFirstName", p."ProviderMiddleInitial", p."ProviderLastName")), 'A')
+        || setweight(to_tsvector('simple', coalesce(sn."SpecialityNames", '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(ln."LocationNames", '')), 'C') AS "SearchDocument"
+FROM "Provider_Info" p
+LEFT JOIN LATERAL (SELECT string_agg(x."ProviderSpecialityName", E'\n' ORDER BY x."SpecialityID") AS "SpecialityNames"
+                     FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID") sn ON true
+LEFT JOIN LATERAL (SELECT string_agg(concat_ws(E'\n', x."ProviderCity", x."ProviderState", x."ProviderZIPCode"), E'\n'
+                                     ORDER BY x."AddressID") AS "LocationNames"
+                     FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID") ln ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AddressID" LIMIT 1) a ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Communication" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CommunicationID" LIMIT 1) c ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."SpecialityID" LIMIT 1) s ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Certification" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CertificationID" LIMIT 1) ce ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Insurance" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."InsuranceRecordID" LIMIT 1) i ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Affiliation" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AffiliationID" LIMIT 1) af ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_VisitMode" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."VisitModeID" LIMIT 1) v ON true;
+
+CREATE INDEX IF NOT EXISTS ix_provider_search_document
+    ON "Provider_Search" USING gin ("SearchDocument");
+CREATE INDEX IF NOT EXISTS ix_provider_search_full_name_trgm
+    ON "Provider_Search" USING gin ("ProviderFullName" gin_trgm_ops);
+
+SELECT provider_search_rebuild();
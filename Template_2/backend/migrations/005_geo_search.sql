@@ -0,0 +1,71 @@
+-- Distance search for /api/providers (geo.py): radius filters and
+-- sortBy=distance around a point or ZIP code. Uses the built-in point type
+-- and GiST, so neither PostGIS nor any other extension is needed.
+
+-- Great-circle distance in statute miles (haversine). Plain SQL, so the
+-- planner inlines it.
+CREATE OR REPLACE FUNCTION provider_distance_miles(lat1 float8, lon1 float8, lat2 float8, lon2 float8)
+RETURNS float8 LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT 2 * 3958.8 * asin(least(1, sqrt(
+        sin(radians(lat2 - lat1) / 2) ^ 2
+        + cos(radians(lat1)) * cos(radians(lat2)) * sin(radians(lon2 - lon1) / 2) ^ 2
+    )))
+$$;
+
+
+-- "Provider_Search_Location" (models.ProviderSearchLocation): one row per
+-- address with coordinates. Kept next to Provider_Search, with the same
+-- varchar ProviderID, so the two join without casts.
+CREATE OR REPLACE VIEW provider_search_location_source AS
+SELECT
+    "AddressID",
+    "ProviderID",
+    "ProviderLatitude"::float8 AS "Latitude",
+    "ProviderLongitude"::float8 AS "Longitude"
+FROM "Provider_Address"
+WHERE "ProviderLatitude" IS NOT NULL AND "ProviderLongitude" IS NOT NULL;
+
+-- The Provider_Address triggers from 002_provider_search.sql already call
+-- these for every changed provider
+CREATE OR REPLACE FUNCTION provider_search_refresh(ids anyarray) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM "Provider_Search" WHERE "ProviderID" = ANY (ids::text[]);
+    INSERT INTO "Provider_Search"
+    SELECT * FROM provider_search_source WHERE "ProviderID" = ANY (ids);
+
+    DELETE FROM "Provider_Search_Location" WHERE "ProviderID" = ANY (ids::text[]);
+    INSERT INTO "Provider_Search_Location" ("AddressID", "ProviderID", "Latitude", "Longitude")
+    SELECT * FROM provider_search_location_source WHERE "ProviderID" = ANY (ids);
+END
+$$;
+
+CREATE OR REPLACE FUNCTION provider_search_rebuild() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM provider_rating_summary_rebuild();
+    TRUNCATE "Provider_Search";
+    INSERT INTO "Provider_Search" SELECT * FROM provider_search_source;
+    TRUNCATE "Provider_Search_Location";
+    INSERT INTO "Provider_Search_Location" ("AddressID", "ProviderID", "Latitude", "Longitude")
+    SELECT * FROM provider_search_location_source;
+END
+$$;
+
+
+-- Bounding-box lookups (point <@ box) for the radius filter, and the
+-- per-provider nearest-address lookup behind sortBy=distance
+CREATE INDEX IF NOT EXISTS ix_provider_search_location_point
+    ON "Provider_Search_Location" USING gist (point("Longitude", "Latitude"));
+CREATE INDEX IF NOT EXISTS ix_provider_search_location_provider
+    ON "Provider_Search_Location" ("ProviderID");
+
+-- The same for SEARCH_SOURCE=live, which reads Provider_Address directly
+CREATE INDEX IF NOT EXISTS ix_provider_address_point
+    ON "Provider_Address" USING gist (point("ProviderLongitude"::float8, "ProviderLatitude"::float8));
+
+-- near=<ZIP> centers the search on the ZIP's addresses
+CREATE INDEX IF NOT EXISTS ix_provider_address_zip
+    ON "Provider_Address" ("ProviderZIPCode");
+
+SELECT provider_search_rebuild();
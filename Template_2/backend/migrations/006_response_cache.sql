@@ -0,0 +1,135 @@
+-- Response cache for /api/providers (response_cache.py).
+--
+-- directory_data_version holds one counter that every write to the
+-- directory moves forward. Cached responses are keyed by it, so a change to
+-- any Provider_* table or to the brand row makes every older entry
+-- unreachable without having to find the searches it affected.
+
+CREATE TABLE IF NOT EXISTS directory_data_version (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id),
+    version bigint NOT NULL
+);
+INSERT INTO directory_data_version (id, version) VALUES (true, 1) ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION directory_data_version_bump() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE directory_data_version SET version = version + 1;
+    RETURN NULL;
+END
+$$;
+
+-- Every source table, including bulk loads that defer the Provider_Search
+-- triggers. The derived tables only change along with one of these.
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOR t IN
+        SELECT c.relname FROM pg_class c
+         WHERE c.relnamespace = 'public'::regnamespace AND c.relkind = 'r'
+           AND (c.relname LIKE 'Provider\_%' OR c.relname = 'brand')
+           AND c.relname NOT IN ('Provider_Search', 'Provider_Search_Location', 'Provider_Rating_Summary')
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS directory_data_version ON %I', t);
+        EXECUTE format('CREATE TRIGGER directory_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION directory_data_version_bump()', t);
+    END LOOP;
+END
+$$;
+
+
+-- languagesSpoken matches case-insensitively, so a cached search for
+-- "spanish" can answer one for "Spanish". "LanguagesFolded" is appended to
+-- Provider_Search like the columns of 004_relevance_search.sql.
+ALTER TABLE "Provider_Search" ADD COLUMN IF NOT EXISTS "LanguagesFolded" varchar[];
+
+-- varchar[] like the language columns, so the filter binds the same way
+CREATE OR REPLACE FUNCTION provider_fold_languages(languages anyarray) RETURNS varchar[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT ARRAY(SELECT lower(lang::text)::varchar FROM unnest(languages) lang)
+$$;
+
+-- As in 004_relevance_search.sql, plus "LanguagesFolded"
+CREATE OR REPLACE VIEW provider_search_source AS
+SELECT
+    p."ProviderID",
+    p."ProviderFirstName",
+    p."ProviderMiddleInitial",
+    p."ProviderLastName",
+    p."ProviderType",
+    p."ProviderGender",
+    p."ProviderNPI",
+    a."ProviderAddressLine1",
+    a."ProviderAddressLine2",
+    a."ProviderCity",
+    a."ProviderState",
+    a."ProviderZIPCode",
+    c."ProviderPhoneNo",
+    c."ProviderEmail",
+    s."ProviderSpecialityName",
+    ce."ProviderDegree",
+    ce."ProviderBoardName",
+    ce."ProviderBoardCertified",
+    ce."ProviderYearsOfExperience",
+    i."ProviderPlanName",
+    af."ProviderAffiliationName",
+    v."Acceptingnewpatients",
+    v."VirtualCare",
+    (SELECT rs."AverageRating" FROM "Provider_Rating_Summary" rs
+      WHERE rs."ProviderID" = p."ProviderID") AS "AverageRating",
+    ARRAY(SELECT DISTINCT lang FROM "Provider_Language" l, unnest(l."ProviderLanguage") lang
+           WHERE l."ProviderID" = p."ProviderID" ORDER BY lang) AS "Languages",
+    sn."SpecialityNames",
+    ln."LocationNames",
+    (SELECT max(x."ProviderYearsOfExperience") FROM "Provider_Certification" x
+      WHERE x."ProviderID" = p."ProviderID") AS "MaxYearsOfExperience",
+    ARRAY(SELECT DISTINCT x."ProviderBoardCertified" FROM "Provider_Certification" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."ProviderBoardCertified" IS NOT NULL
+           ORDER BY 1) AS "BoardCertifiedValues",
+    ARRAY(SELECT DISTINCT x."Acceptingnewpatients" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."Acceptingnewpatients" IS NOT NULL
+           ORDER BY 1) AS "AcceptingNewPatientsValues",
+    ARRAY(SELECT DISTINCT x."VirtualCare" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."VirtualCare" IS NOT NULL
+           ORDER BY 1) AS "VirtualCareValues",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID") AS "HasAffiliation",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID" AND x."ProviderAffiliationName" IS NOT NULL) AS "HasNamedAffiliation",
+    concat_ws(' ', p."ProviderFirstName", p."ProviderMiddleInitial", p."ProviderLastName") AS "ProviderFullName",
+    setweight(to_tsvector('simple', concat_ws(' ', p."ProviderFirstName", p."ProviderMiddleInitial", p."ProviderLastName")), 'A')
+        || setweight(to_tsvector('simple', coalesce(sn."SpecialityNames", '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(ln."LocationNames", '')), 'C') AS "SearchDocument",
+    ARRAY(SELECT DISTINCT lower(lang) FROM "Provider_Language" l, unnest(l."ProviderLanguage") lang
+           WHERE l."ProviderID" = p."ProviderID" ORDER BY 1) AS "LanguagesFolded"
+FROM "Provider_Info" p
+LEFT JOIN LATERAL (SELECT string_agg(x."ProviderSpecialityName", E'\n' ORDER BY x."SpecialityID") AS "SpecialityNames"
+                     FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID") sn ON true
+LEFT JOIN LATERAL (SELECT string_agg(concat_ws(E'\n', x."ProviderCity", x."ProviderState", x."ProviderZIPCode"), E'\n'
+                                     ORDER BY x."AddressID") AS "LocationNames"
+                     FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID") ln ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AddressID" LIMIT 1) a ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Communication" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CommunicationID" LIMIT 1) c ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."SpecialityID" LIMIT 1) s ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Certification" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CertificationID" LIMIT 1) ce ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Insurance" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."InsuranceRecordID" LIMIT 1) i ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Affiliation" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AffiliationID" LIMIT 1) af ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_VisitMode" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."VisitModeID" LIMIT 1) v ON true;
+
+-- The folded arrays replace the case-sensitive ones in the && filter
+DROP INDEX IF EXISTS ix_provider_search_languages;
+DROP INDEX IF EXISTS ix_provider_language_languages;
+CREATE INDEX IF NOT EXISTS ix_provider_search_languages_folded
+    ON "Provider_Search" USING gin ("LanguagesFolded");
+CREATE INDEX IF NOT EXISTS ix_provider_language_languages_folded
+    ON "Provider_Language" USING gin (provider_fold_languages("ProviderLanguage"));
+
+SELECT provider_search_rebuild();
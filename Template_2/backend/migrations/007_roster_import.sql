@@ -0,0 +1,3 @@
+-- Roster imports (ingest.py) match providers by NPI: an existing provider
+-- with the same NPI is updated in place instead of duplicated.
+CREATE INDEX IF NOT EXISTS ix_provider_info_npi ON "Provider_Info" ("ProviderNPI");
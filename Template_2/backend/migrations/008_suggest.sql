@@ -0,0 +1,117 @@
+-- Typeahead index for /api/suggest (suggest.py).
+--
+-- Each worker keeps the distinct names, specialties and locations in
+-- memory, weighted by how many rows carry them. suggest_term_counts is
+-- what a worker loads at startup; afterwards it only reads the
+-- suggest_term_changes entries logged since, one per term whose count a
+-- statement changed. An entry with no kind asks for a full reload (TRUNCATE,
+-- or a bulk load that deferred the triggers).
+--
+-- Entries are read by transaction visibility, not by id: a worker keeps the
+-- snapshot its index reflects and next reads the entries visible to a new
+-- snapshot but not to that one. Ids are assigned before commit, so an entry
+-- can become visible after one with a higher id; snapshots see each
+-- transaction's entries exactly once.
+
+-- The (kind, term) pairs one row of `source` contributes, as a query over
+-- `source_rows` (the table itself or a trigger transition table)
+CREATE OR REPLACE FUNCTION suggest_terms_query(source text, source_rows text) RETURNS text
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE source
+        WHEN 'Provider_Info' THEN format(
+            'SELECT ''name'' AS kind, "ProviderFirstName" AS term FROM %1$s '
+            'UNION ALL SELECT ''name'', "ProviderLastName" FROM %1$s', source_rows)
+        WHEN 'Provider_Speciality' THEN format(
+            'SELECT ''specialty'' AS kind, "ProviderSpecialityName" AS term FROM %1$s', source_rows)
+        WHEN 'Provider_Address' THEN format(
+            'SELECT ''location'' AS kind, "ProviderCity" AS term FROM %1$s '
+            'UNION ALL SELECT ''location'', "ProviderState" FROM %1$s '
+            'UNION ALL SELECT ''location'', "ProviderZIPCode" FROM %1$s', source_rows)
+    END
+$$;
+
+-- Same terms as suggest_terms_query, over the whole tables
+CREATE OR REPLACE VIEW suggest_term_counts AS
+SELECT kind, term, count(*) AS weight
+  FROM (
+      SELECT 'name' AS kind, "ProviderFirstName" AS term FROM "Provider_Info"
+      UNION ALL SELECT 'name', "ProviderLastName" FROM "Provider_Info"
+      UNION ALL SELECT 'specialty', "ProviderSpecialityName" FROM "Provider_Speciality"
+      UNION ALL SELECT 'location', "ProviderCity" FROM "Provider_Address"
+      UNION ALL SELECT 'location', "ProviderState" FROM "Provider_Address"
+      UNION ALL SELECT 'location', "ProviderZIPCode" FROM "Provider_Address"
+  ) t
+ WHERE term <> ''
+ GROUP BY kind, term;
+
+CREATE TABLE IF NOT EXISTS suggest_term_changes (
+    id bigserial PRIMARY KEY,
+    kind text,
+    term text,
+    delta integer NOT NULL DEFAULT 0,
+    xid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+    logged_at timestamptz NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_suggest_term_changes_xid ON suggest_term_changes (xid);
+CREATE INDEX IF NOT EXISTS ix_suggest_term_changes_logged_at ON suggest_term_changes (logged_at);
+
+CREATE OR REPLACE FUNCTION suggest_terms_reload() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO suggest_term_changes (kind) VALUES (NULL);
+    RETURN NULL;
+END
+$$;
+
+-- One statement-level function for all three operations: the transition
+-- tables are only visible to queries run by the trigger function itself.
+CREATE OR REPLACE FUNCTION suggest_terms_changed() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changes text;
+BEGIN
+    IF current_setting('provider_search.defer', true) = 'on' THEN
+        INSERT INTO suggest_term_changes (kind) VALUES (NULL);
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        changes := format('SELECT kind, term, 1 AS delta FROM (%s) n',
+                          suggest_terms_query(TG_TABLE_NAME, 'new_rows'));
+    ELSIF TG_OP = 'DELETE' THEN
+        changes := format('SELECT kind, term, -1 AS delta FROM (%s) o',
+                          suggest_terms_query(TG_TABLE_NAME, 'old_rows'));
+    ELSE
+        changes := format('SELECT kind, term, 1 AS delta FROM (%s) n UNION ALL SELECT kind, term, -1 FROM (%s) o',
+                          suggest_terms_query(TG_TABLE_NAME, 'new_rows'),
+                          suggest_terms_query(TG_TABLE_NAME, 'old_rows'));
+    END IF;
+    EXECUTE format('INSERT INTO suggest_term_changes (kind, term, delta) '
+                   'SELECT kind, term, sum(delta) FROM (%s) c WHERE term <> '''' '
+                   'GROUP BY kind, term HAVING sum(delta) <> 0', changes);
+    RETURN NULL;
+END
+$$;
+
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['Provider_Info', 'Provider_Speciality', 'Provider_Address'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS suggest_terms_insert ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS suggest_terms_update ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS suggest_terms_delete ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS suggest_terms_truncate ON %I', t);
+        EXECUTE format('CREATE TRIGGER suggest_terms_insert AFTER INSERT ON %I '
+                       'REFERENCING NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION suggest_terms_changed()', t);
+        EXECUTE format('CREATE TRIGGER suggest_terms_update AFTER UPDATE ON %I '
+                       'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION suggest_terms_changed()', t);
+        EXECUTE format('CREATE TRIGGER suggest_terms_delete AFTER DELETE ON %I '
+                       'REFERENCING OLD TABLE AS old_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION suggest_terms_changed()', t);
+        EXECUTE format('CREATE TRIGGER suggest_terms_truncate AFTER TRUNCATE ON %I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION suggest_terms_reload()', t);
+    END LOOP;
+END
+$$;
@@ -0,0 +1,271 @@
+-- Working hours and leave-aware availability (availability.py).
+--
+-- Each provider's week is precomputed into Provider_Search."WeeklyHours",
+-- one bit per quarter hour from Monday 00:00 (672 bits), so "available on
+-- Tuesday at 10:30" is a single get_bit and "open on Tuesday" a test of 96
+-- bits. "WorkingHours" holds the same hours as text for the cards. Both
+-- come from the active Provider_WorkingHours rows, or from the availability
+-- columns of Provider_Location for providers without any.
+--
+-- Leave stays in Provider_LeaveSchedule: one-off periods are found through
+-- a GiST index on their date range, and the few recurring ones are expanded
+-- by provider_leave_overlaps for the requested range only.
+
+CREATE TABLE IF NOT EXISTS "Provider_WorkingHours" (
+    "WorkingHourID" varchar PRIMARY KEY,
+    "ProviderID" varchar NOT NULL REFERENCES "Provider_Info" ("ProviderID") ON DELETE CASCADE,
+    "LocationID" varchar REFERENCES "Provider_Location" ("ProviderLocationID") ON DELETE CASCADE,
+    "DayOfWeek" varchar,
+    "StartTime" time,
+    "EndTime" time,
+    "IsActive" boolean
+);
+CREATE INDEX IF NOT EXISTS ix_provider_workinghours_provider_id ON "Provider_WorkingHours" ("ProviderID");
+
+-- Days 0 (Monday) to 6 named by a DayOfWeek value: "Mon", "Tuesday",
+-- "Mon,Wed", '{"Mon","Tue"}' or ranges such as "Mon-Fri" (and "Fri-Mon")
+CREATE OR REPLACE FUNCTION provider_weekdays(days text) RETURNS int[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT coalesce(array_agg(DISTINCT g % 7 ORDER BY g % 7), '{}')
+      FROM regexp_split_to_table(lower(regexp_replace(coalesce(days, ''), '[{}"\s]', '', 'g')), '[,;/]+') token,
+           LATERAL (SELECT array_position(ARRAY['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'],
+                                          left(split_part(token, '-', 1), 3)) - 1 AS first_day,
+                           array_position(ARRAY['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'],
+                                          left(coalesce(nullif(split_part(token, '-', 2), ''),
+                                                        split_part(token, '-', 1)), 3)) - 1 AS last_day) r,
+           LATERAL generate_series(r.first_day, CASE WHEN r.last_day >= r.first_day THEN r.last_day
+                                                      ELSE r.last_day + 7 END) g
+     WHERE r.first_day IS NOT NULL AND r.last_day IS NOT NULL
+$$;
+
+-- Quarter-hour slots [first_slot, last_slot) of the week
+CREATE OR REPLACE FUNCTION provider_slot_range(first_slot int, last_slot int) RETURNS bit(672)
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT CASE WHEN last_slot > first_slot
+                THEN (repeat('0', first_slot) || repeat('1', last_slot - first_slot)
+                      || repeat('0', 672 - last_slot))::bit(672)
+                ELSE repeat('0', 672)::bit(672) END
+$$;
+
+-- The quarter hours wholly inside opens-closes on day. A span that closes
+-- at or before it opens runs past midnight into the next day (Sunday wraps
+-- to Monday).
+CREATE OR REPLACE FUNCTION provider_hours_mask(day int, opens time, closes time) RETURNS bit(672)
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT CASE WHEN closes > opens
+                THEN provider_slot_range(day * 96 + o, day * 96 + c)
+                ELSE provider_slot_range(day * 96 + o, day * 96 + 96)
+                     | provider_slot_range((day + 1) % 7 * 96, (day + 1) % 7 * 96 + c) END
+      FROM (SELECT ceil(extract(epoch FROM opens) / 900)::int AS o,
+                   floor(extract(epoch FROM closes) / 900)::int AS c) q
+$$;
+
+-- One row per (provider, day, span). Provider_Location only counts for
+-- providers with no active Provider_WorkingHours row.
+CREATE OR REPLACE VIEW provider_hours_source AS
+SELECT w."ProviderID", d AS "Day", w."StartTime" AS "Opens", w."EndTime" AS "Closes"
+  FROM "Provider_WorkingHours" w, unnest(provider_weekdays(w."DayOfWeek")) d
+ WHERE w."IsActive" IS NOT FALSE AND w."StartTime" IS NOT NULL AND w."EndTime" IS NOT NULL
+UNION ALL
+SELECT l."ProviderID", d, l."ProviderAvailabilityStartTime", l."ProviderAvailabilityEndTime"
+  FROM "Provider_Location" l, unnest(provider_weekdays(l."ProviderAvailabilityDayOfWeek")) d
+ WHERE l."ProviderAvailabilityStartTime" IS NOT NULL AND l."ProviderAvailabilityEndTime" IS NOT NULL
+   AND NOT EXISTS (SELECT 1 FROM "Provider_WorkingHours" w
+                    WHERE w."ProviderID" = l."ProviderID" AND w."IsActive" IS NOT FALSE);
+
+CREATE OR REPLACE FUNCTION provider_weekly_hours(provider anyelement) RETURNS bit(672)
+LANGUAGE sql STABLE AS $$
+    SELECT coalesce(bit_or(provider_hours_mask(h."Day", h."Opens", h."Closes")), repeat('0', 672)::bit(672))
+      FROM provider_hours_source h WHERE h."ProviderID" = provider
+$$;
+
+-- "Mon-Fri: 8:00 AM - 5:00 PM, Sat: 9:00 AM - 12:00 PM": consecutive days
+-- with the same spans share a label, several spans on a day are joined
+-- with " & ". NULL when the provider has no hours.
+CREATE OR REPLACE FUNCTION provider_working_hours(provider anyelement) RETURNS varchar
+LANGUAGE sql STABLE AS $$
+    WITH days AS (
+        SELECT h."Day", string_agg(to_char(date '2000-01-01' + h."Opens", 'FMHH12:MI AM') || ' - '
+                                   || to_char(date '2000-01-01' + h."Closes", 'FMHH12:MI AM'),
+                                   ' & ' ORDER BY h."Opens", h."Closes") AS spans
+          FROM (SELECT DISTINCT "Day", "Opens", "Closes" FROM provider_hours_source
+                 WHERE "ProviderID" = provider) h
+         GROUP BY h."Day"
+    ), runs AS (
+        SELECT "Day", spans, "Day" - row_number() OVER (PARTITION BY spans ORDER BY "Day") AS run
+          FROM days
+    )
+    SELECT string_agg(CASE WHEN first_day = last_day THEN names[first_day + 1]
+                           ELSE names[first_day + 1] || '-' || names[last_day + 1] END
+                      || ': ' || spans, ', ' ORDER BY first_day)::varchar
+      FROM (SELECT min("Day") AS first_day, max("Day") AS last_day, spans FROM runs GROUP BY spans, run) r,
+           (SELECT ARRAY['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'] AS names) n
+$$;
+
+
+-- Provider_Search gains both, appended like the columns of 004 and 006
+ALTER TABLE "Provider_Search" ADD COLUMN IF NOT EXISTS "WeeklyHours" bit(672);
+ALTER TABLE "Provider_Search" ADD COLUMN IF NOT EXISTS "WorkingHours" varchar;
+
+-- As in 006_response_cache.sql, plus "WeeklyHours" and "WorkingHours"
+CREATE OR REPLACE VIEW provider_search_source AS
+SELECT
+    p."ProviderID",
+    p."ProviderFirstName",
+    p."ProviderMiddleInitial",
+    p."ProviderLastName",
+    p."ProviderType",
+    p."ProviderGender",
+    p."ProviderNPI",
+    a."ProviderAddressLine1",
+    a."ProviderAddressLine2",
+    a."ProviderCity",
+    a."ProviderState",
+    a."ProviderZIPCode",
+    c."ProviderPhoneNo",
+    c."ProviderEmail",
+    s."ProviderSpecialityName",
+    ce."ProviderDegree",
+    ce."ProviderBoardName",
+    ce."ProviderBoardCertified",
+    ce."ProviderYearsOfExperience",
+    i."ProviderPlanName",
+    af."ProviderAffiliationName",
+    v."Acceptingnewpatients",
+    v."VirtualCare",
+    (SELECT rs."AverageRating" FROM "Provider_Rating_Summary" rs
+      WHERE rs."ProviderID" = p."ProviderID") AS "AverageRating",
+    ARRAY(SELECT DISTINCT lang FROM "Provider_Language" l, unnest(l."ProviderLanguage") lang
+           WHERE l."ProviderID" = p."ProviderID" ORDER BY lang) AS "Languages",
+    sn."SpecialityNames",
+    ln."LocationNames",
+    (SELECT max(x."ProviderYearsOfExperience") FROM "Provider_Certification" x
+      WHERE x."ProviderID" = p."ProviderID") AS "MaxYearsOfExperience",
+    ARRAY(SELECT DISTINCT x."ProviderBoardCertified" FROM "Provider_Certification" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."ProviderBoardCertified" IS NOT NULL
+           ORDER BY 1) AS "BoardCertifiedValues",
+    ARRAY(SELECT DISTINCT x."Acceptingnewpatients" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."Acceptingnewpatients" IS NOT NULL
+           ORDER BY 1) AS "AcceptingNewPatientsValues",
+    ARRAY(SELECT DISTINCT x."VirtualCare" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."VirtualCare" IS NOT NULL
+           ORDER BY 1) AS "VirtualCareValues",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID") AS "HasAffiliation",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID" AND x."ProviderAffiliationName" IS NOT NULL) AS "HasNamedAffiliation",
+    concat_ws(' ', p."ProviderFirstName", p."ProviderMiddleInitial", p."ProviderLastName") AS "ProviderFullName",
+    setweight(to_tsvector('simple', concat_ws(' ', p."ProviderFirstName", p."ProviderMiddleInitial", p."ProviderLastName")), 'A')
+        || setweight(to_tsvector('simple', coalesce(sn."SpecialityNames", '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(ln."LocationNames", '')), 'C') AS "SearchDocument",
+    ARRAY(SELECT DISTINCT lower(lang) FROM "Provider_Language" l, unnest(l."ProviderLanguage") lang
+           WHERE l."ProviderID" = p."ProviderID" ORDER BY 1) AS "LanguagesFolded",
+    provider_weekly_hours(p."ProviderID") AS "WeeklyHours",
+    provider_working_hours(p."ProviderID") AS "WorkingHours"
+FROM "Provider_Info" p
+LEFT JOIN LATERAL (SELECT string_agg(x."ProviderSpecialityName", E'\n' ORDER BY x."SpecialityID") AS "SpecialityNames"
+                     FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID") sn ON true
+LEFT JOIN LATERAL (SELECT string_agg(concat_ws(E'\n', x."ProviderCity", x."ProviderState", x."ProviderZIPCode"), E'\n'
+                                     ORDER BY x."AddressID") AS "LocationNames"
+                     FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID") ln ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AddressID" LIMIT 1) a ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Communication" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CommunicationID" LIMIT 1) c ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."SpecialityID" LIMIT 1) s ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Certification" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CertificationID" LIMIT 1) ce ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Insurance" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."InsuranceRecordID" LIMIT 1) i ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Affiliation" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AffiliationID" LIMIT 1) af ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_VisitMode" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."VisitModeID" LIMIT 1) v ON true;
+
+-- Hours come from these two; Provider_WorkingHours did not exist for the
+-- directory_data_version loop of 006
+DO $$
+DECLARE
+    t text;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['Provider_WorkingHours', 'Provider_Location'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS provider_search_insert ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS provider_search_update ON %I', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS provider_search_delete ON %I', t);
+        EXECUTE format('CREATE TRIGGER provider_search_insert AFTER INSERT ON %I '
+                       'REFERENCING NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION provider_search_sync_inserted()', t);
+        EXECUTE format('CREATE TRIGGER provider_search_update AFTER UPDATE ON %I '
+                       'REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION provider_search_sync_updated()', t);
+        EXECUTE format('CREATE TRIGGER provider_search_delete AFTER DELETE ON %I '
+                       'REFERENCING OLD TABLE AS old_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION provider_search_sync_deleted()', t);
+    END LOOP;
+    FOREACH t IN ARRAY ARRAY['Provider_WorkingHours', 'Provider_LeaveSchedule'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS directory_data_version ON %I', t);
+        EXECUTE format('CREATE TRIGGER directory_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION directory_data_version_bump()', t);
+    END LOOP;
+END
+$$;
+
+-- Filters of availability.py: open on a day (96 slots) or at a time (1 slot)
+CREATE OR REPLACE FUNCTION provider_available(hours bit, first_slot int, slots int) RETURNS boolean
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT position(B'1' IN substring(hours FROM first_slot + 1 FOR slots)) > 0
+$$;
+
+
+-- Leave. A recurring row repeats every provider_leave_step of its pattern;
+-- one marked recurring with a pattern not listed here counts as a single
+-- period.
+CREATE OR REPLACE FUNCTION provider_leave_step(pattern text) RETURNS interval
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT CASE lower(trim(pattern))
+        WHEN 'daily' THEN interval '1 day'
+        WHEN 'weekly' THEN interval '1 week'
+        WHEN 'biweekly' THEN interval '2 weeks'
+        WHEN 'fortnightly' THEN interval '2 weeks'
+        WHEN 'monthly' THEN interval '1 month'
+        WHEN 'quarterly' THEN interval '3 months'
+        WHEN 'yearly' THEN interval '1 year'
+        WHEN 'annually' THEN interval '1 year'
+    END
+$$;
+
+-- Used in index predicates, which Postgres 17+ evaluates with only
+-- pg_catalog on the search_path: the nested call names its schema
+CREATE OR REPLACE FUNCTION provider_leave_recurs(recurring boolean, pattern text) RETURNS boolean
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT coalesce(recurring, false) AND public.provider_leave_step(pattern) IS NOT NULL
+$$;
+
+-- Whether any occurrence of a recurring leave overlaps from_date-to_date.
+-- Day and week steps are solved directly; month and year steps walk the
+-- occurrences up to to_date.
+CREATE OR REPLACE FUNCTION provider_leave_overlaps(leave_start date, leave_end date, pattern text,
+                                                   from_date date, to_date date) RETURNS boolean
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT CASE
+        WHEN s.step IS NULL THEN leave_start <= to_date AND s.leave_last >= from_date
+        WHEN extract(month FROM s.step) = 0 AND extract(year FROM s.step) = 0 THEN
+            leave_start + s.days * greatest(0, ceil((from_date - s.leave_last) / s.days::numeric))::int <= to_date
+        ELSE EXISTS (SELECT 1 FROM generate_series(leave_start::timestamp, to_date::timestamp, s.step) o
+                      WHERE o::date + (s.leave_last - leave_start) >= from_date)
+    END
+      FROM (SELECT provider_leave_step(pattern) AS step,
+                   extract(day FROM provider_leave_step(pattern))::int AS days,
+                   greatest(leave_start, coalesce(leave_end, leave_start)) AS leave_last) s
+$$;
+
+-- notOnLeaveFrom/To: one-off periods by range overlap, recurring ones per
+-- provider. Rows without a start date are not leave.
+CREATE INDEX IF NOT EXISTS ix_provider_leave_period ON "Provider_LeaveSchedule" USING gist
+    (daterange("LeaveStartDate", greatest("LeaveStartDate", coalesce("LeaveEndDate", "LeaveStartDate")), '[]'))
+    WHERE "LeaveStartDate" IS NOT NULL AND NOT provider_leave_recurs("IsRecurring", "RecurringPattern");
+CREATE INDEX IF NOT EXISTS ix_provider_leave_recurring ON "Provider_LeaveSchedule" ("ProviderID")
+    WHERE "LeaveStartDate" IS NOT NULL AND provider_leave_recurs("IsRecurring", "RecurringPattern");
+
+SELECT provider_search_rebuild();
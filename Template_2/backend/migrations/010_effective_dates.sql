@@ -0,0 +1,191 @@
+-- Effective dating ("as of" searches, effective.py).
+--
+-- Specialties, certifications, languages, plans and affiliations each
+-- carry a validity window. provider_effective turns one into an inclusive
+-- daterange, with a missing bound left open; a row is valid on a date its
+-- range contains.
+--
+-- Provider_Search holds the rows valid on one date, provider_search_effective.as_of.
+-- provider_search_advance(date) moves it, normally once a day at midnight
+-- (`flask --app app advance-search-date`), and re-derives only the
+-- providers with a row that starts or ends in between. Searches as of any
+-- other date run against the live tables.
+
+CREATE OR REPLACE FUNCTION provider_effective(valid_from date, valid_to date) RETURNS daterange
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT CASE WHEN valid_to < valid_from THEN 'empty'::daterange
+                ELSE daterange(valid_from, valid_to, '[]') END
+$$;
+
+-- The rows whose window starts or ends between two dates, for provider_search_advance.
+-- Valid-on tests for one provider go through the ProviderID indexes of 001.
+CREATE INDEX IF NOT EXISTS ix_provider_speciality_valid_from ON "Provider_Speciality" ("ProviderSpecialityStartDate");
+CREATE INDEX IF NOT EXISTS ix_provider_speciality_valid_to ON "Provider_Speciality" ("ProviderSpecialityEndDate");
+CREATE INDEX IF NOT EXISTS ix_provider_certification_valid_from ON "Provider_Certification" ("ProviderCertificateIssueDate");
+CREATE INDEX IF NOT EXISTS ix_provider_certification_valid_to ON "Provider_Certification" ("ProviderCertificateExpiryDate");
+CREATE INDEX IF NOT EXISTS ix_provider_language_valid_from ON "Provider_Language" ("ProviderLanguageStartDate");
+CREATE INDEX IF NOT EXISTS ix_provider_language_valid_to ON "Provider_Language" ("ProviderLanguageEndDate");
+CREATE INDEX IF NOT EXISTS ix_provider_insurance_valid_from ON "Provider_Insurance" ("ProviderPlanStartDate");
+CREATE INDEX IF NOT EXISTS ix_provider_insurance_valid_to ON "Provider_Insurance" ("ProviderPlanEndDate");
+CREATE INDEX IF NOT EXISTS ix_provider_affiliation_valid_from ON "Provider_Affiliation" ("ProviderAffiliationStartDate");
+CREATE INDEX IF NOT EXISTS ix_provider_affiliation_valid_to ON "Provider_Affiliation" ("ProviderAffiliationEndDate");
+
+CREATE TABLE IF NOT EXISTS provider_search_effective (
+    id boolean PRIMARY KEY DEFAULT true CHECK (id),
+    as_of date NOT NULL
+);
+INSERT INTO provider_search_effective (id, as_of) VALUES (true, current_date) ON CONFLICT DO NOTHING;
+
+-- Moving the date changes search results like any other write
+DROP TRIGGER IF EXISTS directory_data_version ON provider_search_effective;
+CREATE TRIGGER directory_data_version AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON provider_search_effective
+    FOR EACH STATEMENT EXECUTE FUNCTION directory_data_version_bump();
+
+-- As in 009_availability.sql, with the dated tables' rows limited to those
+-- valid on provider_search_effective.as_of
+CREATE OR REPLACE VIEW provider_search_source AS
+SELECT
+    p."ProviderID",
+    p."ProviderFirstName",
+    p."ProviderMiddleInitial",
+    p."ProviderLastName",
+    p."ProviderType",
+    p."ProviderGender",
+    p."ProviderNPI",
+    a."ProviderAddressLine1",
+    a."ProviderAddressLine2",
+    a."ProviderCity",
+    a."ProviderState",
+    a."ProviderZIPCode",
+    c."ProviderPhoneNo",
+    c."ProviderEmail",
+    s."ProviderSpecialityName",
+    ce."ProviderDegree",
+    ce."ProviderBoardName",
+    ce."ProviderBoardCertified",
+    ce."ProviderYearsOfExperience",
+    i."ProviderPlanName",
+    af."ProviderAffiliationName",
+    v."Acceptingnewpatients",
+    v."VirtualCare",
+    (SELECT rs."AverageRating" FROM "Provider_Rating_Summary" rs
+      WHERE rs."ProviderID" = p."ProviderID") AS "AverageRating",
+    ARRAY(SELECT DISTINCT lang FROM "Provider_Language" l, unnest(l."ProviderLanguage") lang
+           WHERE l."ProviderID" = p."ProviderID"
+             AND provider_effective(l."ProviderLanguageStartDate", l."ProviderLanguageEndDate") @> e.as_of ORDER BY lang) AS "Languages",
+    sn."SpecialityNames",
+    ln."LocationNames",
+    (SELECT max(x."ProviderYearsOfExperience") FROM "Provider_Certification" x
+      WHERE x."ProviderID" = p."ProviderID"
+        AND provider_effective(x."ProviderCertificateIssueDate", x."ProviderCertificateExpiryDate") @> e.as_of) AS "MaxYearsOfExperience",
+    ARRAY(SELECT DISTINCT x."ProviderBoardCertified" FROM "Provider_Certification" x
+           WHERE x."ProviderID" = p."ProviderID"
+             AND provider_effective(x."ProviderCertificateIssueDate", x."ProviderCertificateExpiryDate") @> e.as_of AND x."ProviderBoardCertified" IS NOT NULL
+           ORDER BY 1) AS "BoardCertifiedValues",
+    ARRAY(SELECT DISTINCT x."Acceptingnewpatients" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."Acceptingnewpatients" IS NOT NULL
+           ORDER BY 1) AS "AcceptingNewPatientsValues",
+    ARRAY(SELECT DISTINCT x."VirtualCare" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."VirtualCare" IS NOT NULL
+           ORDER BY 1) AS "VirtualCareValues",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID"
+               AND provider_effective(x."ProviderAffiliationStartDate", x."ProviderAffiliationEndDate") @> e.as_of) AS "HasAffiliation",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID"
+               AND provider_effective(x."ProviderAffiliationStartDate", x."ProviderAffiliationEndDate") @> e.as_of AND x."ProviderAffiliationName" IS NOT NULL) AS "HasNamedAffiliation",
+    concat_ws(' ', p."ProviderFirstName", p."ProviderMiddleInitial", p."ProviderLastName") AS "ProviderFullName",
+    setweight(to_tsvector('simple', concat_ws(' ', p."ProviderFirstName", p."ProviderMiddleInitial", p."ProviderLastName")), 'A')
+        || setweight(to_tsvector('simple', coalesce(sn."SpecialityNames", '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(ln."LocationNames", '')), 'C') AS "SearchDocument",
+    ARRAY(SELECT DISTINCT lower(lang) FROM "Provider_Language" l, unnest(l."ProviderLanguage") lang
+           WHERE l."ProviderID" = p."ProviderID"
+             AND provider_effective(l."ProviderLanguageStartDate", l."ProviderLanguageEndDate") @> e.as_of ORDER BY 1) AS "LanguagesFolded",
+    provider_weekly_hours(p."ProviderID") AS "WeeklyHours",
+    provider_working_hours(p."ProviderID") AS "WorkingHours"
+FROM "Provider_Info" p
+CROSS JOIN provider_search_effective e
+LEFT JOIN LATERAL (SELECT string_agg(x."ProviderSpecialityName", E'\n' ORDER BY x."SpecialityID") AS "SpecialityNames"
+                     FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID"
+                       AND provider_effective(x."ProviderSpecialityStartDate", x."ProviderSpecialityEndDate") @> e.as_of) sn ON true
+LEFT JOIN LATERAL (SELECT string_agg(concat_ws(E'\n', x."ProviderCity", x."ProviderState", x."ProviderZIPCode"), E'\n'
+                                     ORDER BY x."AddressID") AS "LocationNames"
+                     FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID") ln ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AddressID" LIMIT 1) a ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Communication" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CommunicationID" LIMIT 1) c ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID"
+                   AND provider_effective(x."ProviderSpecialityStartDate", x."ProviderSpecialityEndDate") @> e.as_of
+                   ORDER BY x."SpecialityID" LIMIT 1) s ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Certification" x WHERE x."ProviderID" = p."ProviderID"
+                   AND provider_effective(x."ProviderCertificateIssueDate", x."ProviderCertificateExpiryDate") @> e.as_of
+                   ORDER BY x."CertificationID" LIMIT 1) ce ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Insurance" x WHERE x."ProviderID" = p."ProviderID"
+                   AND provider_effective(x."ProviderPlanStartDate", x."ProviderPlanEndDate") @> e.as_of
+                   ORDER BY x."InsuranceRecordID" LIMIT 1) i ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Affiliation" x WHERE x."ProviderID" = p."ProviderID"
+                   AND provider_effective(x."ProviderAffiliationStartDate", x."ProviderAffiliationEndDate") @> e.as_of
+                   ORDER BY x."AffiliationID" LIMIT 1) af ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_VisitMode" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."VisitModeID" LIMIT 1) v ON true;
+
+-- Providers with a dated row valid on only one of from_date and to_date
+-- (from_date < to_date): it starts after the first or ends before the last
+CREATE OR REPLACE FUNCTION provider_effective_changes(from_date date, to_date date)
+RETURNS TABLE ("ProviderID" varchar)
+LANGUAGE sql STABLE AS $$
+    SELECT "ProviderID"::varchar FROM "Provider_Speciality"
+     WHERE "ProviderSpecialityStartDate" > from_date AND "ProviderSpecialityStartDate" <= to_date
+    UNION
+    SELECT "ProviderID"::varchar FROM "Provider_Speciality"
+     WHERE "ProviderSpecialityEndDate" >= from_date AND "ProviderSpecialityEndDate" < to_date
+    UNION
+    SELECT "ProviderID"::varchar FROM "Provider_Certification"
+     WHERE "ProviderCertificateIssueDate" > from_date AND "ProviderCertificateIssueDate" <= to_date
+    UNION
+    SELECT "ProviderID"::varchar FROM "Provider_Certification"
+     WHERE "ProviderCertificateExpiryDate" >= from_date AND "ProviderCertificateExpiryDate" < to_date
+    UNION
+    SELECT "ProviderID"::varchar FROM "Provider_Language"
+     WHERE "ProviderLanguageStartDate" > from_date AND "ProviderLanguageStartDate" <= to_date
+    UNION
+    SELECT "ProviderID"::varchar FROM "Provider_Language"
+     WHERE "ProviderLanguageEndDate" >= from_date AND "ProviderLanguageEndDate" < to_date
+    UNION
+    SELECT "ProviderID"::varchar FROM "Provider_Insurance"
+     WHERE "ProviderPlanStartDate" > from_date AND "ProviderPlanStartDate" <= to_date
+    UNION
+    SELECT "ProviderID"::varchar FROM "Provider_Insurance"
+     WHERE "ProviderPlanEndDate" >= from_date AND "ProviderPlanEndDate" < to_date
+    UNION
+    SELECT "ProviderID"::varchar FROM "Provider_Affiliation"
+     WHERE "ProviderAffiliationStartDate" > from_date AND "ProviderAffiliationStartDate" <= to_date
+    UNION
+    SELECT "ProviderID"::varchar FROM "Provider_Affiliation"
+     WHERE "ProviderAffiliationEndDate" >= from_date AND "ProviderAffiliationEndDate" < to_date
+$$;
+
+-- Moves Provider_Search to new_as_of; returns the number of providers re-derived
+CREATE OR REPLACE FUNCTION provider_search_advance(new_as_of date) RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    previous date;
+    changed varchar[];
+BEGIN
+    SELECT as_of INTO previous FROM provider_search_effective FOR UPDATE;
+    IF previous = new_as_of THEN
+        RETURN 0;
+    END IF;
+    UPDATE provider_search_effective SET as_of = new_as_of;
+    changed := ARRAY(SELECT "ProviderID" FROM provider_effective_changes(
+        least(previous, new_as_of), greatest(previous, new_as_of)));
+    -- Looked up in Provider_Info's own ProviderID type, as repair_search_rows does
+    PERFORM provider_search_refresh(ARRAY(
+        SELECT p."ProviderID" FROM "Provider_Info" p WHERE p."ProviderID"::varchar = ANY(changed)
+    ));
+    RETURN cardinality(changed);
+END
+$$;
+
+SELECT provider_search_rebuild();
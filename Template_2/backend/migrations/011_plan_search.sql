@@ -0,0 +1,225 @@
+-- Plan, network and contract-status filters for /api/providers, and the
+-- plan catalogue behind /api/plans (plans.py).
+--
+-- Each Provider_Insurance row stands for a set of terms, one per
+-- combination of its plan names, network type and contract status:
+-- "plan:Omnia", "network:In Network", "plan:Omnia<US>network:In Network",
+-- and so on (<US> being chr(31)). A search for plan, network and status
+-- together is then a single term that only a row carrying all three
+-- has. The terms of a provider's rows valid on the search date are kept
+-- in Provider_Search."PlanTerms", and a GIN index on their lower-cased
+-- form answers any of the filters, alone or combined, with one lookup.
+--
+-- "Provider_Plan_Catalogue" (models.ProviderPlanCatalogue) counts the
+-- providers per term. provider_search_refresh subtracts a provider's
+-- terms before re-deriving its row and adds the new ones after, so the
+-- counts follow Provider_Search row by row; provider_search_rebuild
+-- recomputes them. Terms whose count falls to zero keep their row
+-- (and spelling) until the next rebuild.
+
+CREATE OR REPLACE FUNCTION provider_plan_term(plan text, network text, status text) RETURNS varchar
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT concat_ws(chr(31), 'plan:' || plan, 'network:' || network, 'status:' || status)::varchar
+$$;
+
+-- Every non-empty combination of one row's plan names, network and status.
+-- Part of an index expression, which Postgres 17+ evaluates with only
+-- pg_catalog on the search_path: the nested call names its schema.
+CREATE OR REPLACE FUNCTION provider_plan_terms(plans anyarray, network text, status text) RETURNS varchar[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT ARRAY(
+        SELECT DISTINCT public.provider_plan_term(pl.value, nw.value, st.value)
+          FROM (SELECT NULL::text UNION SELECT nullif(btrim(x::text), '') FROM unnest(plans) x) pl (value),
+               (VALUES (NULL::text), (nullif(btrim(network), ''))) nw (value),
+               (VALUES (NULL::text), (nullif(btrim(status), ''))) st (value)
+         WHERE coalesce(pl.value, nw.value, st.value) IS NOT NULL
+         ORDER BY 1
+    )
+$$;
+
+-- The part of a term for one kind ('plan', 'network' or 'status'), or NULL
+CREATE OR REPLACE FUNCTION provider_plan_term_part(term text, kind text) RETURNS varchar
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT substr(part, length(kind) + 2)::varchar
+      FROM unnest(string_to_array(term, chr(31))) part
+     WHERE part LIKE kind || ':%'
+$$;
+
+-- As provider_fold_languages in 006_response_cache.sql
+CREATE OR REPLACE FUNCTION provider_fold_terms(terms anyarray) RETURNS varchar[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+    SELECT ARRAY(SELECT lower(term::text)::varchar FROM unnest(terms) term)
+$$;
+
+
+ALTER TABLE "Provider_Search" ADD COLUMN IF NOT EXISTS "PlanTerms" varchar[];
+
+-- As in 010_effective_dates.sql, plus "PlanTerms"
+CREATE OR REPLACE VIEW provider_search_source AS
+SELECT
+    p."ProviderID",
+    p."ProviderFirstName",
+    p."ProviderMiddleInitial",
+    p."ProviderLastName",
+    p."ProviderType",
+    p."ProviderGender",
+    p."ProviderNPI",
+    a."ProviderAddressLine1",
+    a."ProviderAddressLine2",
+    a."ProviderCity",
+    a."ProviderState",
+    a."ProviderZIPCode",
+    c."ProviderPhoneNo",
+    c."ProviderEmail",
+    s."ProviderSpecialityName",
+    ce."ProviderDegree",
+    ce."ProviderBoardName",
+    ce."ProviderBoardCertified",
+    ce."ProviderYearsOfExperience",
+    i."ProviderPlanName",
+    af."ProviderAffiliationName",
+    v."Acceptingnewpatients",
+    v."VirtualCare",
+    (SELECT rs."AverageRating" FROM "Provider_Rating_Summary" rs
+      WHERE rs."ProviderID" = p."ProviderID") AS "AverageRating",
+    ARRAY(SELECT DISTINCT lang FROM "Provider_Language" l, unnest(l."ProviderLanguage") lang
+           WHERE l."ProviderID" = p."ProviderID"
+             AND provider_effective(l."ProviderLanguageStartDate", l."ProviderLanguageEndDate") @> e.as_of ORDER BY lang) AS "Languages",
+    sn."SpecialityNames",
+    ln."LocationNames",
+    (SELECT max(x."ProviderYearsOfExperience") FROM "Provider_Certification" x
+      WHERE x."ProviderID" = p."ProviderID"
+        AND provider_effective(x."ProviderCertificateIssueDate", x."ProviderCertificateExpiryDate") @> e.as_of) AS "MaxYearsOfExperience",
+    ARRAY(SELECT DISTINCT x."ProviderBoardCertified" FROM "Provider_Certification" x
+           WHERE x."ProviderID" = p."ProviderID"
+             AND provider_effective(x."ProviderCertificateIssueDate", x."ProviderCertificateExpiryDate") @> e.as_of AND x."ProviderBoardCertified" IS NOT NULL
+           ORDER BY 1) AS "BoardCertifiedValues",
+    ARRAY(SELECT DISTINCT x."Acceptingnewpatients" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."Acceptingnewpatients" IS NOT NULL
+           ORDER BY 1) AS "AcceptingNewPatientsValues",
+    ARRAY(SELECT DISTINCT x."VirtualCare" FROM "Provider_VisitMode" x
+           WHERE x."ProviderID" = p."ProviderID" AND x."VirtualCare" IS NOT NULL
+           ORDER BY 1) AS "VirtualCareValues",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID"
+               AND provider_effective(x."ProviderAffiliationStartDate", x."ProviderAffiliationEndDate") @> e.as_of) AS "HasAffiliation",
+    EXISTS (SELECT 1 FROM "Provider_Affiliation" x
+             WHERE x."ProviderID" = p."ProviderID"
+               AND provider_effective(x."ProviderAffiliationStartDate", x."ProviderAffiliationEndDate") @> e.as_of AND x."ProviderAffiliationName" IS NOT NULL) AS "HasNamedAffiliation",
+    concat_ws(' ', p."ProviderFirstName", p."ProviderMiddleInitial", p."ProviderLastName") AS "ProviderFullName",
+    setweight(to_tsvector('simple', concat_ws(' ', p."ProviderFirstName", p."ProviderMiddleInitial", p."ProviderLastName")), 'A')
+        || setweight(to_tsvector('simple', coalesce(sn."SpecialityNames", '')), 'B')
+        || setweight(to_tsvector('simple', coalesce(ln."LocationNames", '')), 'C') AS "SearchDocument",
+    ARRAY(SELECT DISTINCT lower(lang) FROM "Provider_Language" l, unnest(l."ProviderLanguage") lang
+           WHERE l."ProviderID" = p."ProviderID"
+             AND provider_effective(l."ProviderLanguageStartDate", l."ProviderLanguageEndDate") @> e.as_of ORDER BY 1) AS "LanguagesFolded",
+    provider_weekly_hours(p."ProviderID") AS "WeeklyHours",
+    provider_working_hours(p."ProviderID") AS "WorkingHours",
+    ARRAY(SELECT DISTINCT t FROM "Provider_Insurance" x,
+                 unnest(provider_plan_terms(x."ProviderPlanName", x."ProviderNetworkType", x."ProviderContractStatus")) t
+           WHERE x."ProviderID" = p."ProviderID"
+             AND provider_effective(x."ProviderPlanStartDate", x."ProviderPlanEndDate") @> e.as_of ORDER BY 1) AS "PlanTerms"
+FROM "Provider_Info" p
+CROSS JOIN provider_search_effective e
+LEFT JOIN LATERAL (SELECT string_agg(x."ProviderSpecialityName", E'\n' ORDER BY x."SpecialityID") AS "SpecialityNames"
+                     FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID"
+                       AND provider_effective(x."ProviderSpecialityStartDate", x."ProviderSpecialityEndDate") @> e.as_of) sn ON true
+LEFT JOIN LATERAL (SELECT string_agg(concat_ws(E'\n', x."ProviderCity", x."ProviderState", x."ProviderZIPCode"), E'\n'
+                                     ORDER BY x."AddressID") AS "LocationNames"
+                     FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID") ln ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Address" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."AddressID" LIMIT 1) a ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Communication" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."CommunicationID" LIMIT 1) c ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Speciality" x WHERE x."ProviderID" = p."ProviderID"
+                   AND provider_effective(x."ProviderSpecialityStartDate", x."ProviderSpecialityEndDate") @> e.as_of
+                   ORDER BY x."SpecialityID" LIMIT 1) s ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Certification" x WHERE x."ProviderID" = p."ProviderID"
+                   AND provider_effective(x."ProviderCertificateIssueDate", x."ProviderCertificateExpiryDate") @> e.as_of
+                   ORDER BY x."CertificationID" LIMIT 1) ce ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Insurance" x WHERE x."ProviderID" = p."ProviderID"
+                   AND provider_effective(x."ProviderPlanStartDate", x."ProviderPlanEndDate") @> e.as_of
+                   ORDER BY x."InsuranceRecordID" LIMIT 1) i ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_Affiliation" x WHERE x."ProviderID" = p."ProviderID"
+                   AND provider_effective(x."ProviderAffiliationStartDate", x."ProviderAffiliationEndDate") @> e.as_of
+                   ORDER BY x."AffiliationID" LIMIT 1) af ON true
+LEFT JOIN LATERAL (SELECT * FROM "Provider_VisitMode" x WHERE x."ProviderID" = p."ProviderID"
+                   ORDER BY x."VisitModeID" LIMIT 1) v ON true;
+
+-- The filters, on Provider_Search and, for SEARCH_SOURCE=live and asOf
+-- searches, on Provider_Insurance (search.py builds the same expressions)
+CREATE INDEX IF NOT EXISTS ix_provider_search_plan_terms
+    ON "Provider_Search" USING gin (provider_fold_terms("PlanTerms"));
+CREATE INDEX IF NOT EXISTS ix_provider_insurance_plan_terms
+    ON "Provider_Insurance" USING gin (provider_fold_terms(
+        provider_plan_terms("ProviderPlanName", "ProviderNetworkType", "ProviderContractStatus")));
+
+
+CREATE TABLE IF NOT EXISTS "Provider_Plan_Catalogue" (
+    "Term" varchar PRIMARY KEY,          -- lower-cased
+    "PlanName" varchar,                  -- parts of the first spelling seen
+    "NetworkType" varchar,
+    "ContractStatus" varchar,
+    "ProviderCount" integer NOT NULL
+);
+
+-- Adds `delta` (1 or -1) to the count of every term of the given
+-- providers' current Provider_Search rows. Rows are upserted in term
+-- order, so concurrent refreshes lock them in the same order.
+CREATE OR REPLACE FUNCTION provider_plan_catalogue_count(ids anyarray, delta integer) RETURNS void
+LANGUAGE sql AS $$
+    INSERT INTO "Provider_Plan_Catalogue" ("Term", "PlanName", "NetworkType", "ContractStatus", "ProviderCount")
+    SELECT term, provider_plan_term_part(spelling, 'plan'), provider_plan_term_part(spelling, 'network'),
+           provider_plan_term_part(spelling, 'status'), delta * providers
+      FROM (SELECT lower(t) AS term, min(t) AS spelling, count(DISTINCT s."ProviderID") AS providers
+              FROM "Provider_Search" s, unnest(s."PlanTerms") t
+             WHERE s."ProviderID" = ANY (ids::text[])
+             GROUP BY lower(t)) c
+     ORDER BY term
+    ON CONFLICT ("Term") DO UPDATE
+        SET "ProviderCount" = "Provider_Plan_Catalogue"."ProviderCount" + excluded."ProviderCount"
+$$;
+
+CREATE OR REPLACE FUNCTION provider_plan_catalogue_rebuild() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    TRUNCATE "Provider_Plan_Catalogue";
+    INSERT INTO "Provider_Plan_Catalogue" ("Term", "PlanName", "NetworkType", "ContractStatus", "ProviderCount")
+    SELECT term, provider_plan_term_part(spelling, 'plan'), provider_plan_term_part(spelling, 'network'),
+           provider_plan_term_part(spelling, 'status'), providers
+      FROM (SELECT lower(t) AS term, min(t) AS spelling, count(DISTINCT s."ProviderID") AS providers
+              FROM "Provider_Search" s, unnest(s."PlanTerms") t
+             GROUP BY lower(t)) c;
+END
+$$;
+
+-- As in 005_geo_search.sql, with the catalogue counts moved along
+CREATE OR REPLACE FUNCTION provider_search_refresh(ids anyarray) RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM provider_plan_catalogue_count(ids, -1);
+    DELETE FROM "Provider_Search" WHERE "ProviderID" = ANY (ids::text[]);
+    INSERT INTO "Provider_Search"
+    SELECT * FROM provider_search_source WHERE "ProviderID" = ANY (ids);
+    PERFORM provider_plan_catalogue_count(ids, 1);
+
+    DELETE FROM "Provider_Search_Location" WHERE "ProviderID" = ANY (ids::text[]);
+    INSERT INTO "Provider_Search_Location" ("AddressID", "ProviderID", "Latitude", "Longitude")
+    SELECT * FROM provider_search_location_source WHERE "ProviderID" = ANY (ids);
+END
+$$;
+
+CREATE OR REPLACE FUNCTION provider_search_rebuild() RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM provider_rating_summary_rebuild();
+    TRUNCATE "Provider_Search";
+    INSERT INTO "Provider_Search" SELECT * FROM provider_search_source;
+    TRUNCATE "Provider_Search_Location";
+    INSERT INTO "Provider_Search_Location" ("AddressID", "ProviderID", "Latitude", "Longitude")
+    SELECT * FROM provider_search_location_source;
+    PERFORM provider_plan_catalogue_rebuild();
+END
+$$;
+
+SELECT provider_search_rebuild();
@@ -0,0 +1,17 @@
+-- provider_key(id) turns a Provider_Search key (varchar) into the type of
+-- Provider_Info."ProviderID": uuid in Postgres_DB/postgre.sql, varchar in
+-- tables created by db.create_all(). Correlating Provider_Search with a
+-- Provider_* table through it leaves that table's "ProviderID" as it is,
+-- so its indexes still apply (availability.not_on_leave). Inlined as a
+-- plain cast.
+DO $$
+DECLARE
+    id_type text;
+BEGIN
+    SELECT format_type(atttypid, atttypmod) INTO id_type
+      FROM pg_attribute
+     WHERE attrelid = '"Provider_Info"'::regclass AND attname = 'ProviderID';
+    EXECUTE format('CREATE OR REPLACE FUNCTION provider_key(id varchar) RETURNS %s '
+                   'LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $f$ SELECT id::%s $f$', id_type, id_type);
+END
+$$;
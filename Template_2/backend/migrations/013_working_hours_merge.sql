@@ -0,0 +1,44 @@
+-- provider_working_hours as in 009_availability.sql, but spans that
+-- overlap or touch on a day are merged first: "9:00 AM - 12:00 PM" and
+-- "11:00 AM - 5:00 PM" (from two locations, or Provider_WorkingHours rows
+-- repeating each other) read "9:00 AM - 5:00 PM", as the "WeeklyHours"
+-- bits already count them. A span past midnight still ends on the next
+-- day's time.
+CREATE OR REPLACE FUNCTION provider_working_hours(provider anyelement) RETURNS varchar
+LANGUAGE sql STABLE AS $$
+    WITH spans AS (
+        SELECT "Day", "Opens" - time '00:00' AS opens,
+               "Closes" - time '00:00' + CASE WHEN "Closes" > "Opens" THEN interval '0'
+                                              ELSE interval '24 hours' END AS closes
+          FROM provider_hours_source WHERE "ProviderID" = provider
+    ), starts AS (
+        -- A span starts a new block unless an earlier one that day reaches it
+        SELECT "Day", opens, closes,
+               CASE WHEN opens <= max(closes) OVER (PARTITION BY "Day" ORDER BY opens, closes
+                                                    ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING)
+                    THEN 0 ELSE 1 END AS new_block
+          FROM spans
+    ), blocks AS (
+        SELECT "Day", min(opens) AS opens, max(closes) AS closes
+          FROM (SELECT "Day", opens, closes,
+                       sum(new_block) OVER (PARTITION BY "Day" ORDER BY opens, closes) AS block
+                  FROM starts) s
+         GROUP BY "Day", block
+    ), days AS (
+        SELECT "Day", string_agg(to_char(date '2000-01-01' + opens, 'FMHH12:MI AM') || ' - '
+                                 || to_char(date '2000-01-01' + closes, 'FMHH12:MI AM'),
+                                 ' & ' ORDER BY opens) AS spans
+          FROM blocks
+         GROUP BY "Day"
+    ), runs AS (
+        SELECT "Day", spans, "Day" - row_number() OVER (PARTITION BY spans ORDER BY "Day") AS run
+          FROM days
+    )
+    SELECT string_agg(CASE WHEN first_day = last_day THEN names[first_day + 1]
+                           ELSE names[first_day + 1] || '-' || names[last_day + 1] END
+                      || ': ' || spans, ', ' ORDER BY first_day)::varchar
+      FROM (SELECT min("Day") AS first_day, max("Day") AS last_day, spans FROM runs GROUP BY spans, run) r,
+           (SELECT ARRAY['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'] AS names) n
+$$;
+
+SELECT provider_search_rebuild();
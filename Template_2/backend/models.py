@@ -1,16 +1,49 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy import String, func
+from sqlalchemy.dialects.postgresql import ARRAY, BIT, TSVECTOR
+from sqlalchemy.orm import column_property, deferred
+from sqlalchemy.types import TypeDecorator, UserDefinedType
 from uuid import uuid4
 
 db = SQLAlchemy()
 
+
+class _UntypedKey(UserDefinedType):
+    # A bind parameter sent without a cast, so Postgres infers its type
+    cache_ok = True
+    render_bind_cast = False
+
+    def get_col_spec(self):
+        return "VARCHAR"
+
+
+class ProviderKey(TypeDecorator):
+    """Provider_Info's ProviderID and the keys referencing it.
+
+    The columns are uuid in Postgres_DB/postgre.sql and varchar in tables
+    created by db.create_all(), so the keys are handled as strings either
+    way. asyncpg (async_app.py) would bind them as $n::VARCHAR, which uuid
+    columns can't be compared with, and returns uuid.UUID values: there the
+    binds go without a cast and the results are turned back into strings.
+    """
+    impl = String
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.driver == "asyncpg":
+            return _UntypedKey()
+        return dialect.type_descriptor(String())
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else str(value)
+
 #######################
 # Provider_Info_Table #
 #######################
 
 class ProviderInfo(db.Model):
     __tablename__ = 'Provider_Info'
-    ProviderID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
+    ProviderID = db.Column(ProviderKey, primary_key=True, default=lambda: str(uuid4()))
     ProviderFirstName = db.Column(db.String)
     ProviderMiddleInitial = db.Column(db.String)
     ProviderLastName = db.Column(db.String)
@@ -22,6 +55,10 @@ class ProviderInfo(db.Model):
     ProviderAge = db.Column(db.Integer)
     ProviderNPI = db.Column(db.String)
 
+    # Display hours from Provider_WorkingHours or Provider_Location
+    # (migrations/009_availability.sql), for live search cards
+    WorkingHours = column_property(func.provider_working_hours(ProviderID, type_=db.String), deferred=True)
+
 ##########################
 # Provider_Address_Table #
 ##########################
@@ -31,7 +68,7 @@ class ProviderAddress(db.Model):
 
     AddressID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -48,7 +85,7 @@ class ProviderAddress(db.Model):
     ProviderLongitude = db.Column(db.Numeric)
 
     # Relationship to access provider from address
-    provider = db.relationship('ProviderInfo', backref=db.backref('addresses', cascade='all, delete-orphan'))
+    provider = db.relationship('ProviderInfo', backref=db.backref('addresses', cascade='all, delete-orphan', order_by='ProviderAddress.AddressID'))
 
 ################################
 # Provider_Communication_Table #
@@ -59,7 +96,7 @@ class ProviderCommunication(db.Model):
 
     CommunicationID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -68,7 +105,7 @@ class ProviderCommunication(db.Model):
     ProviderEmail = db.Column(db.String)
 
     # Relationship to access provider from communication
-    provider = db.relationship('ProviderInfo', backref=db.backref('communications', cascade='all, delete-orphan'))
+    provider = db.relationship('ProviderInfo', backref=db.backref('communications', cascade='all, delete-orphan', order_by='ProviderCommunication.CommunicationID'))
 
 #############################
 # Provider_Speciality_Table #
@@ -79,7 +116,7 @@ class ProviderSpeciality(db.Model):
 
     SpecialityID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -90,7 +127,7 @@ class ProviderSpeciality(db.Model):
     ProviderSpecialityEndDate = db.Column(db.Date)
 
     # Relationship to access provider from speciality
-    provider = db.relationship('ProviderInfo', backref=db.backref('specialities', cascade='all, delete-orphan'))
+    provider = db.relationship('ProviderInfo', backref=db.backref('specialities', cascade='all, delete-orphan', order_by='ProviderSpeciality.SpecialityID'))
 
 
 ################################
@@ -102,7 +139,7 @@ class ProviderCertification(db.Model):
 
     CertificationID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -114,7 +151,7 @@ class ProviderCertification(db.Model):
     ProviderYearsOfExperience = db.Column(db.Integer)
 
     # Relationship to access provider from certification
-    provider = db.relationship('ProviderInfo', backref=db.backref('certifications', cascade='all, delete-orphan'))
+    provider = db.relationship('ProviderInfo', backref=db.backref('certifications', cascade='all, delete-orphan', order_by='ProviderCertification.CertificationID'))
 
 ###########################
 # Provider_Language_Table #
@@ -126,7 +163,7 @@ class ProviderLanguage(db.Model):
 
     LanguageRecordID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -153,7 +190,7 @@ class ProviderLocation(db.Model):
 
     ProviderLocationID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -175,7 +212,7 @@ class ProviderInsurance(db.Model):
     InsuranceRecordID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
     
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -196,7 +233,7 @@ class ProviderInsurance(db.Model):
     ProviderContractStatus = db.Column(db.String)
 
     # Relationships
-    provider = db.relationship('ProviderInfo', backref=db.backref('insurances', cascade='all, delete-orphan'))
+    provider = db.relationship('ProviderInfo', backref=db.backref('insurances', cascade='all, delete-orphan', order_by='ProviderInsurance.InsuranceRecordID'))
     location = db.relationship('ProviderLocation', backref=db.backref('insurances', cascade='all, delete-orphan'))
 
 ##############################
@@ -209,7 +246,7 @@ class ProviderAffiliation(db.Model):
     AffiliationID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
     
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -221,7 +258,7 @@ class ProviderAffiliation(db.Model):
     ProviderAffiliationEndDate = db.Column(db.Date)
 
     # Relationship to access provider from affiliation
-    provider = db.relationship('ProviderInfo', backref=db.backref('affiliations', cascade='all, delete-orphan'))
+    provider = db.relationship('ProviderInfo', backref=db.backref('affiliations', cascade='all, delete-orphan', order_by='ProviderAffiliation.AffiliationID'))
 
 
 ###########################
@@ -234,7 +271,7 @@ class ProviderLicense(db.Model):
     LicenseRecordID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
     
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -260,7 +297,7 @@ class ProviderVisitMode(db.Model):
     VisitModeID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
     
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -276,7 +313,7 @@ class ProviderVisitMode(db.Model):
     VisitMode = db.Column(db.String)
 
     # Relationships
-    provider = db.relationship('ProviderInfo', backref=db.backref('visit_modes', cascade='all, delete-orphan'))
+    provider = db.relationship('ProviderInfo', backref=db.backref('visit_modes', cascade='all, delete-orphan', order_by='ProviderVisitMode.VisitModeID'))
     location = db.relationship('ProviderLocation', backref=db.backref('visit_modes', cascade='all, delete-orphan'))
 
 #########################
@@ -289,7 +326,7 @@ class ProviderRatings(db.Model):
     RatingID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
     
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -305,6 +342,31 @@ class ProviderRatings(db.Model):
     provider = db.relationship('ProviderInfo', backref=db.backref('ratings', cascade='all, delete-orphan'))
 
 
+#################################
+# Provider_Rating_Summary_Table #
+#################################
+
+# Per-provider rating aggregates, maintained from Provider_Ratings by the
+# triggers in migrations/003_rating_summary.sql. Providers without ratings
+# have no row. ProviderID is converted to Provider_Info's own type by the
+# migration, so there is no foreign key to declare here.
+class ProviderRatingSummary(db.Model):
+    __tablename__ = 'Provider_Rating_Summary'
+
+    ProviderID = db.Column(ProviderKey, primary_key=True)
+    AverageRating = db.Column(db.Numeric)
+    RatingCount = db.Column(db.Integer, nullable=False)
+    LatestRatingDate = db.Column(db.Date)
+
+    # Read-only: rows are written by the database
+    provider = db.relationship(
+        'ProviderInfo',
+        primaryjoin='foreign(ProviderRatingSummary.ProviderID) == ProviderInfo.ProviderID',
+        backref=db.backref('rating_summary', uselist=False, viewonly=True),
+        viewonly=True
+    )
+
+
 ########################
 # Provider_Leave_Table #
 ########################
@@ -316,7 +378,7 @@ class ProviderLeaveSchedule(db.Model):
     LeaveID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
 
     ProviderID = db.Column(
-        db.String,
+        ProviderKey,
         db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
         nullable=False
     )
@@ -339,6 +401,32 @@ class ProviderLeaveSchedule(db.Model):
     location = db.relationship('ProviderLocation', backref=db.backref('leave_schedules', cascade='all, delete-orphan'))
 
 
+###############################
+# Provider_WorkingHours_Table #
+###############################
+
+class ProviderWorkingHours(db.Model):
+    __tablename__ = 'Provider_WorkingHours'
+
+    WorkingHourID = db.Column(db.String, primary_key=True, default=lambda: str(uuid4()))
+    ProviderID = db.Column(
+        ProviderKey,
+        db.ForeignKey('Provider_Info.ProviderID', ondelete='CASCADE'),
+        nullable=False
+    )
+    LocationID = db.Column(
+        db.String,
+        db.ForeignKey('Provider_Location.ProviderLocationID', ondelete='CASCADE')
+    )
+    DayOfWeek = db.Column(db.String)                # "Mon-Fri", "Sat", "Tue,Thu", ...
+    StartTime = db.Column(db.Time)
+    EndTime = db.Column(db.Time)                    # at or before StartTime: runs past midnight
+    IsActive = db.Column(db.Boolean)
+
+    provider = db.relationship('ProviderInfo', backref=db.backref('working_hours', cascade='all, delete-orphan', order_by='ProviderWorkingHours.WorkingHourID'))
+    location = db.relationship('ProviderLocation', backref=db.backref('working_hours', cascade='all, delete-orphan'))
+
+
 
 class ProviderConfig(db.Model):
     __tablename__ = 'brand'
@@ -346,4 +434,107 @@ class ProviderConfig(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     brand_name = db.Column(db.String(255))
     logo = db.Column(db.LargeBinary)
-    
+
+
+# The admin display toggles behind /api/config (display_config.py): one row,
+# holding only the toggles that have been saved
+class DisplayConfig(db.Model):
+    __tablename__ = 'display_config'
+
+    id = db.Column(db.Boolean, primary_key=True, default=True)
+    config = db.Column(db.JSON, nullable=False)
+
+
+##########################
+# Provider_Search_Table  #
+##########################
+
+# One flattened row per provider, maintained from the Provider_* tables by
+# the triggers in migrations/002_provider_search.sql. The card columns hold
+# each provider's first child row (lowest primary key); the columns after
+# them aggregate over all child rows so the search filters keep their
+# "any row matches" meaning.
+class ProviderSearch(db.Model):
+    __tablename__ = 'Provider_Search'
+
+    ProviderID = db.Column(db.String, primary_key=True)
+    ProviderFirstName = db.Column(db.String)
+    ProviderMiddleInitial = db.Column(db.String)
+    ProviderLastName = db.Column(db.String)
+    ProviderType = db.Column(db.String)
+    ProviderGender = db.Column(db.String)
+    ProviderNPI = db.Column(db.String)
+
+    # First address / contact / specialty / certification / plan / affiliation / visit mode
+    ProviderAddressLine1 = db.Column(db.String)
+    ProviderAddressLine2 = db.Column(db.String)
+    ProviderCity = db.Column(db.String)
+    ProviderState = db.Column(db.String)
+    ProviderZIPCode = db.Column(db.String)
+    ProviderPhoneNo = db.Column(db.String)
+    ProviderEmail = db.Column(db.String)
+    ProviderSpecialityName = db.Column(db.String)
+    ProviderDegree = db.Column(db.String)
+    ProviderBoardName = db.Column(db.String)
+    ProviderBoardCertified = db.Column(db.String)
+    ProviderYearsOfExperience = db.Column(db.Integer)
+    ProviderPlanName = db.Column(ARRAY(db.String))
+    ProviderAffiliationName = db.Column(db.String)
+    Acceptingnewpatients = db.Column(db.String)
+    VirtualCare = db.Column(db.String)
+
+    # Aggregates over every child row
+    AverageRating = db.Column(db.Numeric)
+    Languages = db.Column(ARRAY(db.String))
+    SpecialityNames = db.Column(db.String)          # newline-separated, for ilike
+    LocationNames = db.Column(db.String)            # cities, states and ZIPs, newline-separated
+    MaxYearsOfExperience = db.Column(db.Integer)
+    BoardCertifiedValues = db.Column(ARRAY(db.String))
+    AcceptingNewPatientsValues = db.Column(ARRAY(db.String))
+    VirtualCareValues = db.Column(ARRAY(db.String))
+    HasAffiliation = db.Column(db.Boolean)
+    HasNamedAffiliation = db.Column(db.Boolean)
+
+    # Relevance search (migrations/004_relevance_search.sql): full name for
+    # trigram matching, and the weighted name/specialty/location document.
+    # The document is only used inside queries, so it is never loaded.
+    ProviderFullName = db.Column(db.String)
+    SearchDocument = deferred(db.Column(TSVECTOR))
+
+    # Lower-cased Languages for the case-insensitive languagesSpoken filter
+    # (migrations/006_response_cache.sql)
+    LanguagesFolded = db.Column(ARRAY(db.String))
+
+    # Availability (migrations/009_availability.sql): one bit per quarter
+    # hour of the week from Monday 00:00, and the same hours as card text
+    WeeklyHours = deferred(db.Column(BIT(672)))
+    WorkingHours = db.Column(db.String)
+
+    # Plan / network / contract-status terms of the provider's insurance rows
+    # (migrations/011_plan_search.sql), only used inside queries
+    PlanTerms = deferred(db.Column(ARRAY(db.String)))
+
+
+# Every geocoded Provider_Address row, keyed like Provider_Search, for the
+# distance filters (geo.py). Maintained with Provider_Search by
+# migrations/005_geo_search.sql.
+class ProviderSearchLocation(db.Model):
+    __tablename__ = 'Provider_Search_Location'
+
+    AddressID = db.Column(db.String, primary_key=True)
+    ProviderID = db.Column(db.String, nullable=False)
+    Latitude = db.Column(db.Float, nullable=False)
+    Longitude = db.Column(db.Float, nullable=False)
+
+
+# Providers per plan / network / contract-status term of Provider_Search,
+# for /api/plans (plans.py). Maintained with Provider_Search by
+# migrations/011_plan_search.sql.
+class ProviderPlanCatalogue(db.Model):
+    __tablename__ = 'Provider_Plan_Catalogue'
+
+    Term = db.Column(db.String, primary_key=True)
+    PlanName = db.Column(db.String)
+    NetworkType = db.Column(db.String)
+    ContractStatus = db.Column(db.String)
+    ProviderCount = db.Column(db.Integer, nullable=False)
@@ -0,0 +1,147 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func, literal, literal_column, select, tuple_
+from models import ProviderInfo, ProviderCertification, ProviderRatingSummary, ProviderSearch
+from search import relevance_key
+from geo import distance_key
+from effective import effective_on
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+##########################
+# Sort keys              #
+##########################
+
+# Every sort orders by one scalar per provider plus ProviderID as the tie
+# breaker, so a (key, ProviderID) pair identifies a position in the result
+# and the next page can start right after it instead of at an OFFSET.
+# NULL keys are coalesced so the row comparison below never sees NULL.
+
+def _name_key(model):
+    # Constants are rendered inline (not as bind parameters) so the keys
+    # match the expression indexes from migrations/
+    return func.coalesce(model.ProviderFirstName, literal_column("''"))
+
+
+def _live_experience_key(filters):
+    certifications = select(func.max(ProviderCertification.ProviderYearsOfExperience)).where(
+        ProviderCertification.ProviderID == ProviderInfo.ProviderID
+    )
+    # Only certifications valid on asOf, as the experience filter counts them
+    if filters and filters["asOf"]:
+        certifications = certifications.where(effective_on(ProviderCertification, filters["asOf"]))
+    return func.coalesce(certifications.scalar_subquery(), literal_column("-1"))
+
+
+def _live_rating_key():
+    # One primary-key lookup in the maintained summary, not an aggregate
+    return func.coalesce(
+        select(ProviderRatingSummary.AverageRating)
+        .where(ProviderRatingSummary.ProviderID == ProviderInfo.ProviderID)
+        .scalar_subquery(),
+        literal_column("-1")
+    )
+
+
+def _search_experience_key():
+    return func.coalesce(ProviderSearch.MaxYearsOfExperience, literal_column("-1"))
+
+
+def _search_rating_key():
+    return func.coalesce(ProviderSearch.AverageRating, literal_column("-1"))
+
+
+# sortBy -> (descending, key is numeric)
+SORTS = {
+    "name-asc": (False, False),
+    "name-desc": (True, False),
+    "experience": (True, True),
+    "rating": (True, True),
+    "relevance": (True, True),
+    "distance": (False, True),
+}
+
+DEFAULT_SORT = "rating"
+
+# Sort key builders for each searchable model: the live Provider_Info query
+# and the denormalized Provider_Search table. Each takes the parsed filters;
+# only relevance, distance and the live experience key (asOf) depend on
+# them. The live tables have no relevance sort; distance needs a search
+# center (geo.locate).
+SORT_KEYS = {
+    ProviderInfo: {
+        "name-asc": lambda filters: _name_key(ProviderInfo),
+        "name-desc": lambda filters: _name_key(ProviderInfo),
+        "experience": _live_experience_key,
+        "rating": lambda filters: _live_rating_key(),
+        "distance": lambda filters: distance_key(ProviderInfo, filters["center"]),
+    },
+    ProviderSearch: {
+        "name-asc": lambda filters: _name_key(ProviderSearch),
+        "name-desc": lambda filters: _name_key(ProviderSearch),
+        "experience": lambda filters: _search_experience_key(),
+        "rating": lambda filters: _search_rating_key(),
+        "relevance": relevance_key,
+        "distance": lambda filters: distance_key(ProviderSearch, filters["center"]),
+    },
+}
+
+
+def apply_sort(query, model, sort_by, cursor=None, filters=None):
+    """Order a ``model`` query by ``sort_by`` and, if given, start after ``cursor``.
+
+    The query yields ``(model, sort_key)`` rows; the key of the last row on
+    a page is what goes into the next cursor. ``filters`` (from
+    search.parse_filters) is needed for sortBy=relevance.
+    """
+    descending, _ = SORTS[sort_by]
+    key = SORT_KEYS[model][sort_by](filters).label("sort_key")
+    if cursor is not None:
+        position = tuple_(key, model.ProviderID)
+        # The id takes the column's type, which for Provider_Info may be uuid
+        after = tuple_(cursor["key"], literal(cursor["id"], model.ProviderID.type))
+        query = query.filter(position < after if descending else position > after)
+
+    if descending:
+        query = query.order_by(key.desc(), model.ProviderID.desc())
+    else:
+        query = query.order_by(key.asc(), model.ProviderID.asc())
+    return query.add_columns(key)
+
+
+##########################
+# Opaque cursor encoding #
+##########################
+
+def encode_cursor(sort_by, key, provider_id):
+    if isinstance(key, Decimal):
+        key = str(key)
+    payload = json.dumps([sort_by, key, str(provider_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort_by):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, key, provider_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+
+    if cursor_sort != sort_by:
+        raise InvalidCursor("Cursor was issued for a different sortBy")
+
+    _, numeric = SORTS[sort_by]
+    if numeric:
+        try:
+            key = Decimal(str(key))
+        except InvalidOperation:
+            raise InvalidCursor("Malformed cursor")
+    elif not isinstance(key, str):
+        raise InvalidCursor("Malformed cursor")
+
+    return {"key": key, "id": provider_id}
@@ -0,0 +1,71 @@
+from sqlalchemy import func, literal, select, union_all
+
+from models import db, ProviderPlanCatalogue
+
+
+##########################
+# Plan filters           #
+##########################
+
+# Filter -> the kind of term part it matches (migrations/011_plan_search.sql),
+# in the order the parts appear in a term
+PLAN_FILTERS = {"plan": "plan", "network": "network", "contractStatus": "status"}
+TERM_SEPARATOR = "\x1f"
+
+
+def plan_term(filters):
+    """The term an insurance row needs for the plan filters in ``filters``, or None.
+
+    The values are lower-cased by search.parse_filters, so the term matches
+    the lower-cased "PlanTerms" the indexes hold.
+    """
+    parts = [f"{kind}:{filters[name]}" for name, kind in PLAN_FILTERS.items() if filters[name]]
+    return TERM_SEPARATOR.join(parts) or None
+
+
+##########################
+# Plan catalogue         #
+##########################
+
+# Catalogue list -> (the filter it lists values of, its column)
+CATALOGUE_LISTS = {
+    "plans": ("plan", ProviderPlanCatalogue.PlanName),
+    "networks": ("network", ProviderPlanCatalogue.NetworkType),
+    "contractStatuses": ("contractStatus", ProviderPlanCatalogue.ContractStatus),
+}
+
+
+def catalogue_statement(filters):
+    """One query listing every catalogue list's values with their provider counts.
+
+    A list leaves out its own filter, as facets.facet_statement does: with
+    network=... set, "plans" counts the providers per plan within that
+    network, and "networks" still counts every network. Each value is one
+    precomputed Provider_Plan_Catalogue row.
+    """
+    catalogue = ProviderPlanCatalogue
+    selects = []
+    for name, (own, column) in CATALOGUE_LISTS.items():
+        conditions = [column != None, catalogue.ProviderCount > 0]
+        for other, other_column in CATALOGUE_LISTS.values():
+            if other == own:
+                continue
+            if filters[other]:
+                conditions.append(func.lower(other_column) == filters[other])
+            else:
+                conditions.append(other_column == None)
+        selects.append(
+            select(literal(name).label("list"), column.label("value"), catalogue.ProviderCount.label("count"))
+            .where(*conditions)
+        )
+    return union_all(*selects)
+
+
+def plan_catalogue(filters):
+    """``{list: [{"value", "count"}, ...]}`` for filters from search.parse_filters, most common first."""
+    catalogue = {name: [] for name in CATALOGUE_LISTS}
+    for name, value, count in db.session.execute(catalogue_statement(filters)):
+        catalogue[name].append({"value": value, "count": count})
+    for values in catalogue.values():
+        values.sort(key=lambda v: (-v["count"], v["value"]))
+    return catalogue
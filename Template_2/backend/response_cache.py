@@ -0,0 +1,222 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+from models import db
+
+log = logging.getLogger(__name__)
+
+
+# Whole /api/providers responses, keyed by the normalized search and the
+# directory data version (migrations/006_response_cache.sql). A write to the
+# directory moves the version on, so older entries are never read again and
+# age out through the LRU/TTL limits below.
+RESPONSE_CACHE_BACKENDS = ("memory", "shared", "off")
+
+
+DATA_VERSION = text("SELECT version FROM directory_data_version")
+
+
+def data_version():
+    return db.session.execute(DATA_VERSION).scalar()
+
+
+def response_key(version, **params):
+    """Cache key for a search: ``params`` are its normalized parts."""
+    payload = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return "%d:%s" % (version, hashlib.sha256(payload.encode()).hexdigest())
+
+
+class _Stats:
+    # Hits and misses are counted per worker process, for either backend
+    def __init__(self):
+        self.hits = self.misses = self.evictions = 0
+
+    def as_dict(self, entries, size):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+class ResponseCache:
+    """A thread-safe in-process LRU of response bodies.
+
+    Bounded by ``max_entries`` and ``max_bytes`` (key plus body); entries
+    expire ``ttl`` seconds after they are stored.
+    """
+
+    def __init__(self, max_entries=2048, max_bytes=64 * 1024 * 1024, ttl=300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._stats = _Stats()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry[0]
+
+    def set(self, key, body):
+        size = len(key) + len(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (body, time.monotonic() + self.ttl)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats.evictions += 1
+
+    def _remove(self, key):
+        body, _ = self._entries.pop(key)
+        self._bytes -= len(key) + len(body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return self._stats.as_dict(len(self._entries), self._bytes)
+
+
+class SharedResponseCache:
+    """The same cache in a SQLite file, shared by every worker on the host.
+
+    Same limits as ResponseCache. Expiry uses wall-clock time, since the
+    entries outlive the process that wrote them. A SQLite error is treated
+    as a miss (or a skipped store) rather than failing the search.
+    """
+
+    def __init__(self, path, max_entries=2048, max_bytes=64 * 1024 * 1024, ttl=300):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._stats = _Stats()
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, body BLOB NOT NULL,"
+            " expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+
+    def _connection(self):
+        # One connection per thread, opened again in forked worker processes
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def get(self, key):
+        now = time.time()
+        try:
+            connection = self._connection()
+            row = connection.execute(
+                "SELECT body FROM responses WHERE key = ? AND expires_at >= ?", (key, now)
+            ).fetchone()
+            if row is not None:
+                connection.execute("UPDATE responses SET used_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            log.warning("Shared response cache unavailable", exc_info=True)
+            row = None
+        if row is None:
+            self._stats.misses += 1
+            return None
+        self._stats.hits += 1
+        return bytes(row[0])
+
+    def set(self, key, body):
+        if len(key) + len(body) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                    (key, body, now + self.ttl, now)
+                )
+                connection.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+                self._evict(connection)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            log.warning("Shared response cache unavailable", exc_info=True)
+
+    def _evict(self, connection):
+        entries, size = connection.execute(
+            "SELECT count(*), coalesce(sum(length(key) + length(body)), 0) FROM responses"
+        ).fetchone()
+        if entries <= self.max_entries and size <= self.max_bytes:
+            return
+        for key, entry_size in connection.execute(
+            "SELECT key, length(key) + length(body) FROM responses ORDER BY used_at"
+        ).fetchall():
+            if entries <= self.max_entries and size <= self.max_bytes:
+                break
+            connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+            entries, size = entries - 1, size - entry_size
+            self._stats.evictions += 1
+
+    def clear(self):
+        self._connection().execute("DELETE FROM responses")
+
+    def stats(self):
+        entries, size = self._connection().execute(
+            "SELECT count(*), coalesce(sum(length(key) + length(body)), 0) FROM responses"
+        ).fetchone()
+        return self._stats.as_dict(entries, size)
+
+
+def make_response_cache(settings):
+    """The cache selected by ``RESPONSE_CACHE`` in the app config, or None when off."""
+    backend = settings["RESPONSE_CACHE"]
+    if backend not in RESPONSE_CACHE_BACKENDS:
+        raise ValueError(f"RESPONSE_CACHE must be one of {', '.join(RESPONSE_CACHE_BACKENDS)}")
+    limits = dict(
+        max_entries=settings["RESPONSE_CACHE_MAX_ENTRIES"],
+        max_bytes=settings["RESPONSE_CACHE_MAX_BYTES"],
+        ttl=settings["RESPONSE_CACHE_TTL"],
+    )
+    if backend == "memory":
+        return ResponseCache(**limits)
+    if backend == "shared":
+        return SharedResponseCache(settings["RESPONSE_CACHE_PATH"], **limits)
+    return None
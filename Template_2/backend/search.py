@@ -0,0 +1,358 @@
+import json
+import re
+
+from sqlalchemy import Float, String, and_, cast, func, literal, literal_column, or_, true
+from sqlalchemy.dialects.postgresql import ARRAY
+from models import (
+    ProviderInfo, ProviderAddress, ProviderSpeciality, ProviderCertification,
+    ProviderLanguage, ProviderInsurance, ProviderAffiliation, ProviderVisitMode, ProviderSearch
+)
+from geo import within_distance
+from availability import availability_conditions
+from effective import effective_on
+from plans import plan_term
+
+
+##########################
+# Filter parsing         #
+##########################
+
+def parse_filters(args):
+    """Read the /api/providers filter parameters into a normalized dict.
+
+    Empty strings become None and the language list is lower-cased (it
+    matches case-insensitively), de-duplicated and sorted, so two requests
+    for the same search produce the same dict (and the same ``filter_key``).
+    ``plan``, ``network`` and ``contractStatus`` are lower-cased as well
+    (see plans.plan_term).
+    ``relevance`` is set for sortBy=relevance, which matches the text boxes
+    by full text and similarity instead of substrings (see
+    ``relevance_filters``). ``lat``, ``lon`` and ``distance`` are the raw
+    strings, and ``center`` None, until geo.locate checks them and resolves
+    ``near`` or ``lat``/``lon``; ``weeklySlots`` and ``leaveRange`` stay None
+    until availability.resolve reads the availability parameters, and
+    ``asOf`` is a date only once effective.resolve has run.
+    """
+    return {
+        "name": args.get("name", "").strip().lower(),
+        "specialty": args.get("specialty", "").strip().lower(),
+        "location": args.get("location", "").strip().lower(),
+        "gender": args.get("gender") or None,
+        "minExperience": int(args.get("minExperience") or 0),
+        "boardCertified": args.get("boardCertified") or None,
+        "acceptingNewPatients": args.get("acceptingNewPatients") or None,
+        "virtualCare": args.get("virtualCare") or None,
+        "hospitalAffiliations": args.get("hospitalAffiliations") or None,
+        "languagesSpoken": sorted(set(
+            lang.strip().lower() for lang in args.getlist("languagesSpoken") if lang.strip()
+        )),
+        "relevance": args.get("sortBy") == "relevance",
+        "near": args.get("near", "").strip() or None,
+        "lat": args.get("lat", "").strip() or None,
+        "lon": args.get("lon", "").strip() or None,
+        "distance": args.get("distance", "").strip() or None,
+        "center": None,
+        "availableDay": args.get("availableDay", "").strip().lower() or None,
+        "availableTime": args.get("availableTime", "").strip() or None,
+        "openNow": args.get("openNow") == "true",
+        "notOnLeaveFrom": args.get("notOnLeaveFrom", "").strip() or None,
+        "notOnLeaveTo": args.get("notOnLeaveTo", "").strip() or None,
+        "weeklySlots": None,
+        "leaveRange": None,
+        "asOf": args.get("asOf", "").strip() or None,
+        "plan": args.get("plan", "").strip().lower() or None,
+        "network": args.get("network", "").strip().lower() or None,
+        "contractStatus": args.get("contractStatus", "").strip().lower() or None,
+    }
+
+
+def filter_key(filters):
+    return json.dumps(filters, sort_keys=True, separators=(",", ":"))
+
+
+# Filters named in a filter shape, in this order
+SHAPE_FILTERS = (
+    "name", "specialty", "location", "gender", "minExperience", "boardCertified",
+    "acceptingNewPatients", "virtualCare", "hospitalAffiliations", "languagesSpoken",
+    "availableDay", "openNow", "plan", "network", "contractStatus",
+)
+
+
+def filter_shape(filters):
+    """Which filters a search sets, without their values ("specialty+near"), for metrics labels."""
+    names = [name for name in SHAPE_FILTERS if filters[name]]
+    if filters["near"] or filters["lat"] is not None:
+        names.append("near")
+    if filters["notOnLeaveFrom"] or filters["notOnLeaveTo"]:
+        names.append("notOnLeave")
+    return "+".join(names) or "none"
+
+
+####################################
+# Filtered query (live tables)     #
+####################################
+
+def _effective(model, filters):
+    # Dated child rows count only when valid on asOf (effective.py)
+    return effective_on(model, filters["asOf"]) if filters["asOf"] else true()
+
+
+def build_filtered_query(filters, query=None):
+    name = filters["name"]
+    specialty = filters["specialty"]
+    location = filters["location"]
+    gender = filters["gender"]
+    min_experience = filters["minExperience"]
+    board_certified = filters["boardCertified"]
+    accepting_new = filters["acceptingNewPatients"]
+    virtual_care = filters["virtualCare"]
+    hospital_affiliations = filters["hospitalAffiliations"]
+    languages = filters["languagesSpoken"]
+
+    # A Query without a session from async_app.py, else the Flask-SQLAlchemy one
+    if query is None:
+        query = ProviderInfo.query
+
+    # Child-table filters are EXISTS tests (relationship.any()) rather than
+    # joins: a provider with several addresses, certifications or visit
+    # modes still appears once, however many of its rows match.
+    if name:
+        query = query.filter(
+            or_(
+                ProviderInfo.ProviderFirstName.ilike(f"%{name}%"),
+                ProviderInfo.ProviderLastName.ilike(f"%{name}%"),
+                ProviderInfo.ProviderMiddleInitial.ilike(f"%{name}%")
+            )
+        )
+
+    if specialty:
+        query = query.filter(ProviderInfo.specialities.any(and_(
+            ProviderSpeciality.ProviderSpecialityName.ilike(f"%{specialty}%"),
+            _effective(ProviderSpeciality, filters)
+        )))
+
+    if location:
+        query = query.filter(ProviderInfo.addresses.any(
+            or_(
+                ProviderAddress.ProviderCity.ilike(f"%{location}%"),
+                ProviderAddress.ProviderState.ilike(f"%{location}%"),
+                ProviderAddress.ProviderZIPCode.ilike(f"%{location}%")
+            )
+        ))
+
+    if gender:
+        query = query.filter(ProviderInfo.ProviderGender == gender)
+
+    if min_experience > 0:
+        query = query.filter(ProviderInfo.certifications.any(and_(
+            ProviderCertification.ProviderYearsOfExperience >= min_experience,
+            _effective(ProviderCertification, filters)
+        )))
+
+    if board_certified:
+        query = query.filter(ProviderInfo.certifications.any(and_(
+            ProviderCertification.ProviderBoardCertified == ('Yes' if board_certified == 'true' else 'No'),
+            _effective(ProviderCertification, filters)
+        )))
+
+    if accepting_new:
+        query = query.filter(ProviderInfo.visit_modes.any(
+            ProviderVisitMode.Acceptingnewpatients == ('Yes' if accepting_new == 'true' else 'No')
+        ))
+
+    if virtual_care:
+        query = query.filter(ProviderInfo.visit_modes.any(
+            ProviderVisitMode.VirtualCare == ('Yes' if virtual_care == 'true' else 'No')
+        ))
+
+    if hospital_affiliations:
+        if hospital_affiliations == 'true':
+            query = query.filter(ProviderInfo.affiliations.any(_effective(ProviderAffiliation, filters)))
+        else:
+            query = query.filter(~ProviderInfo.affiliations.any(and_(
+                ProviderAffiliation.ProviderAffiliationName != None,
+                _effective(ProviderAffiliation, filters)
+            )))
+
+    if languages:
+        # Same expression as the index in migrations/006_response_cache.sql
+        folded = func.provider_fold_languages(ProviderLanguage.ProviderLanguage, type_=ARRAY(String))
+        query = query.filter(ProviderInfo.languages.any(and_(
+            folded.overlap(languages), _effective(ProviderLanguage, filters)
+        )))
+
+    term = plan_term(filters)
+    if term:
+        # Same expression as the index in migrations/011_plan_search.sql
+        terms = func.provider_fold_terms(
+            func.provider_plan_terms(
+                ProviderInsurance.ProviderPlanName, ProviderInsurance.ProviderNetworkType,
+                ProviderInsurance.ProviderContractStatus
+            ),
+            type_=ARRAY(String)
+        )
+        query = query.filter(ProviderInfo.insurances.any(and_(
+            terms.contains([term]), _effective(ProviderInsurance, filters)
+        )))
+
+    if filters["center"]:
+        query = query.filter(within_distance(ProviderInfo, filters))
+
+    query = query.filter(*availability_conditions(ProviderInfo, filters).values())
+
+    return query
+
+
+####################################
+# Filtered query (Provider_Search) #
+####################################
+
+def search_conditions(filters):
+    """The predicates of ``build_search_query``, keyed by the filter each comes from.
+
+    Facet counts (facets.py) leave out the predicate of the facet they count.
+    """
+    name = filters["name"]
+    specialty = filters["specialty"]
+    location = filters["location"]
+    gender = filters["gender"]
+    min_experience = filters["minExperience"]
+    board_certified = filters["boardCertified"]
+    accepting_new = filters["acceptingNewPatients"]
+    virtual_care = filters["virtualCare"]
+    hospital_affiliations = filters["hospitalAffiliations"]
+    languages = filters["languagesSpoken"]
+
+    conditions = {}
+
+    if filters["relevance"]:
+        conditions.update(relevance_filters(filters))
+    else:
+        if name:
+            conditions["name"] = or_(
+                ProviderSearch.ProviderFirstName.ilike(f"%{name}%"),
+                ProviderSearch.ProviderLastName.ilike(f"%{name}%"),
+                ProviderSearch.ProviderMiddleInitial.ilike(f"%{name}%")
+            )
+
+        if specialty:
+            conditions["specialty"] = ProviderSearch.SpecialityNames.ilike(f"%{specialty}%")
+
+        if location:
+            conditions["location"] = ProviderSearch.LocationNames.ilike(f"%{location}%")
+
+    if gender:
+        conditions["gender"] = ProviderSearch.ProviderGender == gender
+
+    if min_experience > 0:
+        conditions["minExperience"] = ProviderSearch.MaxYearsOfExperience >= min_experience
+
+    if board_certified:
+        conditions["boardCertified"] = ProviderSearch.BoardCertifiedValues.contains(
+            ['Yes' if board_certified == 'true' else 'No']
+        )
+
+    if accepting_new:
+        conditions["acceptingNewPatients"] = ProviderSearch.AcceptingNewPatientsValues.contains(
+            ['Yes' if accepting_new == 'true' else 'No']
+        )
+
+    if virtual_care:
+        conditions["virtualCare"] = ProviderSearch.VirtualCareValues.contains(
+            ['Yes' if virtual_care == 'true' else 'No']
+        )
+
+    if hospital_affiliations:
+        if hospital_affiliations == 'true':
+            conditions["hospitalAffiliations"] = ProviderSearch.HasAffiliation
+        else:
+            conditions["hospitalAffiliations"] = ~ProviderSearch.HasNamedAffiliation
+
+    if languages:
+        conditions["languagesSpoken"] = ProviderSearch.LanguagesFolded.overlap(languages)
+
+    term = plan_term(filters)
+    if term:
+        # One term for plan, network and status together: a single GIN lookup
+        conditions["plan"] = func.provider_fold_terms(ProviderSearch.PlanTerms, type_=ARRAY(String)).contains([term])
+
+    if filters["center"]:
+        conditions["center"] = within_distance(ProviderSearch, filters)
+
+    conditions.update(availability_conditions(ProviderSearch, filters))
+
+    return conditions
+
+
+def build_search_query(filters, query=None):
+    """Same filters as ``build_filtered_query``, against the denormalized table.
+
+    Every predicate is a column test on Provider_Search, so a search is a
+    single-table scan (or index lookup) however many filters are set.
+    ``query`` defaults to ``ProviderSearch.query``; async_app.py passes one
+    that is not bound to a session.
+    """
+    if query is None:
+        query = ProviderSearch.query
+    return query.filter(*search_conditions(filters).values())
+
+
+######################################
+# Relevance search (Provider_Search) #
+######################################
+
+# Text box -> (tsvector weight in SearchDocument, column for trigram matching);
+# see migrations/004_relevance_search.sql
+TEXT_FIELDS = {
+    "name": ("A", ProviderSearch.ProviderFullName),
+    "specialty": ("B", ProviderSearch.SpecialityNames),
+    "location": ("C", ProviderSearch.LocationNames),
+}
+
+
+def _terms(text):
+    # Letters and digits only, so the terms are always valid tsquery lexemes
+    return re.findall(r"[^\W_]+", text)
+
+
+def _tsquery(terms, weight):
+    # Every term as a prefix ("card" finds "cardiology"), in one field's weight
+    return func.to_tsquery("simple", " & ".join(f"{term}:*{weight}" for term in terms))
+
+
+def relevance_filters(filters):
+    """Conditions for the name / specialty / location boxes under sortBy=relevance.
+
+    A box matches when every word is a prefix of a word in its field
+    (SearchDocument @@ tsquery) or, to absorb typos, when the box is
+    word-similar to the field text (pg_trgm ``%>``). Both operators are
+    served by GIN indexes. Keyed by box, like ``search_conditions``.
+    """
+    conditions = {}
+    for box, (weight, column) in TEXT_FIELDS.items():
+        value = filters[box]
+        if not value:
+            continue
+        terms = _terms(value)
+        fuzzy = column.op("%>")(value)
+        if terms:
+            conditions[box] = or_(ProviderSearch.SearchDocument.op("@@")(_tsquery(terms, weight)), fuzzy)
+        else:
+            conditions[box] = fuzzy
+    return conditions
+
+
+def relevance_key(filters):
+    """Relevance score: weighted full-text rank plus trigram similarity per box."""
+    boxes = [box for box in TEXT_FIELDS if filters[box]]
+    lexemes = [f"{term}:*{TEXT_FIELDS[box][0]}" for box in boxes for term in _terms(filters[box])]
+    score = literal_column("0")
+    if lexemes:
+        # Any word of any box counts towards the rank, A > B > C
+        score = score + func.ts_rank(
+            ProviderSearch.SearchDocument, func.to_tsquery("simple", " | ".join(lexemes)), type_=Float
+        )
+    for box in boxes:
+        score = score + func.word_similarity(literal(filters[box]), TEXT_FIELDS[box][1], type_=Float)
+    # Double precision, so the key survives the cursor round trip exactly
+    return cast(score, Float)
@@ -0,0 +1,137 @@
+from models import ProviderInfo, ProviderSearch
+from search import parse_filters, filter_key, build_filtered_query, build_search_query
+from cards import InvalidFields, card_fields, card_plan
+from pagination import SORT_KEYS, DEFAULT_SORT, InvalidCursor, apply_sort, encode_cursor, decode_cursor
+from counting import COUNT_MODES
+from geo import InvalidLocation, locate, zip_center_query, distance_key
+from availability import InvalidAvailability, resolve as resolve_availability
+from effective import InvalidEffectiveDate, resolve as resolve_as_of
+from response_cache import response_key
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+class SearchRequest:
+    """One /api/providers request: its parameters, queries and response body.
+
+    app.py runs the queries on the Flask-SQLAlchemy session and async_app.py
+    on an asyncio engine; everything else is decided here, so both return
+    the same JSON for the same request. Usage: construct, run
+    ``zip_lookup()`` if it is not None, then ``prepare()`` with its result.
+    """
+
+    def __init__(self, args, settings, provider_config=None):
+        self.args = args
+        self.settings = settings
+        self.provider_config = provider_config
+        # Pagination: `cursor` (a previous response's nextCursor) seeks straight
+        # to the next page; `page` keeps working as an OFFSET for shallow pages.
+        self.page = int(args.get("page", 1))
+        self.per_page = int(args.get("per_page", 9))
+        self.offset = (self.page - 1) * self.per_page
+        self.cursor_token = args.get("cursor")
+        self.filters = parse_filters(args)
+
+    def zip_lookup(self):
+        return zip_center_query(self.filters)
+
+    def prepare(self, zip_center=None, query_for=None, search_as_of=None):
+        """Validate the request and build ``self.query``; raises InvalidSearch.
+
+        ``query_for(model)`` gives the query the filters start from (a
+        session-less ``Query`` in async_app.py; ``Model.query`` by default).
+        ``search_as_of`` is the date Provider_Search is valid on
+        (effective.directory_state).
+        """
+        try:
+            locate(self.filters, self.settings["NEAR_MAX_RADIUS_MILES"], zip_center)
+            resolve_availability(self.filters, self.settings["DIRECTORY_TIMEZONE"])
+            resolve_as_of(self.filters, self.settings["DIRECTORY_TIMEZONE"])
+        except (InvalidLocation, InvalidAvailability, InvalidEffectiveDate) as e:
+            raise InvalidSearch(str(e))
+
+        # Provider_Search answers a search from one table; "live" runs the same
+        # filters against the Provider_* tables directly. Provider_Search only
+        # holds the rows valid on its as-of date, so other dates go live too.
+        self.source = self.settings["SEARCH_SOURCE"]
+        if search_as_of is None or self.filters["asOf"] != search_as_of.isoformat():
+            self.source = "live"
+        if self.source == "live":
+            self.model, build = ProviderInfo, build_filtered_query
+        else:
+            self.model, build = ProviderSearch, build_search_query
+        self.query = build(self.filters, query_for(self.model) if query_for else None)
+
+        # `fields=` narrowed by the admin display toggles, compiled into the
+        # columns and child tables to load and the getters to run
+        try:
+            self.plan = card_plan(self.model, card_fields(self.args.get("fields"), self.provider_config),
+                                  self.filters["asOf"] if self.model is ProviderInfo else None)
+        except InvalidFields as e:
+            raise InvalidSearch(str(e))
+
+        self.sort_by = self.args.get("sortBy", DEFAULT_SORT)
+        if self.sort_by not in SORT_KEYS[self.model] or (self.sort_by == "distance" and not self.filters["center"]):
+            self.sort_by = DEFAULT_SORT
+
+        self.cursor = None
+        if self.cursor_token:
+            try:
+                self.cursor = decode_cursor(self.cursor_token, self.sort_by)
+            except InvalidCursor as e:
+                raise InvalidSearch(str(e))
+
+        self.count_mode = self.args.get("countMode", self.settings["COUNT_MODE"])
+        if self.count_mode not in COUNT_MODES:
+            raise InvalidSearch(f"countMode must be one of {', '.join(COUNT_MODES)}")
+
+    def count_key(self, version):
+        return "%d:%s" % (version, filter_key(self.filters))
+
+    def cache_key(self, version):
+        # Everything that shapes the response, at the current data version
+        return response_key(
+            version, filters=self.filters, sortBy=self.sort_by, page=self.page, perPage=self.per_page,
+            cursor=self.cursor_token, countMode=self.count_mode, source=self.source, fields=self.plan.fields
+        )
+
+    def page_query(self):
+        query = apply_sort(self.query, self.model, self.sort_by, self.cursor, self.filters)
+        if self.filters["center"]:
+            query = query.add_columns(distance_key(self.model, self.filters["center"]).label("distance"))
+        query = query.options(*self.plan.options)
+        if self.cursor is None:
+            query = query.offset(self.offset)
+        # One extra row tells us whether there is a next page
+        return query.limit(self.per_page + 1)
+
+    def hydrate_query(self, ids):
+        """``page_query`` rows for the providers ``ids`` found by columnar.py, in the same order."""
+        query = self.model.query.filter(self.model.ProviderID.in_(ids))
+        query = apply_sort(query, self.model, self.sort_by, None, self.filters)
+        return query.options(*self.plan.options)
+
+    def response(self, rows, total, total_mode):
+        next_cursor = None
+        if len(rows) > self.per_page:
+            rows = rows[:self.per_page]
+            last = rows[-1]
+            next_cursor = encode_cursor(self.sort_by, last.sort_key, last[0].ProviderID)
+
+        result = []
+        for row in rows:
+            card = self.plan.card(row[0])
+            if self.filters["center"]:
+                card["distance"] = round(row.distance, 2)  # miles to the nearest address
+            result.append(card)
+
+        return {
+            "providers": result,
+            "total": total,
+            "page": self.page,
+            "pages": (total + self.per_page - 1) // self.per_page,
+            "totalMode": total_mode,
+            "nextCursor": next_cursor
+        }
@@ -0,0 +1,106 @@
+from sqlalchemy import text
+
+from models import db, ProviderSearch
+
+
+# Provider_Search, Provider_Search_Location and Provider_Rating_Summary are
+# kept in sync by triggers (migrations/002_provider_search.sql and later);
+# these are the manual tools around them.
+
+def rebuild_search_table():
+    # Rebuilds the rating summary first, which Provider_Search reads
+    db.session.execute(text("SELECT provider_search_rebuild()"))
+    db.session.commit()
+
+
+def advance_search_date(as_of):
+    """Make Provider_Search hold the child rows valid on ``as_of`` (a date).
+
+    Only providers with a dated row starting or ending since the previous
+    date are re-derived (migrations/010_effective_dates.sql). Returns how many.
+    """
+    changed = db.session.execute(text("SELECT provider_search_advance(:as_of)"), {"as_of": as_of}).scalar()
+    db.session.commit()
+    return changed
+
+
+def _columns():
+    # ProviderID may be uuid in the source view and varchar in the table
+    return ", ".join(
+        '"ProviderID"::text AS "ProviderID"' if c.name == "ProviderID" else '"%s"' % c.name
+        for c in ProviderSearch.__table__.columns
+    )
+
+
+def _rating_summary_differences(limit):
+    rows = db.session.execute(text("""
+        SELECT coalesce(live."ProviderID", stored."ProviderID")::text
+        FROM (SELECT "ProviderID", avg("RatingValue") AS "AverageRating",
+                     count("RatingValue") AS "RatingCount", max("RatingStartDate") AS "LatestRatingDate"
+                FROM "Provider_Ratings" GROUP BY "ProviderID") live
+        FULL JOIN "Provider_Rating_Summary" stored ON live."ProviderID" = stored."ProviderID"
+        WHERE (live."AverageRating", live."RatingCount", live."LatestRatingDate")
+              IS DISTINCT FROM (stored."AverageRating", stored."RatingCount", stored."LatestRatingDate")
+        ORDER BY 1
+        LIMIT :limit
+    """), {"limit": limit}).all()
+    return [(row[0], "rating") for row in rows]
+
+
+def _location_differences(limit):
+    columns = '"AddressID"::text, "ProviderID"::text, "Latitude", "Longitude"'
+    rows = db.session.execute(text(f"""
+        SELECT DISTINCT coalesce(live."ProviderID", stored."ProviderID")
+        FROM (SELECT {columns} FROM provider_search_location_source
+              EXCEPT SELECT {columns} FROM "Provider_Search_Location") live
+        FULL JOIN (SELECT {columns} FROM "Provider_Search_Location"
+                   EXCEPT SELECT {columns} FROM provider_search_location_source) stored
+          ON live."AddressID" = stored."AddressID"
+        ORDER BY 1
+        LIMIT :limit
+    """), {"limit": limit}).all()
+    return [(row[0], "location") for row in rows]
+
+
+def check_search_table(limit=100):
+    """Compare Provider_Search with a fresh derivation from the live tables.
+
+    Returns ``(ProviderID, problem)`` pairs, at most ``limit`` of them, where
+    problem is "rating" (Provider_Rating_Summary row out of date),
+    "location" (Provider_Search_Location rows out of date), "missing" (no
+    stored row), "extra" (stored row for a provider that no longer exists)
+    or "stale" (stored row differs).
+    """
+    problems = _rating_summary_differences(limit)
+    problems += _location_differences(limit - len(problems))
+    columns = _columns()
+    rows = db.session.execute(text(f"""
+        SELECT coalesce(live."ProviderID", stored."ProviderID"),
+               CASE WHEN stored."ProviderID" IS NULL THEN 'missing'
+                    WHEN live."ProviderID" IS NULL THEN 'extra'
+                    ELSE 'stale' END
+        FROM (SELECT {columns} FROM provider_search_source
+              EXCEPT SELECT {columns} FROM "Provider_Search") live
+        FULL JOIN (SELECT {columns} FROM "Provider_Search"
+                   EXCEPT SELECT {columns} FROM provider_search_source) stored
+          ON live."ProviderID" = stored."ProviderID"
+        ORDER BY 1
+        LIMIT :limit
+    """), {"limit": limit - len(problems)}).all()
+    return problems + [tuple(row) for row in rows]
+
+
+def repair_search_rows(provider_ids):
+    ids = list(provider_ids)
+    # Re-derives the rating summary, then the search rows, of the given
+    # providers; rows of deleted providers are dropped from all three. The ids
+    # are looked up in Provider_Info's own ProviderID type for the refresh.
+    existing = 'ARRAY(SELECT "ProviderID" FROM "Provider_Info" WHERE "ProviderID"::text = ANY(:ids))'
+    # Take the rows about to be dropped out of the plan catalogue counts first
+    db.session.execute(text("SELECT provider_plan_catalogue_count(CAST(:ids AS text[]), -1)"), {"ids": ids})
+    db.session.execute(text('DELETE FROM "Provider_Rating_Summary" WHERE "ProviderID"::text = ANY(:ids)'), {"ids": ids})
+    db.session.execute(text('DELETE FROM "Provider_Search" WHERE "ProviderID" = ANY(:ids)'), {"ids": ids})
+    db.session.execute(text('DELETE FROM "Provider_Search_Location" WHERE "ProviderID" = ANY(:ids)'), {"ids": ids})
+    db.session.execute(text(f"SELECT provider_rating_summary_refresh({existing})"), {"ids": ids})
+    db.session.execute(text(f"SELECT provider_search_refresh({existing})"), {"ids": ids})
+    db.session.commit()
@@ -0,0 +1,254 @@
+import heapq
+import logging
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+from sqlalchemy import text
+
+from models import db
+
+log = logging.getLogger(__name__)
+
+
+class InvalidSuggest(ValueError):
+    pass
+
+
+# Typeahead for the SearchBar boxes (migrations/008_suggest.sql): first and
+# last names for `name`, specialty names for `specialty`, and cities, states
+# and ZIP codes for `location`. Every term works as that box's filter value.
+SUGGEST_KINDS = ("name", "specialty", "location")
+SUGGEST_MAX_LIMIT = 20
+
+# Prefixes matching more terms than this have their top terms computed once
+# and kept until a term starting with them changes; narrower ranges are
+# scanned on every lookup.
+SCAN_LIMIT = 512
+
+# Past this many logged changes a reload is cheaper than inserting into the
+# sorted arrays one term at a time
+RELOAD_CHANGES = 5000
+
+TERM_COUNTS = text("SELECT kind, term, weight FROM suggest_term_counts")
+SNAPSHOT = text("SELECT pg_current_snapshot()::text")
+# The changes committed since snapshot :since, with the snapshot they bring
+# the index up to; the first row carries the snapshot even when none did
+CHANGES_SINCE = text("""
+    WITH now AS (SELECT pg_current_snapshot() AS snapshot)
+    SELECT now.snapshot::text, c.kind, c.term, c.delta
+      FROM now
+      LEFT JOIN suggest_term_changes c
+        ON c.xid >= pg_snapshot_xmin(CAST(:since AS pg_snapshot))
+       AND pg_visible_in_snapshot(c.xid, now.snapshot)
+       AND NOT pg_visible_in_snapshot(c.xid, CAST(:since AS pg_snapshot))
+     ORDER BY c.id
+     LIMIT :limit
+""")
+PRUNE_CHANGES = text("DELETE FROM suggest_term_changes WHERE logged_at < now() - make_interval(secs => :seconds)")
+
+# Last code point: every string starting with a prefix sorts below prefix + END
+END = "\U0010ffff"
+
+
+def fold(term):
+    return term.casefold()
+
+
+class TermIndex:
+    """One kind's terms in a sorted array, keyed by their folded text.
+
+    ``keys`` (folded, sorted), ``terms`` (as stored) and ``weights`` (rows
+    carrying the term) are parallel; the terms starting with a prefix are
+    the slice between two bisections. A term already in folded form shares
+    one string object between ``keys`` and ``terms``.
+    """
+
+    def __init__(self, counts=()):
+        entries = []
+        for term, weight in counts:
+            key = fold(term)
+            entries.append((term if key == term else key, term, weight))
+        entries.sort()
+        self.keys = [key for key, _, _ in entries]
+        self.terms = [term for _, term, _ in entries]
+        self.weights = array("q", [weight for _, _, weight in entries])
+        self._tops = {}
+        self._warm("", 0, len(self.keys))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def apply(self, term, delta):
+        """Add ``delta`` to the weight of ``term``, adding or dropping it as needed."""
+        key = fold(term)
+        i = bisect_left(self.keys, key)
+        while i < len(self.keys) and self.keys[i] == key and self.terms[i] != term:
+            i += 1
+        if i < len(self.keys) and self.terms[i] == term:
+            weight = self.weights[i] + delta
+            if weight > 0:
+                self.weights[i] = weight
+            else:
+                del self.keys[i], self.terms[i], self.weights[i]
+        elif delta > 0:
+            self.keys.insert(i, term if key == term else key)
+            self.terms.insert(i, term)
+            self.weights.insert(i, delta)
+        for n in range(1, len(key) + 1):
+            self._tops.pop(key[:n], None)
+
+    def top(self, prefix, limit):
+        """The ``limit`` heaviest (term, weight) pairs starting with folded ``prefix``."""
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + END, lo)
+        if hi - lo <= SCAN_LIMIT:
+            return self._top(lo, hi, limit)
+        top = self._tops.get(prefix)
+        if top is None:
+            top = self._tops[prefix] = self._top(lo, hi, SUGGEST_MAX_LIMIT)
+        return top[:limit]
+
+    def _warm(self, prefix, lo, hi):
+        # Fill _tops for every prefix too wide to scan, so no lookup has to
+        # rank thousands of terms on the spot
+        if hi - lo <= SCAN_LIMIT:
+            return
+        if prefix:
+            self._tops[prefix] = self._top(lo, hi, SUGGEST_MAX_LIMIT)
+        depth = len(prefix)
+        i = lo
+        while i < hi:
+            if len(self.keys[i]) == depth:
+                i += 1
+                continue
+            longer = self.keys[i][:depth + 1]
+            j = bisect_left(self.keys, longer + END, i, hi)
+            self._warm(longer, i, j)
+            i = j
+
+    def _top(self, lo, hi, limit):
+        best = heapq.nlargest(limit, range(lo, hi), key=self.weights.__getitem__)
+        return [(self.terms[i], self.weights[i]) for i in best]
+
+    def nbytes(self):
+        # The arrays plus every distinct string they hold
+        strings = {id(s): s for s in self.keys}
+        strings.update((id(s), s) for s in self.terms)
+        return (sys.getsizeof(self.keys) + sys.getsizeof(self.terms)
+                + self.weights.buffer_info()[1] * self.weights.itemsize
+                + sum(sys.getsizeof(s) for s in strings.values()))
+
+
+class SuggestIndex:
+    """Process-local typeahead index over every SUGGEST_KINDS term.
+
+    ``load()`` reads suggest_term_counts whole; from then on, at most every
+    ``refresh_interval`` seconds, a lookup first applies the term changes
+    logged since. A worker that has not synced for ``retention`` seconds
+    (the age after which log entries are pruned) reloads instead.
+    """
+
+    def __init__(self, refresh_interval=5, retention=86400):
+        self.refresh_interval = refresh_interval
+        self.retention = retention
+        self._kinds = None
+        self._snapshot = None
+        self._synced_at = 0
+        self._loaded_at = None
+        self._load_seconds = None
+        self._changes_applied = 0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def load(self):
+        start = time.perf_counter()
+        with db.engine.begin() as connection:
+            connection.execute(PRUNE_CHANGES, {"seconds": self.retention})
+        # The counts and the snapshot they reflect come from one transaction
+        with db.engine.connect().execution_options(isolation_level="REPEATABLE READ") as connection:
+            snapshot = connection.execute(SNAPSHOT).scalar()
+            counts = {kind: [] for kind in SUGGEST_KINDS}
+            for kind, term, weight in connection.execute(TERM_COUNTS):
+                counts[kind].append((term, weight))
+        kinds = {kind: TermIndex(counts[kind]) for kind in SUGGEST_KINDS}
+        with self._lock:
+            self._kinds = kinds
+            self._snapshot = snapshot
+            self._synced_at = time.monotonic()
+            self._loaded_at = time.time()
+            self._load_seconds = time.perf_counter() - start
+        log.info("suggest index loaded: %d terms in %.2fs",
+                 sum(len(k) for k in kinds.values()), self._load_seconds)
+
+    def sync(self):
+        """Load or catch up with the change log, if it is time to."""
+        if self._kinds is not None and time.monotonic() - self._synced_at < self.refresh_interval:
+            return
+        # One thread syncs; the others answer from the index as it is
+        if not self._sync_lock.acquire(blocking=self._kinds is None):
+            return
+        try:
+            if self._kinds is None or time.monotonic() - self._synced_at > self.retention:
+                self.load()
+                return
+            if time.monotonic() - self._synced_at < self.refresh_interval:
+                return
+            with db.engine.connect() as connection:
+                rows = connection.execute(CHANGES_SINCE, {"since": self._snapshot, "limit": RELOAD_CHANGES + 1}).all()
+            changes = [(kind, term, delta) for _, kind, term, delta in rows if delta is not None]
+            if len(rows) > RELOAD_CHANGES or any(kind is None for kind, _, _ in changes):
+                self.load()
+                return
+            with self._lock:
+                for kind, term, delta in changes:
+                    self._kinds[kind].apply(term, delta)
+                self._snapshot = rows[0][0]
+                self._changes_applied += len(changes)
+                self._synced_at = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def suggest(self, prefix, kinds=SUGGEST_KINDS, limit=8):
+        """``{kind: [{"value", "count"}, ...]}``, heaviest terms first."""
+        self.sync()
+        prefix = fold(prefix.strip())
+        if not prefix:
+            return {kind: [] for kind in kinds}
+        with self._lock:
+            return {
+                kind: [{"value": term, "count": weight} for term, weight in self._kinds[kind].top(prefix, limit)]
+                for kind in kinds
+            }
+
+    def stats(self):
+        self.sync()
+        with self._lock:
+            kinds = {kind: {"terms": len(index), "bytes": index.nbytes()} for kind, index in self._kinds.items()}
+            return {
+                "kinds": kinds,
+                "terms": sum(k["terms"] for k in kinds.values()),
+                "bytes": sum(k["bytes"] for k in kinds.values()),
+                "snapshot": self._snapshot,
+                "changesApplied": self._changes_applied,
+                "loadedAt": self._loaded_at,
+                "loadSeconds": self._load_seconds,
+            }
+
+
+def parse_suggest(args, default_limit=8):
+    """(prefix, kinds, limit) from /api/suggest query parameters; raises InvalidSuggest."""
+    prefix = args.get("q", "")
+    kinds = tuple(k.strip() for k in args.get("kind", "").split(",") if k.strip()) or SUGGEST_KINDS
+    unknown = set(kinds) - set(SUGGEST_KINDS)
+    if unknown:
+        raise InvalidSuggest(f"kind must be one of {', '.join(SUGGEST_KINDS)}")
+    try:
+        limit = int(args.get("limit", default_limit))
+    except ValueError:
+        raise InvalidSuggest("limit must be a number")
+    if not 1 <= limit <= SUGGEST_MAX_LIMIT:
+        raise InvalidSuggest(f"limit must be between 1 and {SUGGEST_MAX_LIMIT}")
+    return prefix, kinds, limit
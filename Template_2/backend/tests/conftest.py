@@ -0,0 +1,56 @@
+"""Fixtures for the backend tests.
+
+Tests that need Postgres run against TEST_DATABASE_URL, a database they may
+wipe: its public schema is recreated from Postgres_DB/postgre.sql (uuid
+ProviderIDs, like production), migrated, and filled with a small synthetic
+directory. Without TEST_DATABASE_URL they are skipped.
+
+    TEST_DATABASE_URL=postgresql+psycopg2://postgres@localhost/omc_test python -m pytest -q
+"""
+import os
+import sys
+
+import pytest
+from sqlalchemy import create_engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_FILE = os.path.join(BACKEND_DIR, "..", "Postgres_DB", "postgre.sql")
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+# Providers in the test directory
+PROVIDERS = 200
+
+sys.path.insert(0, BACKEND_DIR)
+
+if TEST_DATABASE_URL:
+    # Read by config.py when app is first imported, inside the fixtures
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["RESPONSE_CACHE"] = "off"
+    os.environ["COLUMNAR_ENGINE"] = "off"
+
+
+@pytest.fixture(scope="session")
+def app():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = create_engine(TEST_DATABASE_URL)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("DROP SCHEMA IF EXISTS public CASCADE")
+        connection.exec_driver_sql("CREATE SCHEMA public")
+        with open(SCHEMA_FILE) as f:
+            connection.exec_driver_sql(f.read())
+    engine.dispose()
+
+    # Creates the tables postgre.sql lacks on import
+    from app import app as flask_app
+    from migrate import apply_migrations
+    from benchmarks import synthetic
+    with flask_app.app_context():
+        apply_migrations()
+        synthetic.load(PROVIDERS)
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
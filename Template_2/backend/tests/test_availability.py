@@ -0,0 +1,54 @@
+from datetime import time
+
+import pytest
+
+from models import db, ProviderInfo, ProviderLeaveSchedule, ProviderSearch, ProviderWorkingHours
+
+QUERIES = ["openNow=true", "notOnLeaveFrom=2025-06-01&notOnLeaveTo=2025-08-31", "availableDay=mon&notOnLeaveFrom=2026-01-05"]
+
+
+def _search(client, query):
+    response = client.get("/api/providers?per_page=200&countMode=exact&" + query)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_availability_filters_agree_across_sources(app, client, monkeypatch, query):
+    # Provider_Search keys are varchar, Provider_LeaveSchedule's uuid
+    totals = []
+    for source in ("denormalized", "live"):
+        monkeypatch.setitem(app.config, "SEARCH_SOURCE", source)
+        totals.append(_search(client, query)["total"])
+    assert totals[0] == totals[1]
+
+
+def test_one_off_leave_excludes_the_provider(app, client):
+    with app.app_context():
+        leave = ProviderLeaveSchedule.query.filter_by(IsRecurring=False).first()
+        day = leave.LeaveStartDate.isoformat()
+    ids = [card["id"] for card in _search(client, "notOnLeaveFrom=" + day)["providers"]]
+    assert ids and leave.ProviderID not in ids
+
+
+def test_working_hours_merge_overlapping_spans(app):
+    # Overlapping, duplicated and overnight rows collapse into one span each
+    spans = [("Mon-Tue", 9, 12), ("Mon", 11, 17), ("Tue", 12, 17), ("Tue", 9, 12),
+             ("Wed", 9, 12), ("Wed", 13, 17), ("Sat", 22, 2), ("Sat", 23, 1)]
+    expected = "Mon-Tue: 9:00 AM - 5:00 PM, Wed: 9:00 AM - 12:00 PM & 1:00 PM - 5:00 PM, Sat: 10:00 PM - 2:00 AM"
+    with app.app_context():
+        provider_id = ProviderInfo.query.order_by(ProviderInfo.ProviderID).first().ProviderID
+        hours = ProviderWorkingHours.query.filter_by(ProviderID=provider_id)
+        original = [{c.key: getattr(row, c.key) for c in ProviderWorkingHours.__table__.columns} for row in hours]
+        hours.delete()
+        db.session.add_all(ProviderWorkingHours(ProviderID=provider_id, DayOfWeek=days, StartTime=time(opens),
+                                                EndTime=time(closes), IsActive=True)
+                           for days, opens, closes in spans)
+        db.session.commit()
+        try:
+            assert db.session.get(ProviderInfo, provider_id).WorkingHours == expected
+            assert db.session.get(ProviderSearch, provider_id).WorkingHours == expected
+        finally:
+            hours.delete()
+            db.session.add_all(ProviderWorkingHours(**row) for row in original)
+            db.session.commit()
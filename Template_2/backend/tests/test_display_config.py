@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from display_config import DEFAULT_DISPLAY_CONFIG, DisplayConfigCache
+
+
+@pytest.fixture
+def saved(app, client):
+    # Leaves every toggle on again for the other tests
+    yield lambda changes: client.post("/api/config", json=changes)
+    client.post("/api/config", json=DEFAULT_DISPLAY_CONFIG)
+
+
+def test_saved_config_is_seen_by_another_worker(app, saved):
+    response = saved({"rating": False})
+    assert response.status_code == 200
+    assert response.get_json()["config"] == {**DEFAULT_DISPLAY_CONFIG, "rating": False}
+
+    # A fresh cache stands in for a worker that did not handle the POST
+    with app.app_context():
+        assert DisplayConfigCache().get()["rating"] is False
+
+
+def test_hidden_fields_are_left_out_of_both_apps(app, client, saved):
+    import async_app
+
+    saved({"phoneNumber": False})
+    card = client.get("/api/providers?per_page=1").get_json()["providers"][0]
+    assert "phoneNumber" not in card and "firstName" in card
+
+    async def async_card():
+        async_app.display_config_cache.clear()
+        try:
+            response = await async_app.app.test_client().get("/api/providers?per_page=1")
+            return (await response.get_json())["providers"][0]
+        finally:
+            async_app.display_config_cache.clear()
+            await async_app.engine.dispose()
+
+    assert asyncio.run(async_card()) == card
+
+
+@pytest.mark.parametrize("body", [[1], "x", 1, {}, {"rating": False, "ssn": True}, {"rating": "no"}, None])
+def test_invalid_config_is_a_bad_request(app, client, body):
+    response = client.post("/api/config", json=body) if body is not None else client.post("/api/config")
+    assert response.status_code == 400
+    assert response.get_json()["error"]
+    # Nothing was saved
+    with app.app_context():
+        assert DisplayConfigCache().get() == DEFAULT_DISPLAY_CONFIG
@@ -0,0 +1,51 @@
+import pytest
+
+
+def _facets(client, query=""):
+    response = client.get("/api/providers/facets?" + query)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()["facets"]
+
+
+def _total(client, query):
+    response = client.get("/api/providers?per_page=1&countMode=exact&" + query)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()["total"]
+
+
+def test_facets_count_every_facet(client):
+    facets = _facets(client)
+    assert facets["specialty"] and facets["languagesSpoken"] and facets["gender"]
+    for values in facets.values():
+        counts = [value["count"] for value in values]
+        assert counts == sorted(counts, reverse=True)
+
+
+@pytest.mark.parametrize("others", ["", "gender=Female", "minExperience=5&acceptingNewPatients=true"])
+def test_language_counts_match_the_search_totals(client, others):
+    # A facet's own filter is left out of its counts, so each count is the
+    # total the search would have with that value chosen
+    for value in _facets(client, others)["languagesSpoken"][:3]:
+        query = "languagesSpoken=%s&%s" % (value["value"], others)
+        assert value["count"] == _total(client, query)
+
+
+def test_yes_no_counts_match_the_search_totals(client):
+    for value in _facets(client, "gender=Male")["virtualCare"]:
+        assert value["count"] == _total(client, "gender=Male&virtualCare=" + value["value"])
+
+
+def test_facets_as_of_the_search_date(app, client):
+    from effective import directory_state
+
+    with app.app_context():
+        _, search_as_of = directory_state()
+    assert _facets(client, "asOf=" + search_as_of.isoformat()) == _facets(client)
+
+
+@pytest.mark.parametrize("as_of", ["2019-01-01", "someday"])
+def test_facets_for_another_date_are_a_bad_request(client, as_of):
+    # Provider_Search only holds the rows valid on its own date
+    response = client.get("/api/providers/facets?asOf=" + as_of)
+    assert response.status_code == 400
+    assert response.get_json()["error"]
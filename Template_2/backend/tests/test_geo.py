@@ -0,0 +1,22 @@
+import pytest
+
+INVALID = ["lat=abc&lon=-73.9", "lat=40.7&lon=", "lon=-73.9", "lat=40.7&lon=-73.9&distance=0",
+           "lat=40.7&lon=-73.9&distance=-5", "lat=40.7&lon=-73.9&distance=far", "lat=91&lon=0"]
+
+
+@pytest.mark.parametrize("path", ["/api/providers", "/api/providers/facets"])
+@pytest.mark.parametrize("query", INVALID)
+def test_invalid_location_is_a_bad_request(client, path, query):
+    response = client.get(path + "?" + query)
+    assert response.status_code == 400
+    assert response.get_json()["error"]
+
+
+def test_distance_limits_the_results(client):
+    def total(query):
+        response = client.get("/api/providers?per_page=1&countMode=exact&lat=40.7&lon=-75.5&" + query)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return response.get_json()["total"]
+
+    assert total("distance=1") <= total("distance=25") <= total("")
+    assert total("") > 0
@@ -0,0 +1,30 @@
+import pytest
+
+from benchmarks.measure import StatementLog
+from models import db
+
+# Statements per uncached page: the directory state, the count and the
+# page, plus on the live tables one batched load per child collection
+# the card reads (nine)
+STATEMENTS = {"denormalized": 3, "live": 12}
+
+
+def _statements(app, client, query):
+    from app import count_cache
+
+    count_cache.clear()
+    with app.app_context(), StatementLog(db.engine) as log:
+        response = client.get("/api/providers?" + query)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return len(log.statements)
+
+
+@pytest.mark.parametrize("source", ["denormalized", "live"])
+@pytest.mark.parametrize("sort_by", ["name-asc", "rating"])
+def test_page_size_does_not_change_the_statement_count(app, client, monkeypatch, source, sort_by):
+    # Child rows are batch-loaded per page, not per provider
+    monkeypatch.setitem(app.config, "SEARCH_SOURCE", source)
+    query = "countMode=exact&sortBy=%s&per_page=" % sort_by
+    _statements(app, client, query + "1")  # leaves out first-connection queries
+    counts = {per_page: _statements(app, client, query + str(per_page)) for per_page in (1, 5, 20, 50)}
+    assert counts == dict.fromkeys(counts, STATEMENTS[source])
@@ -8,6 +8,7 @@ import {
   Smartphone,
   Monitor,
 } from "lucide-react";
+import { resetBrand } from "../../hooks/useBrand";
 
 interface ConfigureProps {
   onSave: () => void;
@@ -110,6 +111,7 @@ const Configure: React.FC<ConfigureProps> = ({ onSave }) => {
       const data = await res.json();
 
       if (res.ok) {
+        resetBrand();
         alert("Brand & Logo updated successfully!");
       } else {
         alert(data.error || "Failed to update.");
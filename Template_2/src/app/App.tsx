@@ -29,6 +29,8 @@ function App() {
 
   const [providerList, setProviderList] = React.useState<Provider[]>([]);
   const [totalProviders, setTotalProviders] = React.useState(0);
+  // 'exact' | 'estimate' | 'atLeast' — how the backend produced `total`
+  const [totalMode, setTotalMode] = React.useState('exact');
 
   const [currentPage, setCurrentPage] = React.useState(1);
   const providersPerPage = 9;
@@ -75,7 +77,8 @@ function App() {
 
       setProviderList(data.providers || []);
       setTotalProviders(data.total || 0);
-      setTotalPages(Math.ceil((data.total || 0) / providersPerPage));
+      setTotalMode(data.totalMode || 'exact');
+      setTotalPages(data.pages || Math.ceil((data.total || 0) / providersPerPage));
     } catch (err) {
       console.error('Error fetching providers:', err);
     }
@@ -127,7 +130,9 @@ function App() {
                 Healthcare Providers
               </h2>
               <p className="text-sm sm:text-base text-gray-600">
-                {totalProviders} provider{totalProviders !== 1 ? 's' : ''} found
+                {totalMode === 'estimate' && 'About '}
+                {totalProviders.toLocaleString()}
+                {totalMode === 'atLeast' && '+'} provider{totalProviders !== 1 ? 's' : ''} found
                 {filters.location && ` in ${filters.location}`}
               </p>
             </div>
@@ -184,10 +189,10 @@ function App() {
                     Prev
                   </button>
                   <span className="text-gray-700 self-center">
-                    Page {currentPage} of {totalPages}
+                    Page {currentPage} of {totalPages}{totalMode === 'atLeast' && '+'}
                   </span>
                   <button
-                    disabled={currentPage === totalPages}
+                    disabled={currentPage >= totalPages && totalMode !== 'atLeast'}
                     onClick={() => setCurrentPage((prev) => prev + 1)}
                     className="px-4 py-2 bg-blue-900 text-white rounded-full disabled:opacity-50"
                   >
@@ -159,6 +159,7 @@ export const FilterSidebar: React.FC<FilterSidebarProps> = ({
                     {settings.sortAtoZ && <option value="name-asc">Name (A to Z)</option>}
                     {settings.sortZtoA && <option value="name-desc">Name (Z to A)</option>}
                     {settings.sortExperience && <option value="experience">Most Experienced</option>}
+                    <option value="relevance">Best Match</option>
                   </select>
                 </div>
               )}
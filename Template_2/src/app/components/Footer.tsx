@@ -1,39 +1,9 @@
-import React, { useEffect, useState } from 'react';
+import React from 'react';
 import { Facebook, Twitter, Linkedin, Instagram } from 'lucide-react';
+import { useBrand } from '../../hooks/useBrand';
 
 export const Footer: React.FC = () => {
-  const [brandName, setBrandName] = useState('OnlyMedChoice');
-  const [logoUrl, setLogoUrl] = useState<string | null>(null);
-
-  // ✅ Fetch brand data from Flask backend
-  useEffect(() => {
-    const fetchBrandData = async () => {
-      try {
-        const res = await fetch('http://127.0.0.1:5000/config');
-        const data = await res.json();
-
-        if (data.brand_name) setBrandName(data.brand_name);
-        if (data.logo) {
-          // Convert hex/base64 to usable image
-          if (data.logo.startsWith('data:image')) {
-            // Already base64
-            setLogoUrl(data.logo);
-          } else {
-            // Convert hex to base64 PNG
-            const byteArray = new Uint8Array(
-              data.logo.match(/.{1,2}/g).map((byte: string) => parseInt(byte, 16))
-            );
-            const blob = new Blob([byteArray], { type: 'image/png' });
-            setLogoUrl(URL.createObjectURL(blob));
-          }
-        }
-      } catch (error) {
-        console.error('Error fetching brand info:', error);
-      }
-    };
-
-    fetchBrandData();
-  }, []);
+  const { brandName, logoUrl } = useBrand('OnlyMedChoice');
 
   return (
     <footer className="bg-gray-900 text-white">
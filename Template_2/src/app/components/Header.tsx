@@ -1,5 +1,6 @@
-import React, { useEffect, useState } from 'react';
+import React, { useState } from 'react';
 import { Menu, Languages, X } from 'lucide-react';
+import { useBrand } from '../../hooks/useBrand';
 
 interface HeaderProps {
   fallbackBrand?: string;
@@ -8,38 +9,7 @@ interface HeaderProps {
 export const Header: React.FC<HeaderProps> = ({ fallbackBrand = 'OnlyMedChoice' }) => {
   const [isMobileMenuOpen, setIsMobileMenuOpen] = useState(false);
   const [languageOpen, setLanguageOpen] = useState(false);
-  const [brandName, setBrandName] = useState(fallbackBrand);
-  const [logoUrl, setLogoUrl] = useState<string | null>(null);
-
-  // ✅ Fetch brand name and logo from Flask backend
-  useEffect(() => {
-    const fetchBrandData = async () => {
-      try {
-        const res = await fetch('http://127.0.0.1:5000/config');
-        const data = await res.json();
-
-        if (data.brand_name) setBrandName(data.brand_name);
-        if (data.logo) {
-          // Convert hex/base64 to usable image
-          if (data.logo.startsWith('data:image')) {
-            // Already base64
-            setLogoUrl(data.logo);
-          } else {
-            // Convert hex to base64 PNG
-            const byteArray = new Uint8Array(
-              data.logo.match(/.{1,2}/g).map((byte: string) => parseInt(byte, 16))
-            );
-            const blob = new Blob([byteArray], { type: 'image/png' });
-            setLogoUrl(URL.createObjectURL(blob));
-          }
-        }
-      } catch (error) {
-        console.error('Error fetching brand info:', error);
-      }
-    };
-
-    fetchBrandData();
-  }, []);
+  const { brandName, logoUrl } = useBrand(fallbackBrand);
 
   return (
     <header className="bg-white shadow-sm border-b border-gray-200">
@@ -0,0 +1,52 @@
+import React from 'react';
+
+const API_URL = 'http://127.0.0.1:5000';
+
+export interface Brand {
+  brandName: string;
+  logoUrl: string | null;
+}
+
+// One /config request per page load, shared by every component showing the
+// brand. The logo is a plain image URL that changes whenever the logo does.
+let brandRequest: Promise<Brand | null> | null = null;
+
+const loadBrand = (): Promise<Brand | null> => {
+  if (!brandRequest) {
+    brandRequest = fetch(`${API_URL}/config`)
+      .then((res) => res.json())
+      .then((data) => ({
+        brandName: data.brand_name || '',
+        logoUrl: data.logo_url ? `${API_URL}${data.logo_url}` : null,
+      }))
+      .catch((error) => {
+        console.error('Error fetching brand info:', error);
+        brandRequest = null;
+        return null;
+      });
+  }
+  return brandRequest;
+};
+
+// Call after saving the brand so the next component to mount fetches it again
+export const resetBrand = () => {
+  brandRequest = null;
+};
+
+export const useBrand = (fallbackBrand = '') => {
+  const [brand, setBrand] = React.useState<Brand>({ brandName: fallbackBrand, logoUrl: null });
+
+  React.useEffect(() => {
+    let active = true;
+    loadBrand().then((loaded) => {
+      if (active && loaded) {
+        setBrand({ brandName: loaded.brandName || fallbackBrand, logoUrl: loaded.logoUrl });
+      }
+    });
+    return () => {
+      active = false;
+    };
+  }, [fallbackBrand]);
+
+  return brand;
+};
@@ -16,6 +16,7 @@ export interface Provider {
   zipCode: string;
   latitude: number;
   longitude: number;
+  distance?: number; // miles, only on distance searches
   phoneNumber: string;
   emailId?: string;
   yearOfExperience: number;
@@ -46,5 +47,5 @@ export interface SearchFilters {
   hospitalAffiliations?: boolean;
   boardCertified?: boolean;
   minExperience: number;
-  sortBy: 'rating' | 'name-asc' | 'name-desc' | 'experience';
+  sortBy: 'rating' | 'name-asc' | 'name-desc' | 'experience' | 'relevance' | 'distance';
 }
\ No newline at end of file